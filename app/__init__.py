@@ -44,12 +44,78 @@ def create_app(config_class=Config):
     migrate.init_app(app, db) 
     login_manager.init_app(app)
 
+    from .auth import user_cache
+    user_cache.init_app(app)
+
+    from .blobs import blob_store
+    blob_store.init_app(app)
+
+    if app.config['METRICS_ENABLED']:
+        from .metrics import metrics
+        metrics.init_app(app)
+
+    # One pooled, keep-alive Judge0 client per app, shared by all requests
+    from .judge0 import Judge0Client
+    app.extensions['judge0'] = Judge0Client.from_config(app.config)
+
+    if app.config['EXECUTOR_BACKEND'] == 'local':
+        from .executors import LocalExecutor
+        # Programs must not see the test data, expected outputs included
+        app.extensions['executor'] = LocalExecutor.from_config(app.config, hidden_paths=[blob_store.cache_dir])
+
+    if app.config['JUDGE0_CACHE_ENABLED']:
+        from .judge_cache import ResultCache
+        app.extensions['judge0_cache'] = ResultCache.from_config(app.config)
+
+    # Frozen candidate papers, served without touching the ORM
+    from .papers import PaperCache
+    app.extensions['papers'] = PaperCache.from_config(app.config)
+
+    from .submissions import submission_queue
+    submission_queue.init_app(app)
+
+    from .autosave import autosave_buffer
+    autosave_buffer.init_app(app)
+
+    from .leaderboard import leaderboards
+    leaderboards.init_app(app)
+
+    from .importer import import_questions_command
+    app.cli.add_command(import_questions_command)
+    from .provisioning import provision_candidates_command
+    app.cli.add_command(provision_candidates_command)
+    from .plagiarism import check_plagiarism_command
+    app.cli.add_command(check_plagiarism_command)
+    from .blobs import prune_test_blobs_command
+    app.cli.add_command(prune_test_blobs_command)
+
     from .routes import main as main_blueprint
     app.register_blueprint(main_blueprint)
 
-    # It's generally better to not run db.create_all() here
-    # and rely solely on flask db upgrade, but we will leave it for now.
-    with app.app_context():
-        db.create_all()
+    # Convenient in development, but it costs every worker a database round
+    # trip on boot; deployments turn it off and run `flask db upgrade` once.
+    if app.config['CREATE_SCHEMA_ON_STARTUP']:
+        with app.app_context():
+            db.create_all()
 
-    return app
\ No newline at end of file
+    return app
+
+def start_background(app):
+    """
+    Starts the app's background threads in this process. Threads do not
+    survive a fork, so a preloaded app calls this in each worker (see
+    gunicorn.conf.py); elsewhere they start on first use.
+    """
+    app.extensions['submission_queue'].start()
+    app.extensions['autosave'].start()
+
+def reset_after_fork(app):
+    """
+    Call in each worker forked from a preloaded app (gunicorn --preload; see
+    gunicorn.conf.py). Drops the pooled database connections inherited from
+    the parent without closing them, so no two processes share a socket;
+    the child opens its own on first use.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
\ No newline at end of file
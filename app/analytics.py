@@ -0,0 +1,151 @@
+import numpy as np
+from sqlalchemy import func, select
+from . import db
+from .models import MCQQuestion, MCQOption, ExamSession, Answer
+
+# MCQ scoring and item analysis for a whole test in a few array operations.
+#
+# Answers are loaded as one (session, question, option) int array and laid
+# out as a candidates x questions matrix of selected option ids (0 for
+# unanswered). Comparing it to the answer key row gives every candidate's
+# score at once, and the same matrix yields the item statistics.
+
+HISTOGRAM_BINS = 10
+# Share of candidates in each of the upper and lower groups used for the
+# discrimination index (Kelley's 27%)
+GROUP_FRACTION = 0.27
+
+
+class AnswerKey:
+    """A test's MCQs as parallel arrays, sorted by question id."""
+
+    def __init__(self, question_ids, correct_option_ids, marks, option_ids, option_question_ids):
+        self.question_ids = question_ids
+        self.correct_option_ids = correct_option_ids
+        self.marks = marks
+        self.option_ids = option_ids
+        self.option_question_ids = option_question_ids
+
+    @classmethod
+    def load(cls, test_id):
+        rows = db.session.execute(
+            select(MCQQuestion.id, func.coalesce(MCQQuestion.correct_option_id, 0), MCQQuestion.marks)
+            .where(MCQQuestion.test_id == test_id)
+            .order_by(MCQQuestion.id)
+        ).all()
+        key = np.array(rows, dtype=np.int64).reshape(-1, 3)
+        options = np.array(db.session.execute(
+            select(MCQOption.id, MCQOption.question_id)
+            .join(MCQQuestion, MCQOption.question_id == MCQQuestion.id)
+            .where(MCQQuestion.test_id == test_id)
+            .order_by(MCQOption.id)
+        ).all(), dtype=np.int64).reshape(-1, 2)
+        return cls(key[:, 0], key[:, 1], key[:, 2], options[:, 0], options[:, 1])
+
+    @property
+    def total_marks(self):
+        return int(self.marks.sum())
+
+
+def load_responses(test_id, key):
+    """
+    Returns (session ids, responses) where responses[i, j] is the option
+    candidate i chose for key.question_ids[j], or 0.
+    """
+    rows = db.session.execute(
+        select(ExamSession.id, Answer.question_id, func.coalesce(Answer.selected_option_id, 0))
+        .join(Answer, Answer.session_id == ExamSession.id)
+        .where(ExamSession.test_id == test_id, Answer.kind == 'mcq')
+    ).all()
+    session_ids = np.array(
+        db.session.execute(select(ExamSession.id).where(ExamSession.test_id == test_id).order_by(ExamSession.id))
+        .scalars().all(), dtype=np.int64)
+
+    responses = np.zeros((len(session_ids), len(key.question_ids)), dtype=np.int64)
+    if rows and len(key.question_ids):
+        data = np.array(rows, dtype=np.int64)
+        row_index = np.searchsorted(session_ids, data[:, 0])
+        col_index = np.searchsorted(key.question_ids, data[:, 1])
+        # Drop answers to questions no longer on the test
+        col_index = np.minimum(col_index, len(key.question_ids) - 1)
+        known = key.question_ids[col_index] == data[:, 1]
+        responses[row_index[known], col_index[known]] = data[known, 2]
+    return session_ids, responses
+
+
+def score(key, responses):
+    """Per-candidate MCQ scores and the boolean correctness matrix."""
+    correct = (responses == key.correct_option_ids) & (responses != 0)
+    return correct @ key.marks, correct
+
+
+def _discrimination(correct, scores):
+    n = len(scores)
+    group = max(1, int(round(n * GROUP_FRACTION)))
+    if n < 2:
+        return np.zeros(correct.shape[1])
+    order = np.argsort(scores, kind='stable')
+    lower, upper = correct[order[:group]], correct[order[-group:]]
+    return upper.mean(axis=0) - lower.mean(axis=0)
+
+
+def _option_counts(key, responses):
+    chosen = responses[responses != 0]
+    counts = np.zeros(len(key.option_ids), dtype=np.int64)
+    if len(chosen) and len(key.option_ids):
+        ids, n = np.unique(chosen, return_counts=True)
+        pos = np.searchsorted(key.option_ids, ids)
+        pos = np.minimum(pos, len(key.option_ids) - 1)
+        known = key.option_ids[pos] == ids
+        counts[pos[known]] = n[known]
+    return counts
+
+
+def analyze_test(test_id):
+    """
+    Scores every candidate of a test and computes item statistics:
+    difficulty (share answering correctly), discrimination (upper minus
+    lower 27% group difficulty), how often each option was chosen, and a
+    histogram of scores.
+    """
+    key = AnswerKey.load(test_id)
+    session_ids, responses = load_responses(test_id, key)
+    scores, correct = score(key, responses)
+    candidates = len(session_ids)
+
+    if candidates:
+        difficulty = correct.mean(axis=0)
+        discrimination = _discrimination(correct, scores)
+        unanswered = (responses == 0).sum(axis=0)
+    else:
+        difficulty = discrimination = np.zeros(len(key.question_ids))
+        unanswered = np.zeros(len(key.question_ids), dtype=np.int64)
+    option_counts = _option_counts(key, responses)
+
+    items = []
+    for j, question_id in enumerate(key.question_ids):
+        mask = key.option_question_ids == question_id
+        items.append({
+            "question_id": int(question_id),
+            "difficulty": round(float(difficulty[j]), 4),
+            "discrimination": round(float(discrimination[j]), 4),
+            "unanswered": int(unanswered[j]),
+            "options": {
+                int(option_id): int(count)
+                for option_id, count in zip(key.option_ids[mask], option_counts[mask])
+            },
+            "correct_option_id": int(key.correct_option_ids[j]) or None,
+        })
+
+    counts, edges = np.histogram(scores, bins=HISTOGRAM_BINS, range=(0, max(key.total_marks, 1)))
+    return {
+        "test_id": test_id,
+        "candidates": candidates,
+        "total_marks": key.total_marks,
+        "mean": round(float(scores.mean()), 2) if candidates else None,
+        "median": float(np.median(scores)) if candidates else None,
+        "std": round(float(scores.std()), 2) if candidates else None,
+        "histogram": {"counts": counts.tolist(), "edges": edges.round(2).tolist()},
+        "items": items,
+        "scores": dict(zip(session_ids.tolist(), scores.tolist())),
+    }
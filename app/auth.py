@@ -0,0 +1,113 @@
+import threading
+import time
+from functools import lru_cache
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from werkzeug.security import generate_password_hash
+from . import db
+
+
+# --- Password hashing ---
+
+@lru_cache(maxsize=None)
+def _canonical_method(method):
+    """The method prefix werkzeug writes for `method`, defaults filled in."""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def hash_password(password):
+    config = current_app.config
+    return generate_password_hash(
+        password, method=config['PASSWORD_HASH_METHOD'], salt_length=config['PASSWORD_SALT_LENGTH']
+    )
+
+
+def password_needs_rehash(password_hash):
+    """True if a hash was made with other parameters than PASSWORD_HASH_METHOD."""
+    if not password_hash:
+        return False
+    return password_hash.split('$', 1)[0] != _canonical_method(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+# --- Logged-in user cache ---
+
+class UserCache:
+    """
+    Short-lived per-process cache for Flask-Login's user_loader.
+
+    Every authenticated request used to load the user row. Instead a
+    detached copy of the row is kept for USER_CACHE_TTL seconds and merged
+    into the request's session with load=False, which attaches it without
+    any SQL. Changing a user's role or password drops the entry here at
+    once; other processes pick the change up when their TTL runs out.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 0
+        self.max_entries = 0
+        self._entries = {}  # user id -> (expires_at, detached User)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config['USER_CACHE_TTL']
+        self.max_entries = app.config['USER_CACHE_SIZE']
+        app.extensions['user_cache'] = self
+
+    def load(self, model, user_id):
+        if self.ttl:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                return db.session.merge(entry[1], load=False)
+
+        user = model.query.get(user_id)
+        if user is not None and self.ttl:
+            self._store(model, user)
+        return user
+
+    def _store(self, model, user):
+        # A copy of the column values, so the cached object never belongs to a session
+        snapshot = model(**{attr.key: getattr(user, attr.key) for attr in inspect(model).column_attrs})
+        make_transient_to_detached(snapshot)
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    return
+            self._entries[user.id] = (now + self.ttl, snapshot)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+user_cache = UserCache()
+
+
+def watch_user_changes(model, *attributes):
+    """Drops cached users when any of `attributes` is assigned."""
+    def on_set(target, value, oldvalue, initiator):
+        if target.id is None:
+            return
+        user_cache.invalidate(target.id)
+        session = inspect(target).session
+        if session is not None:
+            # Again after commit, in case another request re-cached the old row meanwhile
+            session.info.setdefault('stale_users', set()).add(target.id)
+
+    for name in attributes:
+        event.listen(getattr(model, name), 'set', on_set)
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_stale_users(session):
+    for user_id in session.info.pop('stale_users', ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_stale_users(session):
+    session.info.pop('stale_users', None)
@@ -0,0 +1,313 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import ExamSession, Answer
+from .leaderboard import leaderboards
+
+log = logging.getLogger(__name__)
+
+ANSWER_FIELDS = ('selected_option_id', 'language_id', 'code', 'version', 'updated_at')
+
+
+class VersionConflict(Exception):
+    """A diff was based on a version of the buffer the server doesn't have."""
+
+    def __init__(self, version):
+        super().__init__(f"Buffer is at version {version}")
+        self.version = version
+
+
+def apply_diff(text, ops):
+    """
+    Applies splice operations [{"start", "end", "text"}, ...] in order, each
+    replacing text[start:end] of the result so far.
+    """
+    for op in ops:
+        start, end = int(op["start"]), int(op["end"])
+        if not 0 <= start <= end <= len(text):
+            raise ValueError("diff range is out of bounds")
+        text = text[:start] + (op.get("text") or '') + text[end:]
+    return text
+
+
+class AutosaveBuffer:
+    """
+    Write-coalescing store for exam answers.
+
+    Autosave requests only update an in-memory dict keyed by (session id,
+    kind, question id), so a candidate saving every few seconds costs no
+    database write per request; only the newest state of each answer is
+    kept. A flusher thread writes all dirty answers every
+    AUTOSAVE_FLUSH_INTERVAL seconds as one batched upsert (INSERT ... ON
+    CONFLICT DO UPDATE on Postgres and SQLite), guarded by the answer
+    version so an older write never overwrites a newer one.
+
+    Each web worker has its own buffer, so a candidate's saves may be
+    pending in several processes. Submitting closes the session in the
+    database first, so no worker accepts further saves, then flushes this
+    process's buffer; what other workers accepted before the close is
+    still written by their next flush, within one flush interval (and so
+    reaches the leaderboard with its next rebuild). The flusher also closes sessions whose time ran
+    out, after flushing whatever they had pending, and forgets the answers
+    of sessions closed by any worker.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._current = {}  # key -> latest row for that answer
+        self._dirty = set()  # keys not yet written to the database
+        self._lock = threading.Lock()
+        self._started = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['autosave'] = self
+
+    def start(self):
+        """Starts the flusher now, so this process also expires sessions it never saw a save for."""
+        self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name='autosave-flusher', daemon=True).start()
+        atexit.register(self._flush_at_exit)
+
+    # --- Saving ---
+
+    def _load(self, key):
+        """An answer's row from the database, or None."""
+        session_id, kind, question_id = key
+        answer = Answer.query.filter_by(session_id=session_id, kind=kind, question_id=question_id).first()
+        if answer is None:
+            return None
+        return {field: getattr(answer, field) for field in ANSWER_FIELDS}
+
+    def save(self, session_id, kind, question_id, data):
+        """
+        Records an answer and returns its version. `data` carries the
+        "version" the client gives this save, one more than its last, and
+        either "selected_option_id" (mcq), or "language_id" with a full
+        "code" buffer or a "diff" against "base_version" (coding).
+
+        The version has to come from the client: this process's copy of an
+        answer may be older than one another worker has saved, so it can't
+        number a save itself.
+        """
+        if data.get("version") is None:
+            raise ValueError("version is required")
+        version = int(data["version"])
+        self._start()
+        key = (session_id, kind, question_id)
+        # Only the first save of an answer in this process reads the database,
+        # and never while holding the lock
+        loaded = self._load(key) if key not in self._current else None
+        with self._lock:
+            current = self._current.get(key) or loaded
+            current_version = current["version"] if current else 0
+            if version <= current_version:
+                # A late retry of an older save; the newer one wins
+                return current_version
+
+            row = dict(current or {field: None for field in ANSWER_FIELDS})
+            if kind == 'mcq':
+                row["selected_option_id"] = data.get("selected_option_id")
+            else:
+                if "diff" in data:
+                    if current is None or data.get("base_version") != current_version:
+                        raise VersionConflict(current_version)
+                    row["code"] = apply_diff(current["code"] or '', data["diff"])
+                else:
+                    row["code"] = data.get("code")
+                if len(row["code"] or '') > self.app.config['AUTOSAVE_MAX_CODE_LENGTH']:
+                    raise ValueError("answer is too long")
+                row["language_id"] = data.get("language_id") or row["language_id"]
+            row["version"] = version
+            row["updated_at"] = datetime.utcnow()
+
+            self._current[key] = row
+            self._dirty.add(key)
+            return version
+
+    def answers(self, session_id):
+        """All answers of a session, including ones not flushed yet."""
+        rows = {
+            (a.kind, a.question_id): {field: getattr(a, field) for field in ANSWER_FIELDS}
+            for a in Answer.query.filter_by(session_id=session_id)
+        }
+        with self._lock:
+            for (sid, kind, question_id), row in self._current.items():
+                if sid == session_id:
+                    rows[(kind, question_id)] = row
+        return [dict(row, kind=kind, question_id=question_id) for (kind, question_id), row in rows.items()]
+
+    # --- Flushing ---
+
+    def _take(self, session_ids=None):
+        with self._lock:
+            keys = [k for k in self._dirty if session_ids is None or k[0] in session_ids]
+            self._dirty.difference_update(keys)
+            return [dict(self._current[k], session_id=k[0], kind=k[1], question_id=k[2]) for k in keys]
+
+    def _upsert(self, rows):
+        table = Answer.__table__
+        dialect = db.engine.dialect.name
+        if dialect not in ('postgresql', 'sqlite'):
+            for row in rows:
+                self._merge(row)
+            return
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['session_id', 'kind', 'question_id'],
+            set_={field: stmt.excluded[field] for field in ANSWER_FIELDS},
+            where=table.c.version < stmt.excluded.version,
+        )
+        db.session.execute(stmt, rows)
+
+    def _merge(self, row):
+        answer = Answer.query.filter_by(
+            session_id=row["session_id"], kind=row["kind"], question_id=row["question_id"]
+        ).first()
+        if answer is None:
+            db.session.add(Answer(**row))
+        elif answer.version < row["version"]:
+            for field in ANSWER_FIELDS:
+                setattr(answer, field, row[field])
+
+    def flush(self, session_ids=None):
+        """Writes dirty answers (of the given sessions, or all) to the database."""
+        rows = self._take(session_ids)
+        if not rows:
+            return 0
+        batch_size = self.app.config['AUTOSAVE_BATCH_SIZE']
+        try:
+            for i in range(0, len(rows), batch_size):
+                self._upsert(rows[i:i + batch_size])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # Mark them dirty again; _current already holds the newest state
+            with self._lock:
+                self._dirty.update(
+                    (r["session_id"], r["kind"], r["question_id"]) for r in rows
+                )
+            raise
+        return len(rows)
+
+    def forget(self, *session_ids):
+        """Drops finished sessions' answers from memory once flushed."""
+        session_ids = set(session_ids)
+        with self._lock:
+            for key in [k for k in self._current if k[0] in session_ids and k not in self._dirty]:
+                del self._current[key]
+
+    def _evict_closed(self):
+        """
+        Forgets the answers of sessions that were closed, wherever that
+        happened; a session submitted through another worker would otherwise
+        stay in this one's memory for good.
+        """
+        with self._lock:
+            session_ids = list({key[0] for key in self._current})
+        batch_size = self.app.config['AUTOSAVE_BATCH_SIZE']
+        closed = []
+        for i in range(0, len(session_ids), batch_size):
+            closed += [session_id for session_id, in db.session.query(ExamSession.id).filter(
+                ExamSession.id.in_(session_ids[i:i + batch_size]),
+                ExamSession.status != 'in_progress'
+            )]
+        self.forget(*closed)
+        return len(closed)
+
+    def finish(self, session, status):
+        """
+        Closes a session as 'submitted' or 'timed_out', then writes what this
+        process holds for it. Closing is a conditional update, so of several
+        workers finishing the same session only one scores it.
+        """
+        closed = ExamSession.query.filter_by(id=session.id, status='in_progress').update(
+            {'status': status, 'finished_at': datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+        self.flush({session.id})
+        if closed:
+            try:
+                leaderboards.record_session(session, self.answers(session.id))
+            except Exception:
+                log.exception("Failed to score session %s on the leaderboard", session.id)
+        self.forget(session.id)
+
+    def _expire_sessions(self):
+        grace = timedelta(seconds=self.app.config['AUTOSAVE_GRACE_SECONDS'])
+        expired = ExamSession.query.filter(
+            ExamSession.status == 'in_progress',
+            ExamSession.ends_at < datetime.utcnow() - grace
+        ).all()
+        for session in expired:
+            self.finish(session, 'timed_out')
+
+    def _run(self):
+        interval = self.app.config['AUTOSAVE_FLUSH_INTERVAL']
+        while True:
+            time.sleep(interval)
+            with self.app.app_context():
+                try:
+                    self.flush()
+                    self._expire_sessions()
+                    self._evict_closed()
+                except Exception:
+                    log.exception("Autosave flush failed")
+                finally:
+                    db.session.remove()
+
+    def _flush_at_exit(self):
+        with self.app.app_context():
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Final autosave flush failed")
+
+
+autosave_buffer = AutosaveBuffer()
+
+
+def start_session(user, test):
+    """The user's exam session for a test, started now if it doesn't exist yet."""
+    session = ExamSession.query.filter_by(user_id=user.id, test_id=test.id).first()
+    if session is not None:
+        return session
+    now = datetime.utcnow()
+    session = ExamSession(
+        user_id=user.id,
+        test_id=test.id,
+        started_at=now,
+        ends_at=now + timedelta(minutes=test.duration_minutes)
+    )
+    db.session.add(session)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Started concurrently from another tab
+        db.session.rollback()
+        session = ExamSession.query.filter_by(user_id=user.id, test_id=test.id).first()
+    return session
+
+
+def is_open(session, now=None):
+    """True while a session still accepts answers."""
+    if session.status != 'in_progress':
+        return False
+    grace = timedelta(seconds=autosave_buffer.app.config['AUTOSAVE_GRACE_SECONDS'])
+    return (now or datetime.utcnow()) <= session.ends_at + grace
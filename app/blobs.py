@@ -0,0 +1,227 @@
+import atexit
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, union
+from . import db
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Test case inputs and expected outputs, stored once per distinct content.
+#
+# A blob is keyed by the sha256 of its UTF-8 text, so the same stress-test
+# input shared by several questions (or re-imported) is stored once. The
+# test_blob table holds the compressed bytes and is the source of truth;
+# TestCase rows keep only the hash and size. Blobs are decompressed on
+# first use into a local cache directory, from which the local executor
+# streams stdin and the expected output without holding them in memory.
+# The cached files can be deleted at any time. The directory is private to
+# the app (mode 0700) and every file is checked against its hash when
+# reused, so a swapped file can't turn a wrong answer into Accepted.
+
+COMPRESS_MIN_BYTES = 512  # smaller blobs are stored as-is
+PRUNE_GRACE = timedelta(hours=1)  # blobs this new may belong to a test case not yet committed
+
+
+def _compress(data, codec):
+    if len(data) >= COMPRESS_MIN_BYTES:
+        if codec == 'zstd' and zstandard is not None:
+            compressed, codec = zstandard.ZstdCompressor(level=9).compress(data), 'zstd'
+        else:
+            compressed, codec = gzip.compress(data, compresslevel=6), 'gzip'
+        if len(compressed) < len(data):
+            return codec, compressed
+    return 'none', data
+
+
+def _decompress_into(codec, data, fileobj):
+    if codec == 'none':
+        fileobj.write(data)
+    elif codec == 'gzip':
+        with gzip.GzipFile(fileobj=io.BytesIO(data)) as src:
+            shutil.copyfileobj(src, fileobj)
+    elif codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("This blob is zstd-compressed; install zstandard to read it")
+        zstandard.ZstdDecompressor().copy_stream(io.BytesIO(data), fileobj)
+    else:
+        raise ValueError(f"Unknown blob codec '{codec}'")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """
+    put() text to get its (hash, size); path(), open() or read_text() to
+    get it back. The model and the columns that reference blobs are set by
+    register() in app/models.py.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.model = None
+        self.references = ()
+        self.cache_dir = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        if app.config['BLOB_CACHE_DIR']:
+            self.cache_dir = app.config['BLOB_CACHE_DIR']
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            os.chmod(self.cache_dir, 0o700)
+        else:
+            self.cache_dir = tempfile.mkdtemp(prefix='examide-blobs-')  # created 0700
+            atexit.register(self._remove_cache_dir, self.cache_dir, os.getpid())
+        app.extensions['blobs'] = self
+
+    @staticmethod
+    def _remove_cache_dir(path, pid):
+        # Forked workers inherit this exit handler; only the creating process removes the directory
+        if os.getpid() == pid:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def register(self, model, *references):
+        self.model = model
+        self.references = references
+
+    # --- Writing ---
+
+    def put(self, text):
+        """Stores text (if new) and returns (hash, size); (None, 0) for None."""
+        return self.put_many([text])[0]
+
+    def put_many(self, texts):
+        """put() for many texts with one lookup and one insert."""
+        refs = []
+        new = {}
+        for text in texts:
+            if text is None:
+                refs.append((None, 0))
+                continue
+            data = text.encode('utf-8')
+            key = hashlib.sha256(data).hexdigest()
+            refs.append((key, len(data)))
+            new.setdefault(key, data)
+        if not new:
+            return refs
+
+        # Called from attribute setters, so a half-built TestCase must not be flushed
+        with db.session.no_autoflush:
+            existing = set(db.session.execute(
+                select(self.model.hash).where(self.model.hash.in_(list(new)))
+            ).scalars())
+            rows = []
+            now = datetime.utcnow()
+            for key, data in new.items():
+                if key in existing:
+                    continue
+                codec, stored = _compress(data, self.app.config['BLOB_CODEC'])
+                rows.append({'hash': key, 'size': len(data), 'codec': codec, 'data': stored, 'created_at': now})
+                self._write_cache(key, lambda f, data=data: f.write(data))
+            if rows:
+                self._insert(rows)
+        return refs
+
+    def _insert(self, rows):
+        table = self.model.__table__
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            db.session.execute(table.insert(), rows)
+            return
+        # Another request may have stored the same content in the meantime
+        db.session.execute(insert(table).on_conflict_do_nothing(index_elements=['hash']), rows)
+
+    # --- Reading ---
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _write_cache(self, key, write):
+        path = self._cache_path(key)
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return path
+
+    def path(self, key):
+        """A local file holding the blob's text, fetched from the database if needed."""
+        path = self._cache_path(key)
+        if os.path.exists(path):
+            if file_sha256(path) == key:
+                return path
+            # Truncated or tampered with; fetch it again
+            os.unlink(path)
+        row = db.session.execute(
+            select(self.model.codec, self.model.data).where(self.model.hash == key)
+        ).first()
+        if row is None:
+            raise KeyError(f"No test blob {key}")
+        codec, data = row
+        return self._write_cache(key, lambda f: _decompress_into(codec, data, f))
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def read_text(self, key):
+        if key is None:
+            return None
+        with self.open(key) as f:
+            return f.read().decode('utf-8')
+
+    # --- Cleanup ---
+
+    def prune(self):
+        """Deletes blobs no test case refers to any more. Returns how many."""
+        referenced = union(*[select(column).where(column.isnot(None)) for column in self.references])
+        result = db.session.execute(
+            self.model.__table__.delete()
+            .where(self.model.hash.notin_(referenced), self.model.created_at < datetime.utcnow() - PRUNE_GRACE)
+            .returning(self.model.hash)
+        )
+        deleted = result.scalars().all()
+        db.session.commit()
+        for key in deleted:
+            try:
+                os.unlink(self._cache_path(key))
+            except FileNotFoundError:
+                pass
+        return len(deleted)
+
+
+blob_store = BlobStore()
+
+
+@click.command('prune-test-blobs')
+@with_appcontext
+def prune_test_blobs_command():
+    """Delete test case data no longer used by any test case."""
+    click.echo(f"Deleted {blob_store.prune()} unused blobs.")
@@ -0,0 +1,183 @@
+import codecs
+import math
+from itertools import zip_longest
+
+# Output checking modes for CodingQuestion.checker
+MODE_EXACT = 'exact'  # Judge0's rule: identical apart from trailing whitespace at the very end
+MODE_LINES = 'lines'  # line by line, ignoring trailing spaces and trailing blank lines
+MODE_TOKENS = 'tokens'  # whitespace-separated tokens; any amount/kind of whitespace matches
+MODE_FLOAT = 'float'  # tokens, with numeric tokens compared within a tolerance
+
+CHECKER_MODES = [
+    (MODE_EXACT, 'Exact match'),
+    (MODE_LINES, 'Line by line (ignore trailing spaces)'),
+    (MODE_TOKENS, 'Token by token (ignore whitespace)'),
+    (MODE_FLOAT, 'Tokens with float tolerance'),
+]
+
+DEFAULT_FLOAT_TOLERANCE = 1e-6
+CHUNK_SIZE = 64 * 1024
+
+_custom_checkers = {}
+_MISSING = object()
+
+
+def register_checker(name, label=None):
+    """
+    Registers a custom checker usable as CodingQuestion.checker.
+
+    The function is called as fn(expected_chunks, actual_chunks) with two
+    iterables of text chunks and returns True when the output is correct.
+    """
+    def decorator(fn):
+        _custom_checkers[name] = fn
+        CHECKER_MODES.append((name, label or name))
+        return fn
+    return decorator
+
+
+def iter_text_chunks(fileobj, size=CHUNK_SIZE):
+    """Decodes a binary file object as UTF-8 text, one chunk at a time."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        data = fileobj.read(size)
+        if not data:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            return
+        text = decoder.decode(data)
+        if text:
+            yield text
+
+
+def _chunks(value):
+    if value is None:
+        return
+    if isinstance(value, str):
+        yield value
+    else:
+        yield from value
+
+
+def _rstripped(chunks):
+    """The text stream with trailing whitespace at the very end removed."""
+    pending = ''
+    for chunk in chunks:
+        data = pending + chunk
+        stripped = data.rstrip()
+        # Hold back trailing whitespace until we know more text follows
+        pending = data[len(stripped):]
+        if stripped:
+            yield stripped
+
+
+def _streams_equal(a, b):
+    """Compares two text chunk streams without joining them."""
+    a, b = iter(a), iter(b)
+    buf_a = buf_b = ''
+    while True:
+        if not buf_a:
+            buf_a = next(a, None)
+        if not buf_b:
+            buf_b = next(b, None)
+        if buf_a is None or buf_b is None:
+            # Equal only if both ran out together (empty chunks aside)
+            rest_a = buf_a or ''.join(_take_nonempty(a))
+            rest_b = buf_b or ''.join(_take_nonempty(b))
+            return not rest_a and not rest_b
+        n = min(len(buf_a), len(buf_b))
+        if buf_a[:n] != buf_b[:n]:
+            return False
+        buf_a, buf_b = buf_a[n:], buf_b[n:]
+
+
+def _take_nonempty(it):
+    for chunk in it:
+        if chunk:
+            yield chunk
+            return
+
+
+def _lines(chunks):
+    """Lines with trailing whitespace removed, without trailing blank lines."""
+    carry = ''
+    blank_run = 0
+
+    def emit(line):
+        nonlocal blank_run
+        line = line.rstrip()
+        if not line:
+            blank_run += 1
+            return
+        yield from [''] * blank_run
+        blank_run = 0
+        yield line
+
+    for chunk in chunks:
+        lines = (carry + chunk).split('\n')
+        carry = lines.pop()
+        for line in lines:
+            yield from emit(line)
+    yield from emit(carry)
+
+
+def _tokens(chunks):
+    """Whitespace-separated tokens, split correctly across chunk boundaries."""
+    carry = ''
+    for chunk in chunks:
+        data = carry + chunk
+        parts = data.split()
+        # A token touching the end of the chunk may continue in the next one
+        carry = parts.pop() if parts and not data[-1].isspace() else ''
+        yield from parts
+    if carry:
+        yield carry
+
+
+def _float_equal(expected, actual, tolerance):
+    if expected == actual:
+        return True
+    try:
+        e, a = float(expected), float(actual)
+    except ValueError:
+        return False
+    if math.isnan(e) or math.isnan(a):
+        return math.isnan(e) and math.isnan(a)
+    if math.isinf(e) or math.isinf(a):
+        # "inf" and "Infinity" spell the same value; inf - inf is nan, and
+        # any tolerance scaled by inf would accept every finite answer
+        return e == a
+    # Absolute tolerance for small values, relative for large ones
+    return abs(e - a) <= tolerance * max(1.0, abs(e))
+
+
+def _units_equal(expected, actual, eq):
+    for e, a in zip_longest(expected, actual, fillvalue=_MISSING):
+        if e is _MISSING or a is _MISSING or not eq(e, a):
+            return False
+    return True
+
+
+def compare(expected, actual, mode=MODE_EXACT, tolerance=None):
+    """
+    True if `actual` output is correct for `expected` under `mode`.
+
+    Both sides may be strings or iterables of text chunks (for example
+    iter_text_chunks over a program's stdout file), so multi-megabyte
+    outputs are compared incrementally and the comparison stops at the
+    first mismatch.
+    """
+    expected, actual = _chunks(expected), _chunks(actual)
+    if mode == MODE_EXACT:
+        return _streams_equal(_rstripped(expected), _rstripped(actual))
+    if mode == MODE_LINES:
+        return _units_equal(_lines(expected), _lines(actual), str.__eq__)
+    if mode == MODE_TOKENS:
+        return _units_equal(_tokens(expected), _tokens(actual), str.__eq__)
+    if mode == MODE_FLOAT:
+        tolerance = DEFAULT_FLOAT_TOLERANCE if tolerance is None else tolerance
+        return _units_equal(_tokens(expected), _tokens(actual), lambda e, a: _float_equal(e, a, tolerance))
+    if mode in _custom_checkers:
+        return bool(_custom_checkers[mode](expected, actual))
+    raise ValueError(f"Unknown checker mode: {mode}")
@@ -0,0 +1,642 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from .checkers import compare, iter_text_chunks, MODE_EXACT
+from .judge0 import (
+    STATUS_ACCEPTED, STATUS_WRONG_ANSWER, STATUS_TIME_LIMIT_EXCEEDED,
+    STATUS_COMPILATION_ERROR, STATUS_INTERNAL_ERROR
+)
+
+log = logging.getLogger(__name__)
+
+# Judge0 runtime error statuses, so local results look like the API's
+STATUS_RUNTIME_SIGSEGV = 7
+STATUS_RUNTIME_SIGXFSZ = 8
+STATUS_RUNTIME_SIGFPE = 9
+STATUS_RUNTIME_SIGABRT = 10
+STATUS_RUNTIME_NZEC = 11
+STATUS_RUNTIME_OTHER = 12
+
+STATUS_DESCRIPTIONS = {
+    STATUS_ACCEPTED: "Accepted",
+    STATUS_WRONG_ANSWER: "Wrong Answer",
+    STATUS_TIME_LIMIT_EXCEEDED: "Time Limit Exceeded",
+    STATUS_COMPILATION_ERROR: "Compilation Error",
+    STATUS_RUNTIME_SIGSEGV: "Runtime Error (SIGSEGV)",
+    STATUS_RUNTIME_SIGXFSZ: "Runtime Error (SIGXFSZ)",
+    STATUS_RUNTIME_SIGFPE: "Runtime Error (SIGFPE)",
+    STATUS_RUNTIME_SIGABRT: "Runtime Error (SIGABRT)",
+    STATUS_RUNTIME_NZEC: "Runtime Error (NZEC)",
+    STATUS_RUNTIME_OTHER: "Runtime Error (Other)",
+    STATUS_INTERNAL_ERROR: "Internal Error",
+}
+
+SIGNAL_STATUSES = {
+    signal.SIGSEGV: STATUS_RUNTIME_SIGSEGV,
+    signal.SIGXFSZ: STATUS_RUNTIME_SIGXFSZ,
+    signal.SIGFPE: STATUS_RUNTIME_SIGFPE,
+    signal.SIGABRT: STATUS_RUNTIME_SIGABRT,
+    signal.SIGXCPU: STATUS_TIME_LIMIT_EXCEEDED,
+}
+
+# Supported languages, keyed by Judge0 language id. `{memory_kb}` and
+# `{memory_mb}` in commands are filled in from the memory limit, `{build}`
+# with the directory holding the compiled artifact. JVMs and V8 reserve far
+# more address space than they use, so for them the heap flag is the memory
+# limit instead of RLIMIT_AS.
+LANGUAGES = {
+    71: {
+        "name": "Python (3)",
+        "source": "main.py",
+        "run": ["python3", "main.py"],
+        "limit_address_space": True,
+    },
+    50: {
+        "name": "C (GCC)",
+        "source": "main.c",
+        "compile": ["gcc", "-O2", "-std=c11", "-o", "main", "main.c", "-lm"],
+        "run": ["{build}/main"],
+        "limit_address_space": True,
+    },
+    54: {
+        "name": "C++ (GCC)",
+        "source": "main.cpp",
+        "compile": ["g++", "-O2", "-std=c++17", "-o", "main", "main.cpp"],
+        "run": ["{build}/main"],
+        "limit_address_space": True,
+    },
+    62: {
+        "name": "Java (OpenJDK)",
+        "source": "Main.java",
+        "compile": ["javac", "Main.java"],
+        "run": ["java", "-Xmx{memory_kb}k", "-Xss64m", "-cp", "{build}", "Main"],
+        "limit_address_space": False,
+    },
+    63: {
+        "name": "JavaScript (Node.js)",
+        "source": "main.js",
+        "run": ["node", "--max-old-space-size={memory_mb}", "main.js"],
+        "limit_address_space": False,
+    },
+}
+
+
+# Resolved limits of one run: CPU and wall seconds, memory in KB
+Limits = namedtuple('Limits', 'cpu wall memory')
+
+# unshare options, tried in order at startup; the first the host allows is
+# used. Own user, network, mount and PID namespaces: no network, no view of
+# other processes (or their open files), and the executor's files hidden.
+# The second form is for hosts that refuse a fresh /proc, such as some
+# containers.
+SANDBOX_OPTIONS = [
+    ["--user", "--map-root-user", "--net", "--mount", "--pid", "--fork", "--kill-child", "--mount-proc"],
+    ["--user", "--map-root-user", "--net", "--mount"],
+]
+
+# Run by sh inside the sandbox's mount namespace: binds the working
+# directory onto the empty directory given first and moves there, covers
+# each following path up to "--" with an empty tmpfs, then execs the rest.
+HIDE_SCRIPT = (
+    'set -e; '
+    'mount --bind "$PWD" "$1"; cd "$1"; shift; '
+    'while [ "$1" != -- ]; do mount -t tmpfs -o size=4k,mode=0555 examide-hidden "$1"; shift; done; '
+    'shift; exec "$@"'
+)
+
+# Started in place of a program, as `python -c RUN_SHIM fd name=soft:hard
+# ... -- argv`: forks, sets the rlimits in the child and execs the program
+# there, then writes the program's wait status, CPU seconds and peak RSS to
+# fd as JSON and kills whatever the program left running. Rlimits are set
+# in a fresh single-threaded process, never in a preexec_fn, which isn't
+# safe to run from the executor's threads. The program must not be PID 1
+# of its namespace, which ignores the signals it sends itself (abort(),
+# raise(SIGSEGV), ...) and would turn them into clean exits.
+RUN_SHIM = '''\
+import json, os, resource, signal, sys
+fd, args = int(sys.argv[1]), sys.argv[2:]
+limits = []
+while args[0] != "--":
+    name, value = args.pop(0).split("=")
+    soft, hard = value.split(":")
+    limits.append((getattr(resource, "RLIMIT_" + name.upper()), (int(soft), int(hard))))
+pid = os.fork()
+if pid == 0:
+    try:
+        os.close(fd)
+        for limit, values in limits:
+            resource.setrlimit(limit, values)
+        os.execvp(args[1], args[1:])
+    except OSError as e:
+        os.write(2, f"{args[1]}: {e}\\n".encode())
+    os._exit(127)
+while True:
+    # Also reaps the orphans reparented to us as PID 1
+    child, status, usage = os.wait4(-1, 0)
+    if child == pid:
+        break
+os.write(fd, json.dumps([status, usage.ru_utime + usage.ru_stime, usage.ru_maxrss]).encode())
+os.close(fd)
+try:
+    # As PID 1 this kills every other process in the namespace, otherwise the process group (and the shim)
+    os.kill(-1 if os.getpid() == 1 else 0, signal.SIGKILL)
+except ProcessLookupError:
+    pass
+'''
+
+
+def _result(status_id, stdout=None, stderr=None, compile_output=None, message=None, time_used=None, memory=None):
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "compile_output": compile_output,
+        "message": message,
+        "status": {"id": status_id, "description": STATUS_DESCRIPTIONS[status_id]},
+        "time": f"{time_used:.3f}" if time_used is not None else None,
+        "memory": memory,
+    }
+
+
+class _HashingReader:
+    """A binary file wrapper that hashes what is read through it."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.digest.update(data)
+        return data
+
+    def hexdigest(self):
+        """The sha256 of the whole file; reads whatever is left first."""
+        for data in iter(lambda: self.read(1024 * 1024), b''):
+            pass
+        return self.digest.hexdigest()
+
+
+def _copy_hashed(src, dst):
+    """Copies src to dst and returns the sha256 of the data."""
+    reader = _HashingReader(src)
+    shutil.copyfileobj(reader, dst)
+    return reader.digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Compiled programs keyed by sha256(language_id, source), so a submission
+    is compiled once and then run against every test case (and every repeat
+    "Run" click). Compilation errors are cached too. Entries are evicted
+    least-recently-used once their total size passes `max_bytes`; entries in
+    use by a running program are never evicted.
+
+    Each process builds into its own subdirectory of `root`, removed when
+    it exits, so workers forked from one preloaded app never share one.
+    """
+
+    def __init__(self, root, max_bytes, max_entries=1000):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> {"path", "size", "error", "pins"}
+        self._key_locks = {}  # key -> [lock, threads using it]
+        self._lock = threading.Lock()
+        self._size = 0
+        self._pid = None
+
+    @staticmethod
+    def key(language_id, source_code):
+        return hashlib.sha256(f"{language_id}\0{source_code}".encode('utf-8')).hexdigest()
+
+    def acquire(self, key, build):
+        """
+        Returns the pinned entry for `key`, calling build(path) -> error or
+        None to create it if needed. Callers must release() the key.
+        """
+        with self._lock:
+            directory = self._directory()
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+        try:
+            # Concurrent test cases of the same submission wait for one compile
+            with key_lock[0]:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        self._entries.move_to_end(key)
+                        entry["pins"] += 1
+                        return entry
+
+                path = os.path.join(directory, key)
+                shutil.rmtree(path, ignore_errors=True)
+                try:
+                    os.makedirs(path)
+                    error = build(path)
+                    size = 0 if error else sum(
+                        os.path.getsize(os.path.join(dirpath, name))
+                        for dirpath, _, names in os.walk(path) for name in names
+                    )
+                except BaseException:
+                    shutil.rmtree(path, ignore_errors=True)
+                    raise
+                if error:
+                    shutil.rmtree(path, ignore_errors=True)
+
+                with self._lock:
+                    entry = {"path": path, "size": size, "error": error, "pins": 1}
+                    self._entries[key] = entry
+                    self._size += size
+                    self._evict()
+                return entry
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                if not key_lock[1]:
+                    del self._key_locks[key]
+
+    def _directory(self):
+        # Called with self._lock held
+        pid = os.getpid()
+        if pid != self._pid:
+            # First use in this process; anything inherited belongs to the parent
+            self._pid = pid
+            self._entries.clear()
+            self._size = 0
+            atexit.register(shutil.rmtree, os.path.join(self.root, str(pid)), True)
+        return os.path.join(self.root, str(pid))
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["pins"] -= 1
+            self._evict()
+
+    def _evict(self):
+        # Called with self._lock held
+        for key in list(self._entries):
+            if self._size <= self.max_bytes and len(self._entries) <= self.max_entries:
+                break
+            entry = self._entries[key]
+            if entry["pins"] > 0:
+                continue
+            del self._entries[key]
+            self._size -= entry["size"]
+            shutil.rmtree(entry["path"], ignore_errors=True)
+
+
+class LocalExecutor:
+    """
+    Runs submissions on this machine instead of the Judge0 API.
+
+    Each test case runs in a fresh temporary directory as its own process
+    session, with RLIMIT_CPU, RLIMIT_AS (where the runtime allows it) and
+    RLIMIT_FSIZE applied, a wall-clock timeout and a scrubbed environment.
+    Where the host allows unprivileged user namespaces (probed once at
+    startup) it also gets an empty network namespace, its own PID
+    namespace, RLIMIT_NPROC against fork bombs, and a mount namespace in
+    which the artifact cache, other runs and `hidden_paths` are covered up.
+    Results use the same shape as Judge0 (`stdout`, `status`, `time`,
+    `memory`, ...), so callers of submit_to_judge0 can't tell the backends
+    apart.
+
+    Compiled languages are built once per distinct source into an
+    ArtifactCache and every test case runs that artifact, so a 10-case C++
+    question costs one g++ invocation, not ten.
+
+    At most `max_workers` sandboxes (default: one per core) run at a time.
+    """
+
+    def __init__(self, max_workers=None, cpu_time_limit=2, wall_time_limit=5,
+                 memory_limit=256000, output_limit=16 * 1024 * 1024,
+                 compile_timeout=30, isolate=True, workdir=None,
+                 artifact_cache_bytes=256 * 1024 * 1024, stdout_return_limit=1024 * 1024,
+                 max_processes=256, hidden_paths=()):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cpu_time_limit = cpu_time_limit
+        self.wall_time_limit = wall_time_limit
+        self.memory_limit = memory_limit  # KB, like Judge0's memory_limit
+        self.output_limit = output_limit  # bytes
+        self.compile_timeout = compile_timeout
+        self.stdout_return_limit = stdout_return_limit  # bytes of stdout put in the result
+        self.max_processes = max_processes  # RLIMIT_NPROC, processes and threads per program
+        # Private to this executor: compiled artifacts and the runs' working
+        # directories under files/, hidden from programs, which see their own
+        # working directory at jail/
+        self.root = tempfile.mkdtemp(prefix="examide-executor-", dir=workdir)
+        self.runs = os.path.join(self.root, "files", "runs")
+        self.jail = os.path.join(self.root, "jail")
+        os.makedirs(self.runs)
+        os.makedirs(self.jail)
+        self.artifacts = ArtifactCache(os.path.join(self.root, "files", "artifacts"), artifact_cache_bytes)
+        self.hidden_paths = [os.path.join(self.root, "files"), *hidden_paths]
+        atexit.register(self._remove_root, os.getpid())
+        self._sandbox_prefix = self._probe_sandbox() if isolate else []
+        # Each task only supervises a child process, so threads are enough here
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='executor')
+
+    @classmethod
+    def from_config(cls, config, hidden_paths=()):
+        return cls(
+            max_workers=config['LOCAL_EXECUTOR_WORKERS'],
+            cpu_time_limit=config['LOCAL_EXECUTOR_CPU_TIME_LIMIT'],
+            wall_time_limit=config['LOCAL_EXECUTOR_WALL_TIME_LIMIT'],
+            memory_limit=config['LOCAL_EXECUTOR_MEMORY_LIMIT'],
+            output_limit=config['LOCAL_EXECUTOR_OUTPUT_LIMIT'],
+            compile_timeout=config['LOCAL_EXECUTOR_COMPILE_TIMEOUT'],
+            isolate=config['LOCAL_EXECUTOR_ISOLATE'],
+            workdir=config['LOCAL_EXECUTOR_WORKDIR'],
+            artifact_cache_bytes=config['LOCAL_EXECUTOR_ARTIFACT_CACHE_BYTES'],
+            stdout_return_limit=config['LOCAL_EXECUTOR_STDOUT_RETURN_LIMIT'],
+            max_processes=config['LOCAL_EXECUTOR_MAX_PROCESSES'],
+            hidden_paths=hidden_paths,
+        )
+
+    def run(self, payload):
+        """Runs one Judge0-style payload and returns a Judge0-style result."""
+        return self.submit(payload).result()
+
+    def submit(self, payload):
+        """run() without waiting: a concurrent.futures.Future of the result."""
+        return self._pool.submit(self._execute, payload)
+
+    def run_batch(self, payloads):
+        """
+        Runs payloads concurrently; results come back in the same order.
+        Payloads sharing a source are compiled once, by whichever case gets
+        there first, while the others wait for the artifact.
+        """
+        futures = [self._pool.submit(self._execute, p) for p in payloads]
+        return [f.result() for f in futures]
+
+    def _remove_root(self, pid):
+        # Forked workers inherit this exit handler; only the creating process removes the root
+        if os.getpid() == pid:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    # --- Sandboxing ---
+
+    def _probe_sandbox(self):
+        """The unshare prefix to run programs with, or [] where the host allows none."""
+        unshare = shutil.which("unshare")
+        if unshare is None:
+            log.warning("unshare not found; the local executor runs programs without namespaces, "
+                        "so they can reach the network and the filesystem and fork without limit")
+            return []
+        error = None
+        for options in SANDBOX_OPTIONS:
+            prefix = [unshare, *options]
+            try:
+                # A trial run of exactly what every program goes through
+                probe = subprocess.run(
+                    prefix + ["sh", "-c", HIDE_SCRIPT, "sh", self.jail, *self.hidden_paths, "--", "true"],
+                    cwd=self.runs, capture_output=True, timeout=10
+                )
+            except (OSError, subprocess.SubprocessError) as e:
+                error = str(e)
+                continue
+            if probe.returncode == 0:
+                if options is not SANDBOX_OPTIONS[0]:
+                    log.warning("No PID namespace on this host; sandboxed programs can see other processes")
+                return prefix
+            error = probe.stderr.decode('utf-8', errors='replace').strip() or f"exit status {probe.returncode}"
+        log.warning("Unprivileged user namespaces are unavailable (%s); the local executor runs programs "
+                    "without namespaces, so they can reach the network and the filesystem and fork "
+                    "without limit", error)
+        return []
+
+    def _payload_limits(self, payload):
+        """The payload's Judge0 limit fields, falling back to this executor's defaults."""
+        return Limits(
+            cpu=float(payload.get("cpu_time_limit") or self.cpu_time_limit),
+            wall=float(payload.get("wall_time_limit") or self.wall_time_limit),
+            memory=int(payload.get("memory_limit") or self.memory_limit),
+        )
+
+    def _rlimits(self, spec, limits):
+        """(name, soft, hard) for each rlimit of a run, named as prlimit names them."""
+        cpu = int(limits.cpu) + 1
+        rlimits = [("cpu", cpu, cpu + 1), ("fsize", self.output_limit, self.output_limit), ("core", 0, 0)]
+        if spec.get("limit_address_space", True):
+            memory = limits.memory * 1024
+            rlimits.append(("as", memory, memory))
+        if self._sandbox_prefix and self.max_processes:
+            # Counted per user namespace, so for this program alone; outside
+            # one it would count every process of the app's user
+            rlimits.append(("nproc", self.max_processes, self.max_processes))
+        return rlimits
+
+    def _command(self, argv, build=None, memory_limit=None, rlimits=None, report_fd=None):
+        memory_limit = memory_limit or self.memory_limit
+        command = [
+            arg.format(memory_kb=memory_limit, memory_mb=max(memory_limit // 1024, 16), build=build)
+            for arg in argv
+        ]
+        if rlimits is not None:
+            settings = [f"{name}={soft}:{hard}" for name, soft, hard in rlimits]
+            command = [sys.executable, "-I", "-S", "-c", RUN_SHIM, str(report_fd)] + settings + ["--"] + command
+        if self._sandbox_prefix:
+            command = self._sandbox_prefix + ["sh", "-c", HIDE_SCRIPT, "sh", self.jail, *self.hidden_paths, "--"] + command
+        return command
+
+    def _env(self, cwd):
+        home = self.jail if self._sandbox_prefix else cwd
+        return {"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "HOME": home, "LANG": "C.UTF-8"}
+
+    def _spawn(self, argv, cwd, stdin, stdout, stderr, rlimits, timeout, build=None, memory_limit=None):
+        """
+        Runs argv to completion and returns (wait status, CPU seconds, peak
+        RSS in KB, timed_out). With rlimits the program runs under RUN_SHIM,
+        which reports its own figures; otherwise os.wait4 gives the child's,
+        even when many children run concurrently.
+        """
+        report_r = report_w = None
+        if rlimits is not None:
+            report_r, report_w = os.pipe()
+        try:
+            proc = subprocess.Popen(
+                self._command(argv, build, memory_limit, rlimits, report_w), cwd=cwd, env=self._env(cwd),
+                stdin=stdin, stdout=stdout, stderr=stderr, start_new_session=True,
+                pass_fds=(report_w,) if report_w is not None else ()
+            )
+        except BaseException:
+            if report_r is not None:
+                os.close(report_r)
+            raise
+        finally:
+            if report_w is not None:
+                os.close(report_w)
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            _, status, rusage = os.wait4(proc.pid, 0)
+        finally:
+            timer.cancel()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        cpu_time, memory = rusage.ru_utime + rusage.ru_stime, rusage.ru_maxrss  # KB on Linux
+
+        if report_r is not None:
+            with os.fdopen(report_r, "rb") as f:
+                report = f.read()
+            # Empty if the shim was killed first (the wall-clock timeout)
+            if report:
+                status, cpu_time, memory = json.loads(report)
+        return status, cpu_time, memory, timed_out.is_set()
+
+    def _compile(self, spec, source_code, cwd):
+        """Builds into `cwd`; returns None on success or a Compilation Error result."""
+        with open(os.path.join(cwd, spec["source"]), "w", encoding="utf-8") as f:
+            f.write(source_code)
+        with open(os.path.join(cwd, "compile.out"), "w+b") as out:
+            status, _, _, timed_out = self._spawn(
+                spec["compile"], cwd, subprocess.DEVNULL, out, subprocess.STDOUT,
+                None, self.compile_timeout
+            )
+            if os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0 and not timed_out:
+                return None
+            out.seek(0)
+            output = out.read(64 * 1024).decode('utf-8', errors='replace')
+        if timed_out:
+            output += "\nCompilation timed out"
+        return _result(STATUS_COMPILATION_ERROR, compile_output=output)
+
+    def _run_program(self, spec, cwd, stdin_text, expected_output, checker=None, build=None, limits=None,
+                     stdin_file=None, stdin_hash=None, expected_output_file=None, expected_output_hash=None):
+        """
+        stdin and the expected output come either as text or, for test case
+        data, as files in the blob cache with their hashes. The program only
+        ever gets a private copy of stdin; the expected output is read in
+        place, by the executor alone, and checked against its hash.
+        """
+        limits = limits or Limits(self.cpu_time_limit, self.wall_time_limit, self.memory_limit)
+        if build is not None:
+            # A private copy, run by relative path: the artifact cache is hidden from the program
+            shutil.copytree(build, os.path.join(cwd, "build"), symlinks=True)
+            build = "build"
+        stdin_path = os.path.join(cwd, "stdin.txt")
+        if stdin_file is not None:
+            with open(stdin_file, "rb") as src, open(stdin_path, "wb") as dst:
+                if _copy_hashed(src, dst) != stdin_hash:
+                    return self._corrupt_blob(stdin_file)
+        else:
+            with open(stdin_path, "w", encoding="utf-8") as f:
+                f.write(stdin_text or "")
+
+        start = time.monotonic()
+        with open(stdin_path, "rb") as fin, \
+                open(os.path.join(cwd, "stdout.txt"), "w+b") as fout, \
+                open(os.path.join(cwd, "stderr.txt"), "w+b") as ferr:
+            status, cpu_time, memory, timed_out = self._spawn(
+                spec["run"], cwd, fin, fout, ferr, self._rlimits(spec, limits), limits.wall, build, limits.memory
+            )
+            wall = time.monotonic() - start
+
+            # Output is checked straight from the file, chunk by chunk, so a
+            # multi-megabyte answer is never held in memory as a whole
+            passed = None
+            checker = checker or {}
+            if expected_output_file is not None:
+                fout.seek(0)
+                with open(expected_output_file, "rb") as fexpected:
+                    expected_reader = _HashingReader(fexpected)
+                    passed = compare(
+                        iter_text_chunks(expected_reader), iter_text_chunks(fout),
+                        checker.get("mode", MODE_EXACT), checker.get("tolerance")
+                    )
+                    # compare() may stop at the first difference; hash the rest too
+                    if expected_reader.hexdigest() != expected_output_hash:
+                        return self._corrupt_blob(expected_output_file)
+            elif expected_output is not None:
+                fout.seek(0)
+                passed = compare(
+                    expected_output, iter_text_chunks(fout),
+                    checker.get("mode", MODE_EXACT), checker.get("tolerance")
+                )
+            fout.seek(0)
+            stdout = fout.read(self.stdout_return_limit).decode('utf-8', errors='replace')
+            ferr.seek(0)
+            stderr = ferr.read(64 * 1024).decode('utf-8', errors='replace')
+
+        common = dict(stdout=stdout, stderr=stderr or None, time_used=cpu_time, memory=memory)
+
+        if timed_out or cpu_time > limits.cpu:
+            return _result(STATUS_TIME_LIMIT_EXCEEDED, message=f"Killed after {wall:.2f}s", **common)
+        if os.WIFSIGNALED(status):
+            sig = os.WTERMSIG(status)
+            return _result(SIGNAL_STATUSES.get(sig, STATUS_RUNTIME_OTHER), message=f"Killed by signal {sig}", **common)
+        if os.WEXITSTATUS(status) != 0:
+            return _result(STATUS_RUNTIME_NZEC, message=f"Exited with status {os.WEXITSTATUS(status)}", **common)
+        if passed is False:
+            return _result(STATUS_WRONG_ANSWER, **common)
+        return _result(STATUS_ACCEPTED, **common)
+
+    def _corrupt_blob(self, path):
+        # The next blob_store.path() fetches it again from the database
+        log.error("Test data %s does not match its hash", path)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        return _result(STATUS_INTERNAL_ERROR, message="Test data failed its integrity check")
+
+    def _execute(self, payload):
+        spec = LANGUAGES.get(int(payload.get("language_id") or 0))
+        if spec is None:
+            return _result(STATUS_INTERNAL_ERROR, message=f"Unsupported language_id {payload.get('language_id')}")
+
+        source_code = payload.get("source_code") or ""
+        stdin, expected_output = payload.get("stdin"), payload.get("expected_output")
+        checker = payload.get("checker")
+        limits = self._payload_limits(payload)
+        files = {name: payload.get(name) for name in
+                 ("stdin_file", "stdin_hash", "expected_output_file", "expected_output_hash")}
+        try:
+            if not spec.get("compile"):
+                with tempfile.TemporaryDirectory(dir=self.runs) as cwd:
+                    with open(os.path.join(cwd, spec["source"]), "w", encoding="utf-8") as f:
+                        f.write(source_code)
+                    return self._run_program(spec, cwd, stdin, expected_output, checker, limits=limits, **files)
+
+            key = ArtifactCache.key(payload.get("language_id"), source_code)
+            artifact = self.artifacts.acquire(key, lambda path: self._compile(spec, source_code, path))
+            try:
+                if artifact["error"] is not None:
+                    return artifact["error"]
+                # Fresh working dir per run so programs can't touch the shared artifact
+                with tempfile.TemporaryDirectory(dir=self.runs) as cwd:
+                    return self._run_program(
+                        spec, cwd, stdin, expected_output, checker, build=artifact["path"], limits=limits, **files
+                    )
+            finally:
+                self.artifacts.release(key)
+        except OSError as e:
+            # Missing toolchain, full disk, ...
+            log.exception("Local execution failed")
+            return _result(STATUS_INTERNAL_ERROR, message=str(e))
+
+
+def get_executor():
+    """The local executor when EXECUTOR_BACKEND is 'local', otherwise None (use the Judge0 API)."""
+    return current_app.extensions.get('executor')
@@ -1,8 +1,12 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, IntegerField, TextAreaField, SelectField, FieldList, FormField, RadioField
-from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, Optional
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import StringField, PasswordField, SubmitField, IntegerField, TextAreaField, SelectField, FieldList, FormField, RadioField, FloatField, BooleanField
+from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, Optional, NumberRange
 from wtforms import Form  # <--- 1. IMPORT THE CORRECT BASE FORM CLASS
 from .models import User
+from .grading import GRADING_MODES
+from .checkers import CHECKER_MODES
+from .executors import LANGUAGES
 
 class RegistrationForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=4, max=64)])
@@ -29,6 +33,7 @@ class LoginForm(FlaskForm):
 class TestForm(FlaskForm):
     name = StringField('Test Name', validators=[DataRequired()])
     duration_minutes = IntegerField('Duration (in minutes)', validators=[DataRequired()])
+    grading_mode = SelectField('Coding Questions Scoring', choices=GRADING_MODES, default='partial')
     submit = SubmitField('Create Test')
 
 class MCQOptionForm(Form): # Also a good practice to use Form here
@@ -59,6 +64,17 @@ class CodingQuestionForm(FlaskForm):
     difficulty = SelectField('Difficulty', 
                              choices=[('Easy', 'Easy'), ('Medium', 'Medium'), ('Hard', 'Hard')], 
                              validators=[DataRequired()])
+    grading_mode = SelectField('Scoring', choices=[('', 'Same as test')] + GRADING_MODES, validators=[Optional()])
+    checker = SelectField('Output Checking', choices=CHECKER_MODES, default='exact')
+    float_tolerance = FloatField('Float Tolerance', validators=[Optional()])
+    reference_language = SelectField('Reference Solution Language',
+                                     choices=[('', 'No reference solution')] + [(str(i), spec['name']) for i, spec in LANGUAGES.items()],
+                                     validators=[Optional()])
+    reference_solution = TextAreaField('Reference Solution', validators=[Optional()])
+    cpu_time_limit = FloatField('CPU Time Limit (seconds)', validators=[Optional(), NumberRange(min=0.1, max=15)])
+    wall_time_limit = FloatField('Wall Time Limit (seconds)', validators=[Optional(), NumberRange(min=0.1, max=20)])
+    memory_limit = IntegerField('Memory Limit (KB)', validators=[Optional(), NumberRange(min=2048, max=512000)])
+    auto_limits = BooleanField('Derive per-case limits from the reference solution')
     
     starter_code_python = TextAreaField('Starter Code (Python)', validators=[Optional()])
     starter_code_java = TextAreaField('Starter Code (Java)', validators=[Optional()])
@@ -67,4 +83,26 @@ class CodingQuestionForm(FlaskForm):
     starter_code_javascript = TextAreaField('Starter Code (starter_code_javascript)', validators=[Optional()])
     
     test_cases = FieldList(FormField(TestCaseForm), min_entries=2, max_entries=10)
-    submit = SubmitField('Add Coding Question')
\ No newline at end of file
+    submit = SubmitField('Add Coding Question')
+
+class ImportQuestionsForm(FlaskForm):
+    """Upload form for bulk question import."""
+    file = FileField('Questions File', validators=[
+        FileRequired(), FileAllowed(['csv', 'json', 'jsonl', 'ndjson', 'yaml', 'yml'], 'CSV, JSON or YAML files only')
+    ])
+    submit = SubmitField('Import Questions')
+
+class ProvisionCandidatesForm(FlaskForm):
+    """Upload form for creating candidate accounts in bulk."""
+    file = FileField('Candidates CSV (username, email, password)', validators=[
+        FileRequired(), FileAllowed(['csv'], 'CSV files only')
+    ])
+    submit = SubmitField('Create Accounts')
+
+class ValidateQuestionForm(FlaskForm):
+    """Re-runs a coding question's reference solution (CSRF-protected button)."""
+    submit = SubmitField('Validate')
+
+class PublishTestForm(FlaskForm):
+    """Freezes a test's paper for candidates (CSRF-protected button)."""
+    submit = SubmitField('Publish Test')
\ No newline at end of file
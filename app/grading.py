@@ -0,0 +1,265 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from flask import current_app
+from . import db
+from .models import TestCase
+from .judge0 import run_payload, submit_batch_to_judge0, STATUS_ACCEPTED
+from .executors import get_executor
+from .blobs import blob_store
+from .checkers import MODE_EXACT
+
+# Grading modes, set per Test and optionally overridden per CodingQuestion
+MODE_PARTIAL = 'partial'  # marks in proportion to the test cases passed
+MODE_ALL_OR_NOTHING = 'all_or_nothing'  # full marks only if every case passes
+
+GRADING_MODES = [(MODE_PARTIAL, 'Partial marks'), (MODE_ALL_OR_NOTHING, 'All or nothing')]
+
+# Visible test case output echoed back to the candidate is capped at this size
+STDOUT_PREVIEW_LIMIT = 64 * 1024
+
+
+def grading_mode(question):
+    """The question's own grading mode, falling back to its test's."""
+    return question.grading_mode or question.test.grading_mode or MODE_PARTIAL
+
+
+def _run_pool(submissions):
+    """Runs single submissions concurrently on a bounded thread pool."""
+    app = current_app._get_current_object()
+    max_workers = min(app.config['GRADING_MAX_WORKERS'], len(submissions)) or 1
+
+    def run(submission):
+        # Worker threads need their own app context to read the config
+        with app.app_context():
+            return run_payload(submission)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(run, submissions))
+
+
+def _verdict(test_case, result):
+    status = result.get("status") or {}
+    return {
+        "test_case_id": test_case.id,
+        "is_hidden": test_case.is_hidden,
+        "passed": not result.get("error") and status.get("id") == STATUS_ACCEPTED,
+        "status": status.get("description") or result.get("message", "Error"),
+        "stdout": None if test_case.is_hidden else (result.get("stdout") or '')[:STDOUT_PREVIEW_LIMIT],
+        "time": result.get("time"),
+        "memory": result.get("memory"),
+    }
+
+
+def _skipped(test_case):
+    return {
+        "test_case_id": test_case.id,
+        "is_hidden": test_case.is_hidden,
+        "passed": False,
+        "status": "Skipped",
+        "stdout": None,
+        "time": None,
+        "memory": None,
+    }
+
+
+def ordered_test_cases(question):
+    """
+    Test cases in dispatch order: visible before hidden, then fastest first
+    by recorded run time (unmeasured cases last), so a failing submission
+    is usually caught by a cheap case.
+    """
+    return question.test_cases.order_by(
+        TestCase.is_hidden,
+        TestCase.measured_time.is_(None),
+        TestCase.measured_time,
+        TestCase.id
+    ).all()
+
+
+def checker_spec(question):
+    """The payload "checker" for a question, or None for Judge0's exact match."""
+    mode = question.checker or MODE_EXACT
+    if mode == MODE_EXACT:
+        return None
+    return {"mode": mode, "tolerance": question.float_tolerance}
+
+
+def language_multipliers(language_id):
+    """(time, memory) factors for a language, relative to the C baseline limits."""
+    config = current_app.config
+    return (config['LANGUAGE_TIME_MULTIPLIERS'].get(language_id, 1.0),
+            config['LANGUAGE_MEMORY_MULTIPLIERS'].get(language_id, 1.0))
+
+
+def resource_limits(question, test_case, language_id):
+    """
+    The Judge0 limit fields for running one test case in a language. The
+    test case's own limits win over the question's, which win over the
+    configured defaults; the result is scaled by the language multipliers
+    and capped at what the judge accepts. With no test case (a custom
+    "Run") the question's limits apply.
+    """
+    config = current_app.config
+    time_factor, memory_factor = language_multipliers(language_id)
+    case_cpu, case_memory, case_wall = (
+        (test_case.cpu_time_limit, test_case.memory_limit, test_case.wall_time_limit)
+        if test_case is not None else (None, None, None)
+    )
+    cpu = case_cpu or question.cpu_time_limit or config['DEFAULT_CPU_TIME_LIMIT']
+    memory = case_memory or question.memory_limit or config['DEFAULT_MEMORY_LIMIT']
+    wall = case_wall or question.wall_time_limit or cpu * config['WALL_TIME_FACTOR']
+    return {
+        "cpu_time_limit": round(min(cpu * time_factor, config['MAX_CPU_TIME_LIMIT']), 3),
+        "wall_time_limit": round(min(wall * time_factor, config['MAX_WALL_TIME_LIMIT']), 3),
+        "memory_limit": int(min(memory * memory_factor, config['MAX_MEMORY_LIMIT'])),
+    }
+
+
+def build_submissions(code, language_id, test_cases, checker=None, question=None):
+    """
+    Judge0 submission payloads for running `code` against each test case.
+    With a question, each payload carries that case's resource limits;
+    without one the judge's own defaults apply.
+
+    The local executor gets the test data as files in the blob cache (plus
+    their hashes, which it checks the files against and the result cache
+    keys by) and streams them; only the Judge0 API needs the text inline.
+    """
+    local = get_executor() is not None
+    submissions = []
+    for tc in test_cases:
+        submission = {
+            "language_id": language_id,
+            "source_code": code,
+        }
+        if local:
+            submission.update({
+                "stdin_file": blob_store.path(tc.input_hash) if tc.input_hash else None,
+                "stdin_hash": tc.input_hash,
+                "expected_output_file": blob_store.path(tc.expected_output_hash),
+                "expected_output_hash": tc.expected_output_hash,
+            })
+        else:
+            submission.update({"stdin": tc.input, "expected_output": tc.expected_output})
+        if checker:
+            submission["checker"] = checker
+        if question is not None:
+            submission.update(resource_limits(question, tc, language_id))
+        submissions.append(submission)
+    return submissions
+
+
+def _score(question, passed, total):
+    if not total:
+        return 0
+    if grading_mode(question) == MODE_ALL_OR_NOTHING:
+        return question.marks if passed == total else 0
+    return round(question.marks * passed / total, 2)
+
+
+def summarize(question, test_cases, results):
+    """Per-case verdicts plus the score for a question."""
+    verdicts = [_verdict(tc, result) for tc, result in zip(test_cases, results)]
+    return summarize_verdicts(question, verdicts)
+
+
+def summarize_verdicts(question, verdicts):
+    passed = sum(1 for v in verdicts if v["passed"])
+    total = len(verdicts)
+
+    return {
+        "question_id": question.id,
+        "mode": grading_mode(question),
+        "verdicts": verdicts,
+        "passed": passed,
+        "total": total,
+        "score": _score(question, passed, total),
+        "max_score": question.marks,
+    }
+
+
+def record_run_times(test_cases, verdicts):
+    """Remembers the first accepted run time of each case as a scheduling hint."""
+    updated = False
+    for tc, verdict in zip(test_cases, verdicts):
+        if tc.measured_time is None and verdict["passed"] and verdict["time"]:
+            tc.measured_time = float(verdict["time"])
+            updated = True
+    if updated:
+        db.session.commit()
+
+
+def iter_grade(code, language_id, question, test_cases=None):
+    """
+    Grades `code` incrementally, yielding each case's verdict as it lands.
+
+    At most GRADING_MAX_WORKERS cases are in flight. In all-or-nothing mode
+    dispatching stops at the first failure, since the score is already
+    decided; cases that never ran are yielded as "Skipped". The caller can
+    stop iterating at any time to abandon the remaining cases.
+    """
+    app = current_app._get_current_object()
+    test_cases = test_cases if test_cases is not None else ordered_test_cases(question)
+    stop_on_failure = grading_mode(question) == MODE_ALL_OR_NOTHING
+    submissions = build_submissions(code, language_id, test_cases, checker_spec(question), question)
+
+    def run(submission):
+        with app.app_context():
+            return run_payload(submission)
+
+    max_workers = app.config['GRADING_MAX_WORKERS']
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    in_flight = {}
+    next_index = 0
+    decided = False
+    try:
+        while in_flight or (next_index < len(test_cases) and not decided):
+            # Keep the window full until the outcome is known
+            while not decided and next_index < len(test_cases) and len(in_flight) < max_workers:
+                in_flight[pool.submit(run, submissions[next_index])] = next_index
+                next_index += 1
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                verdict = _verdict(test_cases[index], future.result())
+                if stop_on_failure and not verdict["passed"]:
+                    decided = True
+                yield index, verdict
+
+        for index in range(next_index, len(test_cases)):
+            yield index, _skipped(test_cases[index])
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def grade_submission(code, language_id, question, strategy=None):
+    """
+    Grades `code` against every TestCase of a CodingQuestion in one go.
+
+    All test cases are dispatched together (as a Judge0 batch or through a
+    concurrent pool, per GRADING_STRATEGY) so the wall-clock cost is that of
+    the slowest case. Questions graded all-or-nothing go through iter_grade
+    instead, which stops dispatching at the first failing case.
+    """
+    if grading_mode(question) == MODE_ALL_OR_NOTHING:
+        test_cases = ordered_test_cases(question)
+        verdicts = [None] * len(test_cases)
+        for index, verdict in iter_grade(code, language_id, question, test_cases):
+            verdicts[index] = verdict
+        record_run_times(test_cases, verdicts)
+        return summarize_verdicts(question, verdicts)
+
+    strategy = strategy or current_app.config['GRADING_STRATEGY']
+    test_cases = ordered_test_cases(question)
+    submissions = build_submissions(code, language_id, test_cases, checker_spec(question), question)
+
+    if not submissions:
+        results = []
+    elif strategy == 'pool':
+        results = _run_pool(submissions)
+    else:
+        results = submit_batch_to_judge0(submissions)
+
+    summary = summarize(question, test_cases, results)
+    record_run_times(test_cases, summary["verdicts"])
+    return summary
@@ -0,0 +1,445 @@
+import csv
+import io
+import json
+import os
+import click
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from flask import current_app
+from flask.cli import with_appcontext
+from . import db
+from .models import Test, MCQQuestion, MCQOption, CodingQuestion, TestCase
+from .checkers import CHECKER_MODES, MODE_EXACT
+from .grading import GRADING_MODES
+from .papers import mark_changed
+from .blobs import blob_store
+
+# Bulk question import from CSV, JSON (array or JSON Lines) or YAML.
+#
+# Every record is one question:
+#
+#   {"type": "mcq", "question_text": "...", "marks": 1,
+#    "options": ["A", "B", "C"], "correct_option": 0}        # index or option text
+#
+#   {"type": "coding", "problem_statement": "...", "marks": 10,
+#    "difficulty": "Medium", "starter_code_python": "...",
+#    "test_cases": [{"input": "1 2", "expected_output": "3", "is_hidden": false}]}
+#
+# In CSV files `options` is '|' separated and `test_cases` is a JSON list.
+# A bad record (or CSV cell, or JSON Lines line) is reported and skipped;
+# only a file the parser can't find its way through stops the import.
+# Files are read incrementally and written in batches of IMPORT_BATCH_SIZE
+# questions with a few multi-row INSERT ... RETURNING statements per batch,
+# instead of one add/flush per question.
+
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+STARTER_CODE_FIELDS = (
+    'starter_code_python', 'starter_code_java', 'starter_code_cpp',
+    'starter_code_c', 'starter_code_javascript'
+)
+FORMATS = ('csv', 'json', 'jsonl', 'yaml')
+
+
+class ImportReport:
+    def __init__(self):
+        self.mcq_created = 0
+        self.coding_created = 0
+        self.errors = []  # (record number, message)
+
+    @property
+    def created(self):
+        return self.mcq_created + self.coding_created
+
+    def error(self, number, message):
+        self.errors.append((number, message))
+
+
+# --- Parsing ---
+
+def _iter_json_array(fileobj, chunk_size=64 * 1024):
+    """Yields the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf = ''
+    started = False
+    eof = False
+    while True:
+        # Skip separators between elements
+        buf = buf.lstrip()
+        if not started and buf:
+            if buf[0] != '[':
+                raise ValueError("Expected a JSON array of questions")
+            buf = buf[1:]
+            started = True
+            continue
+        if buf[:1] == ',':
+            buf = buf[1:]
+            continue
+        if buf[:1] == ']':
+            return
+        if buf:
+            try:
+                item, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                buf = buf[end:]
+                continue
+        if eof:
+            if buf.strip():
+                raise ValueError("Unexpected end of JSON array")
+            return
+        chunk = fileobj.read(chunk_size)
+        eof = not chunk
+        buf += chunk
+
+
+def _iter_jsonl(fileobj):
+    for line in fileobj:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line), None
+            except ValueError as e:
+                # Each line stands alone, so the next one can still be read
+                yield None, f"could not parse: {e}"
+
+
+def _iter_yaml(fileobj):
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("YAML import needs PyYAML installed") from None
+    # Either one question per document ('---' separated) or a list per document
+    try:
+        for document in yaml.safe_load_all(fileobj):
+            if isinstance(document, list):
+                yield from document
+            elif document is not None:
+                yield document
+    except yaml.YAMLError as e:
+        # Reported like any other malformed file; the message spans lines
+        raise ValueError(' '.join(str(e).split())) from None
+
+
+def _iter_csv(fileobj):
+    for row in csv.DictReader(fileobj):
+        record = {k.strip(): v for k, v in row.items() if k and v not in (None, '')}
+        if 'options' in record:
+            record['options'] = [o.strip() for o in record['options'].split('|')]
+        if 'test_cases' in record:
+            try:
+                record['test_cases'] = json.loads(record['test_cases'])
+            except ValueError as e:
+                yield None, f"test_cases is not valid JSON: {e}"
+                continue
+        yield record, None
+
+
+def _without_errors(records):
+    for record in records:
+        yield record, None
+
+
+def iter_records(fileobj, fmt):
+    """
+    Yields (number, record, error) for each question in a text file
+    object: the raw record, or None and why it couldn't be read. Raises
+    ValueError (or csv.Error) when the rest of the file can't be read.
+    """
+    if fmt == 'csv':
+        records = _iter_csv(fileobj)
+    elif fmt == 'jsonl':
+        records = _iter_jsonl(fileobj)
+    elif fmt == 'json':
+        records = _without_errors(_iter_json_array(fileobj))
+    elif fmt == 'yaml':
+        records = _without_errors(_iter_yaml(fileobj))
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+    for number, (record, error) in enumerate(records, 1):
+        yield number, record, error
+
+
+def detect_format(filename):
+    ext = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    return {'yml': 'yaml', 'ndjson': 'jsonl'}.get(ext, ext)
+
+
+# --- Validation ---
+
+def _int(value, field):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a whole number") from None
+
+
+def _flag(value, field, default):
+    """A yes/no field, which CSV and YAML may hand over as text or a number."""
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in ('true', 'yes', '1'):
+            return True
+        if text in ('false', 'no', '0'):
+            return False
+    raise ValueError(f"{field} must be true or false")
+
+
+def _limits(record, where=''):
+    """The optional cpu/wall/memory limit fields of a question or test case."""
+    limits = {}
+    for field, cast in (('cpu_time_limit', float), ('wall_time_limit', float), ('memory_limit', int)):
+        value = record.get(field)
+        try:
+            value = cast(value) if value not in (None, '') else None
+        except (TypeError, ValueError):
+            raise ValueError(f"{where}{field} must be a number") from None
+        if value is not None and value <= 0:
+            raise ValueError(f"{where}{field} must be positive")
+        limits[field] = value
+    return limits
+
+
+def _clean_mcq(record):
+    text = (record.get('question_text') or '').strip()
+    if not text:
+        raise ValueError("question_text is required")
+    if len(text) > 500:
+        raise ValueError("question_text is longer than 500 characters")
+    options = [str(o).strip() for o in record.get('options') or []]
+    if not 2 <= len(options) <= 10:
+        raise ValueError("an MCQ needs between 2 and 10 options")
+    if any(not o or len(o) > 300 for o in options):
+        raise ValueError("options must be 1 to 300 characters")
+
+    correct = record.get('correct_option')
+    if isinstance(correct, str) and correct.strip() in options:
+        correct = options.index(correct.strip())
+    correct = _int(correct, 'correct_option')
+    if not 0 <= correct < len(options):
+        raise ValueError("correct_option is out of range")
+
+    return {
+        'question_text': text,
+        'marks': _int(record.get('marks', 1), 'marks'),
+        'options': options,
+        'correct_index': correct,
+    }
+
+
+def _clean_coding(record):
+    statement = (record.get('problem_statement') or '').strip()
+    if not statement:
+        raise ValueError("problem_statement is required")
+    difficulty = record.get('difficulty') or 'Medium'
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+
+    test_cases = []
+    for i, tc in enumerate(record.get('test_cases') or []):
+        if tc.get('expected_output') in (None, ''):
+            raise ValueError(f"test case {i + 1} has no expected_output")
+        test_cases.append({
+            # JSON and YAML may hand over numbers; the blob store takes text
+            'input': str(tc['input']) if tc.get('input') is not None else None,
+            'expected_output': str(tc['expected_output']),
+            'is_hidden': _flag(tc.get('is_hidden'), f"test case {i + 1} is_hidden", default=True),
+            **_limits(tc, f"test case {i + 1} "),
+        })
+    if not test_cases:
+        raise ValueError("a coding question needs at least one test case")
+
+    checker = record.get('checker') or MODE_EXACT
+    if checker not in dict(CHECKER_MODES):
+        raise ValueError(f"unknown checker '{checker}'")
+    mode = record.get('grading_mode') or None
+    if mode and mode not in dict(GRADING_MODES):
+        raise ValueError(f"unknown grading_mode '{mode}'")
+    tolerance = record.get('float_tolerance')
+    try:
+        tolerance = float(tolerance) if tolerance not in (None, '') else None
+    except ValueError:
+        raise ValueError("float_tolerance must be a number") from None
+
+    cleaned = {
+        'problem_statement': statement,
+        'marks': _int(record.get('marks', 10), 'marks'),
+        'difficulty': difficulty,
+        'grading_mode': mode,
+        'checker': checker,
+        'float_tolerance': tolerance,
+        **_limits(record),
+        'test_cases': test_cases,
+    }
+    for field in STARTER_CODE_FIELDS:
+        cleaned[field] = record.get(field)
+    return cleaned
+
+
+def clean_record(record):
+    """Returns ('mcq' | 'coding', cleaned dict) or raises ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError("each question must be an object")
+    kind = (record.get('type') or '').lower()
+    if kind == 'mcq':
+        return kind, _clean_mcq(record)
+    if kind == 'coding':
+        return kind, _clean_coding(record)
+    raise ValueError("type must be 'mcq' or 'coding'")
+
+
+# --- Batched writes ---
+
+def _insert_mcqs(test_id, batch):
+    question_ids = db.session.execute(
+        insert(MCQQuestion).returning(MCQQuestion.id, sort_by_parameter_order=True),
+        [{'test_id': test_id, 'question_text': q['question_text'], 'marks': q['marks']} for _, q in batch]
+    ).scalars().all()
+
+    option_rows = [
+        {'question_id': qid, 'option_text': text}
+        for qid, (_, q) in zip(question_ids, batch)
+        for text in q['options']
+    ]
+    option_ids = db.session.execute(
+        insert(MCQOption).returning(MCQOption.id, sort_by_parameter_order=True), option_rows
+    ).scalars().all()
+
+    # Options come back in insertion order, so each question's correct
+    # option id is found by offset; no flush per question needed
+    updates = []
+    offset = 0
+    for qid, (_, q) in zip(question_ids, batch):
+        updates.append({'id': qid, 'correct_option_id': option_ids[offset + q['correct_index']]})
+        offset += len(q['options'])
+    db.session.execute(update(MCQQuestion), updates)
+
+
+def _insert_coding(test_id, batch):
+    rows = []
+    for _, q in batch:
+        row = {k: v for k, v in q.items() if k != 'test_cases'}
+        row['test_id'] = test_id
+        rows.append(row)
+    question_ids = db.session.execute(
+        insert(CodingQuestion).returning(CodingQuestion.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+
+    cases = [(qid, tc) for qid, (_, q) in zip(question_ids, batch) for tc in q['test_cases']]
+    # Test data goes to the blob store in one go; rows only get hashes and sizes
+    refs = blob_store.put_many([text for _, tc in cases for text in (tc['input'], tc['expected_output'])])
+    rows = []
+    for i, (qid, tc) in enumerate(cases):
+        row = {k: v for k, v in tc.items() if k not in ('input', 'expected_output')}
+        row['input_hash'], row['input_size'] = refs[2 * i]
+        row['expected_output_hash'], row['expected_output_size'] = refs[2 * i + 1]
+        row['question_id'] = qid
+        rows.append(row)
+    db.session.execute(insert(TestCase), rows)
+
+
+def _write(test_id, kind, batch, report):
+    try:
+        if kind == 'mcq':
+            _insert_mcqs(test_id, batch)
+        else:
+            _insert_coding(test_id, batch)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        if len(batch) > 1:
+            # Bisect down to the questions at fault; the rest still go in
+            middle = len(batch) // 2
+            _write(test_id, kind, batch[:middle], report)
+            _write(test_id, kind, batch[middle:], report)
+        else:
+            report.error(batch[0][0], f"database error: {e.__class__.__name__}")
+        return
+    if kind == 'mcq':
+        report.mcq_created += len(batch)
+    else:
+        report.coding_created += len(batch)
+
+
+def _flush(test_id, kind, batch, report):
+    if batch:
+        _write(test_id, kind, batch, report)
+        batch.clear()
+
+
+def import_questions(test_id, fileobj, fmt, batch_size=None):
+    """
+    Imports questions from a text file object into a test and returns an
+    ImportReport. Invalid records are skipped and reported by number; valid
+    ones are committed batch by batch.
+    """
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+    report = ImportReport()
+    batches = {'mcq': [], 'coding': []}
+
+    records = iter_records(fileobj, fmt)
+    number = 0
+    while True:
+        try:
+            number, record, error = next(records)
+        except StopIteration:
+            break
+        except (ValueError, csv.Error) as e:
+            # The file itself is malformed from here on
+            report.error(number + 1, f"could not parse: {e}")
+            break
+        if error is not None:
+            report.error(number, error)
+            continue
+
+        try:
+            kind, cleaned = clean_record(record)
+        except (ValueError, TypeError, AttributeError) as e:
+            report.error(number, str(e))
+            continue
+
+        batches[kind].append((number, cleaned))
+        if len(batches[kind]) >= batch_size:
+            _flush(test_id, kind, batches[kind], report)
+
+    for kind, batch in batches.items():
+        _flush(test_id, kind, batch, report)
+    if report.created:
+        # Core inserts skip the ORM events that refresh a published paper
+        mark_changed(test_id)
+    return report
+
+
+def open_text(stream):
+    """Wraps an uploaded binary stream for the text parsers."""
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+@click.command('import-questions')
+@click.argument('test_id', type=int)
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', type=int, help='Questions per INSERT batch.')
+@with_appcontext
+def import_questions_command(test_id, path, fmt, batch_size):
+    """Bulk-import questions from a CSV, JSON, JSON Lines or YAML file."""
+    if Test.query.get(test_id) is None:
+        raise click.UsageError(f"No test with id {test_id}")
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise click.UsageError("Cannot tell the format from the extension; pass --format")
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        report = import_questions(test_id, f, fmt, batch_size)
+
+    click.echo(f"Imported {report.mcq_created} MCQ and {report.coding_created} coding questions.")
+    for number, message in report.errors:
+        click.echo(f"  record {number}: {message}", err=True)
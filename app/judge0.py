@@ -1,39 +1,388 @@
+import random
+import threading
 import requests
 import time
 from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from .checkers import compare, MODE_EXACT
 
-def submit_to_judge0(code, language_id, stdin, expected_output=None):
+# Judge0 status ids (see GET /statuses)
+STATUS_IN_QUEUE = 1
+STATUS_PROCESSING = 2
+STATUS_ACCEPTED = 3
+STATUS_WRONG_ANSWER = 4
+STATUS_TIME_LIMIT_EXCEEDED = 5
+STATUS_COMPILATION_ERROR = 6
+STATUS_INTERNAL_ERROR = 13
+
+RESULT_FIELDS = "token,stdout,stderr,compile_output,message,status,time,memory"
+# Optional per-submission limits: seconds, seconds, KB
+LIMIT_FIELDS = ("cpu_time_limit", "wall_time_limit", "memory_limit")
+
+# Responses worth retrying: rate limited or the judge is struggling
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# The subset that means a request was turned away unprocessed. Only these
+# (and failures to connect at all) are retried for a POST, which Judge0 may
+# otherwise have accepted already: resending it would run the job twice.
+REJECTED_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised without touching the network while the circuit is open."""
+
+
+def _never_sent(error):
+    """True if a request failed before the judge could have seen it."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and not isinstance(error, requests.exceptions.Timeout):
+        # Refused or unresolvable; a reset mid-response may come after the judge took the job
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+class CircuitBreaker:
     """
-    Submits code to Judge0 for execution and waits for the result.
-    Can be used for both custom runs and grading against test cases.
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. After that a single trial call is let
+    through (half-open); its outcome closes or re-opens the circuit.
     """
-    api_host = current_app.config['JUDGE0_API_HOST']
-    api_key = current_app.config['JUDGE0_API_KEY']
 
-    headers = {
-        "x-rapidapi-host": api_host,
-        "x-rapidapi-key": api_key,
-        "content-type": "application/json"
-    }
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class Judge0Client:
+    """
+    Long-lived Judge0 client. Holds one keep-alive session with a sized
+    connection pool, retries 429/5xx and connection errors with jittered
+    exponential backoff, and fails fast through a circuit breaker while the
+    judge is down. One instance is created in create_app and shared by all
+    requests and worker threads.
+    """
+
+    def __init__(self, base_url, api_host, api_key, pool_size=20, timeout=10,
+                 max_retries=3, backoff_base=0.5, backoff_max=8,
+                 breaker_threshold=5, breaker_reset=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+
+        self.session = requests.Session()
+        # Retries are handled below so that backoff and the breaker see them
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "x-rapidapi-host": api_host,
+            "x-rapidapi-key": api_key,
+            "content-type": "application/json"
+        })
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            base_url=config.get('JUDGE0_API_URL') or f"https://{config['JUDGE0_API_HOST']}",
+            api_host=config['JUDGE0_API_HOST'],
+            api_key=config['JUDGE0_API_KEY'],
+            pool_size=config['JUDGE0_POOL_SIZE'],
+            timeout=config['JUDGE0_TIMEOUT'],
+            max_retries=config['JUDGE0_MAX_RETRIES'],
+            backoff_base=config['JUDGE0_BACKOFF_BASE'],
+            backoff_max=config['JUDGE0_BACKOFF_MAX'],
+            breaker_threshold=config['JUDGE0_BREAKER_THRESHOLD'],
+            breaker_reset=config['JUDGE0_BREAKER_RESET'],
+        )
+
+    def _backoff(self, attempt, resp=None):
+        # Honour Retry-After from the rate limiter when it is given in seconds
+        retry_after = resp.headers.get('Retry-After') if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        # "Full jitter": spreads retries out so clients don't stampede together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method, path, **kwargs):
+        """
+        Sends a request and returns the decoded JSON body. Non-idempotent
+        requests are only retried when the judge cannot have run them.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError("Judge0 is unavailable, not sending request")
+            resp = None
+            try:
+                resp = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    self.breaker.record_success()
+                    return resp.json()
+                error = requests.exceptions.HTTPError(f"{resp.status_code} from Judge0", response=resp)
+                retryable = idempotent or resp.status_code in REJECTED_STATUSES
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+                retryable = idempotent or _never_sent(e)
+            except requests.exceptions.RequestException:
+                # 4xx other than 429: our fault, not the judge's
+                self.breaker.record_success()
+                raise
+
+            self.breaker.record_failure()
+            if not retryable or attempt >= self.max_retries:
+                raise error
+            time.sleep(self._backoff(attempt, resp))
+            attempt += 1
+
+    def submit(self, payload, wait=True):
+        return self.request(
+            'POST', '/submissions',
+            params={"base64_encoded": "false", "wait": "true" if wait else "false"},
+            json=payload
+        )
+
+    def create_batch(self, submissions):
+        return self.request(
+            'POST', '/submissions/batch',
+            params={"base64_encoded": "false"},
+            json={"submissions": submissions}
+        )
+
+    def get_batch(self, tokens):
+        return self.request(
+            'GET', '/submissions/batch',
+            params={"tokens": ",".join(tokens), "base64_encoded": "false", "fields": RESULT_FIELDS}
+        ).get("submissions", [])
+
+
+def get_client():
+    """The Judge0Client shared by the current app."""
+    return current_app.extensions['judge0']
+
+
+def _cache():
+    # Optional ResultCache (app/judge_cache.py), set up in create_app
+    return current_app.extensions.get('judge0_cache')
+
 
+def _executor():
+    # LocalExecutor (app/executors.py) when EXECUTOR_BACKEND is 'local'
+    return current_app.extensions.get('executor')
+
+
+def record_latency(payload, result, seconds):
+    """Feeds the Judge0 latency and error histograms (app/metrics.py), when enabled."""
+    metrics = current_app.extensions.get('metrics')
+    if metrics is not None:
+        metrics.observe_judge(payload.get("language_id"), result, seconds)
+
+
+def is_finished(result):
+    """True once Judge0 has a final verdict (or we gave up with an error)."""
+    if result.get("error"):
+        return True
+    status = result.get("status") or {}
+    return status.get("id", STATUS_IN_QUEUE) > STATUS_PROCESSING
+
+
+def to_api_payload(payload):
+    """
+    The Judge0 request body for one of our payloads. A payload may carry a
+    "checker" ({"mode", "tolerance"}, see app/checkers.py); Judge0 only knows
+    exact matching, so for other modes it just runs the program and the
+    output is checked on our side by apply_checker.
+    """
+    checker = payload.get("checker")
+    if not checker:
+        return payload
+    body = {k: v for k, v in payload.items() if k != "checker"}
+    if checker.get("mode", MODE_EXACT) != MODE_EXACT:
+        body["expected_output"] = None
+    return body
+
+
+def apply_checker(payload, result):
+    """Turns an Accepted run into Wrong Answer if our checker rejects the output."""
+    checker = payload.get("checker")
+    if not checker or checker.get("mode", MODE_EXACT) == MODE_EXACT or payload.get("expected_output") is None:
+        return result
+    status = result.get("status") or {}
+    if result.get("error") or status.get("id") != STATUS_ACCEPTED:
+        return result
+    if compare(payload["expected_output"], result.get("stdout"), checker["mode"], checker.get("tolerance")):
+        return result
+    return dict(result, status={"id": STATUS_WRONG_ANSWER, "description": "Wrong Answer"})
+
+
+def submit_to_judge0(code, language_id, stdin, expected_output=None, checker=None):
+    """
+    Submits code to Judge0 for execution and waits for the result.
+    Can be used for both custom runs and grading against test cases.
+    """
     payload = {
         "language_id": language_id,
         "source_code": code,
         "stdin": stdin,
         "expected_output": expected_output
     }
+    if checker:
+        payload["checker"] = checker
+    return run_payload(payload)
 
-    try:
-        # Post submission and wait for the result
-        resp = requests.post(
-            f"https://{api_host}/submissions?base64_encoded=false&wait=true",
-            headers=headers,
-            json=payload,
-            timeout=10 # 10-second timeout
-        )
-        resp.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-        return resp.json()
 
+def run_payload(payload):
+    """submit_to_judge0 for a ready-made payload dict."""
+    cache = _cache()
+    if cache is not None:
+        cached = cache.get(payload)
+        if cached is not None:
+            return cached
+
+    executor = _executor()
+    started = time.monotonic()
+    try:
+        if executor is not None:
+            # The local executor applies the checker itself, streaming stdout from disk
+            result = executor.run(payload)
+        else:
+            result = apply_checker(payload, get_client().submit(to_api_payload(payload), wait=True))
     except requests.exceptions.RequestException as e:
-        # Handle connection errors, timeouts, etc.
-        return {"error": True, "message": str(e)}
\ No newline at end of file
+        # Connection errors, timeouts and exhausted retries, or an open circuit
+        result = {"error": True, "message": str(e)}
+        record_latency(payload, result, time.monotonic() - started)
+        return result
+    record_latency(payload, result, time.monotonic() - started)
+
+    if cache is not None:
+        cache.put(payload, result)
+    return result
+
+
+def submit_batch_to_judge0(submissions):
+    """
+    Submits several {language_id, source_code, stdin, expected_output} dicts
+    through /submissions/batch and polls until every one has a verdict.
+
+    Returns results in the same order as `submissions`. Judge0 runs the whole
+    batch in parallel, so the wait is bounded by the slowest submission
+    rather than the sum of all of them. With the local backend the batch
+    runs on the executor's own pool instead.
+    """
+    client = get_client()
+    cache = _cache()
+    executor = _executor()
+    batch_size = current_app.config['JUDGE0_BATCH_SIZE']
+    results = [None] * len(submissions)
+    tokens = {}
+
+    # Only submissions the cache can't answer go to the judge
+    to_send = []
+    for index, submission in enumerate(submissions):
+        cached = cache.get(submission) if cache is not None else None
+        if cached is not None:
+            results[index] = cached
+        else:
+            to_send.append(index)
+
+    started = time.monotonic()
+    if executor is not None:
+        for index, result in zip(to_send, executor.run_batch([submissions[i] for i in to_send])):
+            results[index] = result
+            record_latency(submissions[index], result, time.monotonic() - started)
+            if cache is not None:
+                cache.put(submissions[index], result)
+        return results
+
+    # Judge0 caps the number of submissions per batch request
+    for start in range(0, len(to_send), batch_size):
+        chunk = to_send[start:start + batch_size]
+        try:
+            created = client.create_batch([to_api_payload(submissions[i]) for i in chunk])
+        except requests.exceptions.RequestException as e:
+            for i in chunk:
+                results[i] = {"error": True, "message": str(e)}
+            continue
+
+        for index, item in zip(chunk, created):
+            if item.get("token"):
+                tokens[item["token"]] = index
+            else:
+                # Judge0 reports per-submission validation errors inline
+                results[index] = {"error": True, "message": str(item)}
+
+    deadline = time.monotonic() + current_app.config['JUDGE0_POLL_TIMEOUT']
+    interval = current_app.config['JUDGE0_POLL_INTERVAL']
+    pending = dict(tokens)
+    finished = {}  # index -> seconds from sending the batch to its verdict
+
+    while pending:
+        time.sleep(interval)
+        if time.monotonic() > deadline:
+            for index in pending.values():
+                results[index] = {"error": True, "message": "Timed out waiting for Judge0"}
+            break
+
+        pending_tokens = list(pending)
+        for start in range(0, len(pending_tokens), batch_size):
+            try:
+                polled = client.get_batch(pending_tokens[start:start + batch_size])
+            except CircuitOpenError as e:
+                for index in pending.values():
+                    results[index] = {"error": True, "message": str(e)}
+                pending = {}
+                break
+            except requests.exceptions.RequestException:
+                # Transient poll failure; try again on the next tick
+                continue
+
+            for result in polled:
+                if result and result.get("token") in pending and is_finished(result):
+                    index = pending.pop(result["token"])
+                    result = apply_checker(submissions[index], result)
+                    results[index] = result
+                    finished[index] = time.monotonic() - started
+                    if cache is not None:
+                        cache.put(submissions[index], result)
+
+    for index in to_send:
+        record_latency(submissions[index], results[index], finished.get(index, time.monotonic() - started))
+    return results
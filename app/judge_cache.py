@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from . import db
+from .models import JudgeResult
+from .judge0 import STATUS_ACCEPTED, STATUS_WRONG_ANSWER, STATUS_COMPILATION_ERROR, LIMIT_FIELDS
+
+# Only verdicts that are a pure function of (code, language, stdin) are
+# cached. Time limits and internal errors depend on how busy the judge was.
+CACHEABLE_STATUSES = {STATUS_ACCEPTED, STATUS_WRONG_ANSWER, STATUS_COMPILATION_ERROR}
+
+log = logging.getLogger(__name__)
+
+
+def _sha256(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def cache_key(payload):
+    """
+    Content address of a submission: hashes of the source, stdin and
+    expected output plus the language id (and output checker and resource
+    limits, if any). expected_output is part of the key because it decides
+    between Accepted and Wrong Answer. Test data given by blob hash (see
+    grading.build_submissions) keys the same as the text itself.
+    """
+    stdin = payload.get("stdin_hash") or _sha256(payload.get("stdin"))
+    expected = payload.get("expected_output_hash") or _sha256(payload.get("expected_output"))
+    prefix = ''
+    if payload.get("checker"):
+        # A different checker can flip the verdict for the same output
+        prefix += json.dumps(payload["checker"], sort_keys=True) + "\0"
+    limits = [payload.get(field) for field in LIMIT_FIELDS]
+    if any(limits):
+        # A run accepted under generous limits may not be under tighter ones
+        prefix += json.dumps(limits) + "\0"
+    if prefix:
+        expected = _sha256(prefix + expected)
+    return ":".join([
+        _sha256(payload.get("source_code")),
+        str(payload.get("language_id")),
+        stdin,
+        expected,
+    ])
+
+
+def is_cacheable(result):
+    if result.get("error"):
+        return False
+    status = result.get("status") or {}
+    return status.get("id") in CACHEABLE_STATUSES
+
+
+class ResultCache:
+    """
+    Two-tier cache of Judge0 results.
+
+    The first tier is a bounded in-memory LRU per process. The optional
+    second tier is the judge_result table, shared by every worker and
+    surviving restarts. Both tiers expire entries after JUDGE0_CACHE_TTL
+    seconds.
+
+    The table is read and written on connections of its own, never through
+    db.session: the cache is used in the middle of grading, and must not
+    flush, commit or roll back the caller's unit of work.
+    """
+
+    def __init__(self, max_entries=10000, ttl=86400, persistent=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persistent = persistent
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_entries=config['JUDGE0_CACHE_SIZE'],
+            ttl=config['JUDGE0_CACHE_TTL'],
+            persistent=config['JUDGE0_CACHE_PERSISTENT'],
+        )
+
+    def get(self, payload):
+        key = cache_key(payload)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        if self.persistent:
+            table = JudgeResult.__table__
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    select(table.c.result).where(table.c.key == key, table.c.expires_at > datetime.utcnow())
+                ).first()
+            if row is not None:
+                self._remember(key, row.result)
+                with self._lock:
+                    self.persistent_hits += 1
+                return row.result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, payload, result):
+        if not is_cacheable(result):
+            return
+        key = cache_key(payload)
+        self._remember(key, result)
+        if self.persistent:
+            try:
+                self._store(key, result)
+            except SQLAlchemyError:
+                # The cache is best-effort
+                log.warning("Could not store judge result %s", key, exc_info=True)
+
+    def _store(self, key, result):
+        table = JudgeResult.__table__
+        row = {"key": key, "result": result, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)}
+        with db.engine.begin() as conn:
+            dialect = conn.dialect.name
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            elif dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                conn.execute(table.delete().where(table.c.key == key))
+                conn.execute(table.insert(), row)
+                return
+            # Another worker may have stored the same key in the meantime
+            stmt = insert(table).values(row)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=['key'],
+                set_={"result": stmt.excluded.result, "expires_at": stmt.excluded.expires_at},
+            ))
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def purge_expired(self):
+        """Drops expired entries from both tiers."""
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+        if self.persistent:
+            table = JudgeResult.__table__
+            with db.engine.begin() as conn:
+                conn.execute(table.delete().where(table.c.expires_at <= datetime.utcnow()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+
+def get_cache():
+    """The ResultCache of the current app, or None when caching is off."""
+    return current_app.extensions.get('judge0_cache')
@@ -0,0 +1,338 @@
+import bisect
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import select, or_
+from . import db
+from .models import MCQQuestion, CodingQuestion, ExamSession, Answer, Submission, LeaderboardEntry
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:
+    SortedList = None
+
+log = logging.getLogger(__name__)
+
+
+class _BisectList:
+    """The few SortedList methods used here, on a plain list (O(n) inserts)."""
+
+    def __init__(self):
+        self._items = []
+
+    def add(self, item):
+        bisect.insort(self._items, item)
+
+    def remove(self, item):
+        del self._items[bisect.bisect_left(self._items, item)]
+
+    def index(self, item):
+        return bisect.bisect_left(self._items, item)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _timestamp(at):
+    return at.timestamp() if at is not None else time.time()
+
+
+class Leaderboard:
+    """
+    Live ranking of one test.
+
+    Each candidate's total is the sum of their current MCQ answer scores and
+    their best score per coding question. Candidates are kept in a sorted
+    list keyed by (-total, time the total was reached, user id), so an update
+    is one remove and one insert, rank is a bisection, and the top K is a
+    slice; ties go to whoever got there first.
+    """
+
+    def __init__(self, test_id, mcq_key):
+        self.test_id = test_id
+        self.mcq_key = mcq_key  # question id -> (correct option id, marks)
+        self.built_at = time.monotonic()
+        self.changed = True
+        self._scores = {}  # user id -> {(kind, question id): score}
+        self._keys = {}  # user id -> its key in _order
+        self._order = SortedList() if SortedList is not None else _BisectList()
+        self._lock = threading.Lock()
+
+    def record(self, user_id, kind, question_id, score, at=None, best=True):
+        """
+        Sets a candidate's score for a question. With best=True (coding) a
+        lower score than one already recorded is ignored; MCQ answers can be
+        changed, so they always replace.
+        """
+        with self._lock:
+            scores = self._scores.setdefault(user_id, {})
+            previous = scores.get((kind, question_id))
+            if previous is not None and (score == previous or (best and score < previous)):
+                return
+            scores[(kind, question_id)] = score
+
+            total = -round(sum(scores.values()), 2)
+            old = self._keys.get(user_id)
+            if old is not None:
+                if old[0] == total:
+                    # Same total, so it still counts as reached at the old time
+                    return
+                self._order.remove(old)
+            new = (total, _timestamp(at), user_id)
+            self._order.add(new)
+            self._keys[user_id] = new
+            self.changed = True
+
+    def record_mcq(self, user_id, question_id, option_id, at=None):
+        correct_option_id, marks = self.mcq_key.get(question_id, (None, 0))
+        score = marks if option_id is not None and option_id == correct_option_id else 0
+        self.record(user_id, 'mcq', question_id, score, at, best=False)
+
+    def top(self, k):
+        """[(rank, user id, total, reached at timestamp)] for the first k candidates."""
+        with self._lock:
+            return [(i + 1, key[2], -key[0], key[1]) for i, key in enumerate(self._order[:k])]
+
+    def rank(self, user_id):
+        """(rank, total, candidates) for a user, or None if they have no score yet."""
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is None:
+                return None
+            return self._order.index(key) + 1, -key[0], len(self._order)
+
+    def __len__(self):
+        return len(self._order)
+
+
+def made_in_session(submission, session):
+    """True if a submission was made while the candidate's exam session was open."""
+    return (
+        session is not None
+        and session.started_at <= submission.created_at
+        and (session.finished_at is None or submission.created_at <= session.finished_at)
+    )
+
+
+def build_leaderboard(test_id):
+    """
+    Replays a test's saved answers and graded submissions into a fresh
+    Leaderboard, merged in the order they happened, so ties are broken the
+    same way in every process. MCQ answers only count once their session is
+    closed, and submissions only if they were made during the candidate's
+    session.
+    """
+    mcq_key = {
+        question_id: (correct_option_id, marks)
+        for question_id, correct_option_id, marks in db.session.execute(
+            select(MCQQuestion.id, MCQQuestion.correct_option_id, MCQQuestion.marks)
+            .where(MCQQuestion.test_id == test_id))
+    }
+    board = Leaderboard(test_id, mcq_key)
+
+    answers = db.session.execute(
+        select(Answer.updated_at, Answer.id, ExamSession.user_id, Answer.question_id, Answer.selected_option_id)
+        .join(Answer, Answer.session_id == ExamSession.id)
+        .where(ExamSession.test_id == test_id, ExamSession.status != 'in_progress', Answer.kind == 'mcq')
+        .order_by(Answer.updated_at, Answer.id)
+    )
+    submissions = db.session.execute(
+        select(Submission.finished_at, Submission.id, Submission.user_id, Submission.question_id, Submission.score)
+        .join(CodingQuestion, Submission.question_id == CodingQuestion.id)
+        .join(ExamSession, (ExamSession.user_id == Submission.user_id) & (ExamSession.test_id == test_id))
+        .where(CodingQuestion.test_id == test_id, Submission.kind == 'submit',
+               Submission.status == 'done', Submission.score.isnot(None),
+               Submission.created_at >= ExamSession.started_at,
+               or_(ExamSession.finished_at.is_(None), Submission.created_at <= ExamSession.finished_at))
+        .order_by(Submission.finished_at, Submission.id)
+    )
+
+    def events(rows, kind):
+        for at, row_id, user_id, question_id, value in rows:
+            yield (at or datetime.min, kind, row_id), at, user_id, question_id, value
+
+    for (_, kind, _), at, user_id, question_id, value in heapq.merge(
+            events(answers, 'mcq'), events(submissions, 'coding'), key=lambda event: event[0]):
+        if kind == 'mcq':
+            board.record_mcq(user_id, question_id, value, at)
+        else:
+            board.record(user_id, 'coding', question_id, value, at)
+    return board
+
+
+class LeaderboardRegistry:
+    """
+    Per-process leaderboards by test id, built on first use and then updated
+    as sessions close and verdicts arrive. A background thread rebuilds each board
+    from the database every LEADERBOARD_REBUILD_INTERVAL seconds, so that
+    processes converge on updates handled by other workers, and writes
+    changed boards to the leaderboard_entry table every
+    LEADERBOARD_SNAPSHOT_INTERVAL seconds. Requests never wait for a rebuild,
+    only for a test's first build.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._boards = {}
+        self._build_locks = {}  # test id -> lock held while its board is (re)built
+        self._pending = {}  # test id -> updates that arrived during its rebuild
+        self._lock = threading.Lock()
+        self._started = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['leaderboards'] = self
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name='leaderboard-snapshots', daemon=True).start()
+
+    def get(self, test_id):
+        self._start()
+        board = self._boards.get(test_id)
+        if board is None:
+            board = self._build(test_id, rebuild=False)
+        return board
+
+    def _build(self, test_id, rebuild=True):
+        """Builds a test's board, once at a time per test, and swaps it in."""
+        with self._lock:
+            lock = self._build_locks.setdefault(test_id, threading.Lock())
+        with lock:
+            board = self._boards.get(test_id)
+            if board is not None and not rebuild:
+                # Built by another request while this one waited
+                return board
+            with self._lock:
+                self._pending[test_id] = []
+            try:
+                board = build_leaderboard(test_id)
+            finally:
+                with self._lock:
+                    pending = self._pending.pop(test_id)
+            # Updates recorded on the old board meanwhile may be missing from
+            # what was read; applying them again is harmless
+            for method, args in pending:
+                getattr(board, method)(*args)
+            old = self._boards.get(test_id)
+            # A rebuild that only confirms the old board needs no snapshot
+            board.changed = old is None or old.changed or board.top(len(board)) != old.top(len(old))
+            self._boards[test_id] = board
+            return board
+
+    def _record(self, test_id, method, *args):
+        with self._lock:
+            pending = self._pending.get(test_id)
+            if pending is not None:
+                pending.append((method, args))
+        getattr(self.get(test_id), method)(*args)
+
+    def record_session(self, session, answers):
+        """Scores a closed session's MCQ answers; open sessions' picks are never shown."""
+        for answer in answers:
+            if answer["kind"] == 'mcq':
+                self._record(
+                    session.test_id, 'record_mcq',
+                    session.user_id, answer["question_id"], answer["selected_option_id"], answer["updated_at"]
+                )
+
+    def record_submission(self, submission):
+        if submission.kind != 'submit' or submission.score is None:
+            return
+        test_id = submission.question.test_id
+        session = ExamSession.query.filter_by(user_id=submission.user_id, test_id=test_id).first()
+        if not made_in_session(submission, session):
+            return
+        self._record(
+            test_id, 'record',
+            submission.user_id, 'coding', submission.question_id, submission.score, submission.finished_at
+        )
+
+    # --- Snapshots ---
+
+    def snapshot(self, board):
+        now = datetime.utcnow()
+        rows = [{
+            'test_id': board.test_id,
+            'user_id': user_id,
+            'rank': rank,
+            'score': score,
+            'reached_at': datetime.utcfromtimestamp(reached_at),
+            'snapshot_at': now,
+        } for rank, user_id, score, reached_at in board.top(len(board))]
+        board.changed = False
+        table = LeaderboardEntry.__table__
+        if rows:
+            self._upsert(rows)
+        # Rows this snapshot didn't write are for candidates no longer ranked
+        db.session.execute(table.delete().where(table.c.test_id == board.test_id, table.c.snapshot_at < now))
+        db.session.commit()
+
+    def _upsert(self, rows):
+        """
+        Writes one row per (test, candidate); every process snapshots, so
+        the unique constraint keeps concurrent writers from duplicating rows.
+        """
+        table = LeaderboardEntry.__table__
+        fields = ('rank', 'score', 'reached_at', 'snapshot_at')
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['test_id', 'user_id'],
+                set_={field: stmt.excluded[field] for field in fields},
+            )
+            db.session.execute(stmt, rows)
+            return
+        for row in rows:
+            updated = db.session.execute(
+                table.update()
+                .where(table.c.test_id == row['test_id'], table.c.user_id == row['user_id'])
+                .values({field: row[field] for field in fields})
+            ).rowcount
+            if not updated:
+                db.session.execute(table.insert(), row)
+
+    def _run(self):
+        interval = min(self.app.config['LEADERBOARD_SNAPSHOT_INTERVAL'], self.app.config['LEADERBOARD_REBUILD_INTERVAL'])
+        while True:
+            time.sleep(interval)
+            with self.app.app_context():
+                max_age = self.app.config['LEADERBOARD_REBUILD_INTERVAL']
+                for test_id, board in list(self._boards.items()):
+                    if time.monotonic() - board.built_at <= max_age:
+                        continue
+                    try:
+                        self._build(test_id)
+                    except Exception:
+                        log.exception("Leaderboard rebuild failed for test %s", test_id)
+                        db.session.rollback()
+                db.session.remove()
+
+                for board in list(self._boards.values()):
+                    if not board.changed:
+                        continue
+                    try:
+                        self.snapshot(board)
+                    except Exception:
+                        log.exception("Leaderboard snapshot failed for test %s", board.test_id)
+                        db.session.rollback()
+                        board.changed = True
+                db.session.remove()
+
+
+leaderboards = LeaderboardRegistry()
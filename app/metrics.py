@@ -0,0 +1,252 @@
+import hmac
+import logging
+import threading
+import time
+from flask import Response, abort, current_app, g, has_app_context, has_request_context, request
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+# Hot-path instrumentation, exported in the Prometheus text format on /metrics.
+#
+# Every request records its wall time, how many SQL statements it ran and
+# how long they took (from SQLAlchemy engine events), and how long each
+# template took to render. Judge0 calls record their latency by language
+# and verdict, and failures by reason. Requests slower than
+# SLOW_REQUEST_THRESHOLD are logged together with the statements they ran.
+#
+# Metrics live in process memory: with several gunicorn workers each scrape
+# sees one worker, so scrape workers individually or aggregate by instance.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SLOW_LOG_STATEMENTS = 100  # statements kept per request for the slow-request log
+SLOW_LOG_STATEMENT_LENGTH = 500
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labels, values)} {total}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per combination of label values."""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{_labels(self.labels, values, [("le", bound)])} {count}')
+                lines.append(f'{self.name}_bucket{_labels(self.labels, values, [("le", "+Inf")])} {series[-2]}')
+                lines.append(f'{self.name}_count{_labels(self.labels, values)} {series[-2]}')
+                lines.append(f'{self.name}_sum{_labels(self.labels, values)} {round(series[-1], 6)}')
+        return lines
+
+
+class Metrics:
+    """
+    The app's instruments. init_app hooks request, template and SQL timing
+    into the app and adds the /metrics endpoint.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.requests = Histogram(
+            'http_request_duration_seconds', 'Request wall time.', ('endpoint', 'method', 'status'))
+        self.request_queries = Histogram(
+            'http_request_sql_queries', 'SQL statements per request.', ('endpoint',), COUNT_BUCKETS)
+        self.request_sql_time = Histogram(
+            'http_request_sql_duration_seconds', 'Time spent in SQL per request.', ('endpoint',))
+        self.queries = Histogram(
+            'sql_query_duration_seconds', 'SQL statement time; "background" outside requests.', ('endpoint',))
+        self.templates = Histogram(
+            'template_render_duration_seconds', 'Template render time.', ('template',))
+        self.judge = Histogram(
+            'judge0_request_duration_seconds', 'Judge0 (or local executor) time per submission.',
+            ('language_id', 'status'))
+        self.judge_errors = Counter(
+            'judge0_errors_total', 'Submissions that got no verdict.', ('language_id', 'reason'))
+        self.slow_requests = Counter(
+            'http_slow_requests_total', 'Requests over SLOW_REQUEST_THRESHOLD.', ('endpoint',))
+        if app is not None:
+            self.init_app(app)
+
+    @property
+    def instruments(self):
+        return [self.requests, self.request_queries, self.request_sql_time, self.queries,
+                self.templates, self.judge, self.judge_errors, self.slow_requests]
+
+    def init_app(self, app):
+        if not app.config['METRICS_TOKEN'] and not app.debug:
+            # /metrics names every endpoint and how it performs; don't serve it to anyone who asks
+            raise RuntimeError("Set METRICS_TOKEN to serve /metrics outside debug mode")
+        self.app = app
+        app.extensions['metrics'] = self
+        _listen_to_engines()
+        app.before_request(self._request_started)
+        app.after_request(self._record_status)
+        app.teardown_request(self._request_finished)
+        before_render_template.connect(self._render_started, app)
+        template_rendered.connect(self._render_finished, app)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    # --- Requests ---
+
+    def _request_started(self):
+        g.metrics_request = {"start": time.perf_counter(), "queries": 0, "sql_time": 0.0, "statements": []}
+
+    def _request_finished(self, exc=None):
+        state = g.pop('metrics_request', None)
+        if state is None or request.endpoint == 'metrics':
+            return
+        elapsed = time.perf_counter() - state["start"]
+        endpoint = request.endpoint or 'unmatched'
+        status = 500 if exc is not None else g.pop('metrics_status', 200)
+        self.requests.observe(elapsed, endpoint, request.method, status)
+        self.request_queries.observe(state["queries"], endpoint)
+        self.request_sql_time.observe(state["sql_time"], endpoint)
+
+        threshold = self.app.config['SLOW_REQUEST_THRESHOLD']
+        if threshold is not None and elapsed >= threshold:
+            self.slow_requests.inc(endpoint)
+            statements = '\n'.join(
+                f"  {seconds * 1000:8.1f} ms  {statement}" for statement, seconds in state["statements"])
+            log.warning("Slow request %s %s (%s) took %.3fs: %d queries, %.3fs in SQL\n%s",
+                        request.method, request.path, endpoint, elapsed,
+                        state["queries"], state["sql_time"], statements)
+
+    def _record_status(self, response):
+        # teardown_request doesn't see the response, so after_request notes its status
+        g.metrics_status = response.status_code
+        return response
+
+    # --- SQL ---
+
+    def record_query(self, statement, seconds):
+        if has_request_context() and 'metrics_request' in g:
+            state = g.metrics_request
+            state["queries"] += 1
+            state["sql_time"] += seconds
+            if len(state["statements"]) < SLOW_LOG_STATEMENTS:
+                state["statements"].append((statement[:SLOW_LOG_STATEMENT_LENGTH], seconds))
+            self.queries.observe(seconds, request.endpoint or 'unmatched')
+        else:
+            self.queries.observe(seconds, 'background')
+
+    # --- Templates ---
+
+    def _render_started(self, sender, template, context, **extra):
+        g.setdefault('metrics_renders', []).append(time.perf_counter())
+
+    def _render_finished(self, sender, template, context, **extra):
+        starts = g.get('metrics_renders')
+        if starts:
+            self.templates.observe(time.perf_counter() - starts.pop(), template.name or 'string')
+
+    # --- Judge0 ---
+
+    def observe_judge(self, language_id, result, seconds):
+        if result.get("error"):
+            message = result.get("message") or ''
+            # Messages from judge0.py: poll timeouts, the open circuit, anything else
+            reason = 'timeout' if 'Timed out' in message else 'unavailable' if 'unavailable' in message else 'error'
+            self.judge_errors.inc(language_id, reason)
+            self.judge.observe(seconds, language_id, 'error')
+            return
+        status = (result.get("status") or {}).get("description") or 'unknown'
+        self.judge.observe(seconds, language_id, status)
+
+    # --- Export ---
+
+    def expose(self):
+        lines = []
+        for instrument in self.instruments:
+            lines.extend(instrument.expose())
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        token = self.app.config['METRICS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+            abort(401)
+        return Response(self.expose(), mimetype='text/plain; version=0.0.4')
+
+
+_listening = False
+
+
+def _listen_to_engines():
+    """Times every statement on every engine; registered once per process."""
+    global _listening
+    if _listening:
+        return
+    _listening = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts or not has_app_context():
+            return
+        seconds = time.perf_counter() - starts.pop()
+        metrics = current_app.extensions.get('metrics')
+        if metrics is not None:
+            metrics.record_query(statement, seconds)
+
+    @event.listens_for(Engine, 'handle_error')
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute
+        starts = context.connection.info.get('metrics_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+metrics = Metrics()
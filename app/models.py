@@ -55,9 +55,12 @@
 #     question_id = db.Column(db.Integer, db.ForeignKey('coding_question.id'))
 
 
+from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from . import db, login_manager
+from .auth import user_cache, watch_user_changes, hash_password, password_needs_rehash
+from .blobs import blob_store
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -67,22 +70,31 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(10), index=True, default='student') # 'admin' or 'student'
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def needs_rehash(self):
+        """True if the stored hash predates the current PASSWORD_HASH_METHOD."""
+        return password_needs_rehash(self.password_hash)
+
     def __repr__(self):
         return f'<User {self.username}>'
 
+# Cached users must not outlive a role or password change
+watch_user_changes(User, 'role', 'password_hash')
+
 @login_manager.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    return user_cache.load(User, int(id))
 
 class Test(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     duration_minutes = db.Column(db.Integer, nullable=False)
+    grading_mode = db.Column(db.String(20), nullable=False, default='partial') # 'partial' or 'all_or_nothing'
+    published_at = db.Column(db.DateTime) # set when the candidate paper is frozen; also its version (app/papers.py)
     
     mcq_questions = db.relationship('MCQQuestion', backref='test', lazy='dynamic', cascade="all, delete-orphan")
     coding_questions = db.relationship('CodingQuestion', backref='test', lazy='dynamic', cascade="all, delete-orphan")
@@ -90,13 +102,13 @@ class Test(db.Model):
 class MCQOption(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     option_text = db.Column(db.String(300), nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey('mcq_question.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('mcq_question.id'), nullable=False, index=True)
 
 class MCQQuestion(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     question_text = db.Column(db.String(500), nullable=False)
     marks = db.Column(db.Integer, nullable=False, default=1)
-    test_id = db.Column(db.Integer, db.ForeignKey('test.id'), nullable=False)
+    test_id = db.Column(db.Integer, db.ForeignKey('test.id'), nullable=False, index=True)
     
     options = db.relationship(
         'MCQOption', 
@@ -114,6 +126,18 @@ class CodingQuestion(db.Model):
     problem_statement = db.Column(db.Text, nullable=False)
     marks = db.Column(db.Integer, nullable=False, default=10)
     difficulty = db.Column(db.String(20), nullable=False, default='Medium')
+    grading_mode = db.Column(db.String(20)) # overrides Test.grading_mode when set
+    checker = db.Column(db.String(30), nullable=False, default='exact') # output comparison mode, see app/checkers.py
+    float_tolerance = db.Column(db.Float) # for the 'float' checker
+    reference_solution = db.Column(db.Text) # optional; checked against every test case (app/validation.py)
+    reference_language_id = db.Column(db.Integer)
+    validation_status = db.Column(db.String(20)) # None (no reference), 'running', 'passed', 'failed' or 'error'
+    validated_at = db.Column(db.DateTime) # when the last check started, then when it finished
+    # Resource limits for every test case, before language multipliers; None uses the config defaults
+    cpu_time_limit = db.Column(db.Float) # seconds
+    wall_time_limit = db.Column(db.Float) # seconds
+    memory_limit = db.Column(db.Integer) # KB
+    auto_limits = db.Column(db.Boolean, nullable=False, default=False) # derive per-case limits from the reference run
     
     
     # Starter code for multiple languages
@@ -123,12 +147,158 @@ class CodingQuestion(db.Model):
     starter_code_c = db.Column(db.Text)
     starter_code_javascript = db.Column(db.Text)
 
-    test_id = db.Column(db.Integer, db.ForeignKey('test.id'), nullable=False)
+    test_id = db.Column(db.Integer, db.ForeignKey('test.id'), nullable=False, index=True)
     test_cases = db.relationship('TestCase', backref='coding_question', lazy='dynamic', cascade="all, delete-orphan")
 
+class TestBlob(db.Model):
+    """Compressed test case data, stored once per distinct content (see app/blobs.py)."""
+    hash = db.Column(db.String(64), primary_key=True) # sha256 of the UTF-8 text
+    size = db.Column(db.Integer, nullable=False) # bytes before compression
+    codec = db.Column(db.String(10), nullable=False) # 'none', 'gzip' or 'zstd'
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
 class TestCase(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    input = db.Column(db.Text)
-    expected_output = db.Column(db.Text, nullable=False)
+    # Only references to the data live on the row; the text is read from the blob store on access
+    input_hash = db.Column(db.String(64), db.ForeignKey('test_blob.hash'), index=True) # None when there is no stdin
+    input_size = db.Column(db.Integer, nullable=False, default=0) # bytes
+    expected_output_hash = db.Column(db.String(64), db.ForeignKey('test_blob.hash'), nullable=False, index=True)
+    expected_output_size = db.Column(db.Integer, nullable=False, default=0)
     is_hidden = db.Column(db.Boolean, default=True)
-    question_id = db.Column(db.Integer, db.ForeignKey('coding_question.id'), nullable=False)
\ No newline at end of file
+    measured_time = db.Column(db.Float) # seconds; used to run cheap cases first
+    measured_memory = db.Column(db.Integer) # KB used by the reference solution
+    validation_status = db.Column(db.String(10)) # reference run: 'ok', 'mismatch' or 'error'
+    validation_message = db.Column(db.String(200))
+    cpu_time_limit = db.Column(db.Float) # overrides the question's limits when set
+    wall_time_limit = db.Column(db.Float)
+    memory_limit = db.Column(db.Integer)
+    question_id = db.Column(db.Integer, db.ForeignKey('coding_question.id'), nullable=False, index=True)
+
+    @property
+    def input(self):
+        return blob_store.read_text(self.input_hash)
+
+    @input.setter
+    def input(self, text):
+        self.input_hash, self.input_size = blob_store.put(text)
+
+    @property
+    def expected_output(self):
+        return blob_store.read_text(self.expected_output_hash)
+
+    @expected_output.setter
+    def expected_output(self, text):
+        self.expected_output_hash, self.expected_output_size = blob_store.put(text)
+
+blob_store.register(TestBlob, TestCase.input_hash, TestCase.expected_output_hash)
+
+class Submission(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('coding_question.id'), nullable=False, index=True)
+    kind = db.Column(db.String(10), nullable=False, default='submit') # 'run' (custom stdin) or 'submit' (graded)
+    language_id = db.Column(db.Integer, nullable=False)
+    source_code = db.Column(db.Text, nullable=False)
+    stdin = db.Column(db.Text) # only used for 'run'
+    status = db.Column(db.String(10), nullable=False, default='queued', index=True) # 'queued', 'running', 'done' or 'error'
+    tokens = db.Column(db.Text) # comma separated Judge0 tokens while running, one slot per test case
+    lease_until = db.Column(db.DateTime) # renewed by the process working on it; a takeover is due once it passes
+    result = db.Column(db.JSON)
+    score = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    user = db.relationship('User')
+    question = db.relationship('CodingQuestion')
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "question_id": self.question_id,
+            "kind": self.kind,
+            "status": self.status,
+            "result": self.result,
+            "score": self.score,
+        }
+
+
+class JudgeResult(db.Model):
+    """Persistent tier of the Judge0 result cache (see app/judge_cache.py)."""
+    key = db.Column(db.String(200), primary_key=True) # sha256(code):language_id:sha256(stdin):sha256(expected)
+    result = db.Column(db.JSON, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class ExamSession(db.Model):
+    """One candidate's attempt at a test."""
+    __table_args__ = (db.UniqueConstraint('user_id', 'test_id', name='uq_exam_session_user_test'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    test_id = db.Column(db.Integer, db.ForeignKey('test.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='in_progress', index=True) # 'in_progress', 'submitted' or 'timed_out'
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ends_at = db.Column(db.DateTime, nullable=False) # started_at + Test.duration_minutes
+    finished_at = db.Column(db.DateTime)
+
+    user = db.relationship('User')
+    test = db.relationship('Test')
+    answers = db.relationship('Answer', backref='session', lazy='dynamic', cascade="all, delete-orphan")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "test_id": self.test_id,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "ends_at": self.ends_at.isoformat(),
+        }
+
+
+class Answer(db.Model):
+    """Latest saved answer to one question in an exam session (autosaved)."""
+    __table_args__ = (db.UniqueConstraint('session_id', 'kind', 'question_id', name='uq_answer_session_question'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('exam_session.id'), nullable=False)
+    kind = db.Column(db.String(10), nullable=False) # 'mcq' or 'coding'
+    question_id = db.Column(db.Integer, nullable=False) # MCQQuestion.id or CodingQuestion.id, per kind
+    selected_option_id = db.Column(db.Integer) # for 'mcq'
+    language_id = db.Column(db.Integer) # for 'coding'
+    code = db.Column(db.Text) # for 'coding'
+    version = db.Column(db.Integer, nullable=False, default=0) # client edit counter, for diff saves
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class LeaderboardEntry(db.Model):
+    """Periodic snapshot of a test's live leaderboard (see app/leaderboard.py)."""
+    __table_args__ = (db.UniqueConstraint('test_id', 'user_id', name='uq_leaderboard_entry_test_user'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    test_id = db.Column(db.Integer, db.ForeignKey('test.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    reached_at = db.Column(db.DateTime, nullable=False) # when the candidate reached this score; breaks ties
+    snapshot_at = db.Column(db.DateTime, nullable=False)
+
+
+class PlagiarismReport(db.Model):
+    """One run of the similarity check over a test (see app/plagiarism.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    test_id = db.Column(db.Integer, db.ForeignKey('test.id'), nullable=False, index=True)
+    status = db.Column(db.String(10), nullable=False, default='queued') # 'queued', 'running', 'done' or 'error'
+    result = db.Column(db.JSON) # question id -> clusters of similar submissions
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "test_id": self.test_id,
+            "status": self.status,
+            "result": self.result,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,256 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import selectinload
+from . import db
+from .models import Test, MCQQuestion, MCQOption, CodingQuestion, TestCase
+
+# Frozen question papers for candidates.
+#
+# Publishing a test serializes it once (questions, options, starter code and
+# visible test cases; never correct answers or hidden cases) into JSON bytes
+# with an ETag and a gzip copy. Every candidate request after that is served
+# from memory (or PAPER_CACHE_DIR) with no ORM work at all.
+#
+# Test.published_at doubles as the paper version: editing any question on a
+# published test bumps it, so every process notices its copy is stale.
+
+Paper = namedtuple('Paper', ['test_id', 'version', 'etag', 'body', 'gzipped', 'question_keys'])
+
+STARTER_CODE_FIELDS = ('python', 'java', 'cpp', 'c', 'javascript')
+
+# Columns that change while grading or validating, resource limits, and
+# the paper version itself, none of which are part of the paper
+BOOKKEEPING_FIELDS = {
+    'measured_time', 'measured_memory', 'validation_status', 'validation_message', 'validated_at',
+    'cpu_time_limit', 'wall_time_limit', 'memory_limit', 'auto_limits', 'published_at',
+}
+
+# Models whose rows make up a paper
+PAPER_MODELS = (Test, MCQQuestion, MCQOption, CodingQuestion, TestCase)
+
+
+def build_paper(test):
+    """Serializes a test as candidates see it. Returns a Paper."""
+    mcqs = (MCQQuestion.query
+            .filter_by(test_id=test.id)
+            .options(selectinload(MCQQuestion.options))
+            .order_by(MCQQuestion.id).all())
+    coding = CodingQuestion.query.filter_by(test_id=test.id).order_by(CodingQuestion.id).all()
+    visible = {}
+    if coding:
+        for tc in (TestCase.query
+                   .filter(TestCase.question_id.in_([q.id for q in coding]), TestCase.is_hidden.is_(False))
+                   .order_by(TestCase.id)):
+            visible.setdefault(tc.question_id, []).append({"input": tc.input, "expected_output": tc.expected_output})
+
+    paper = {
+        "id": test.id,
+        "name": test.name,
+        "duration_minutes": test.duration_minutes,
+        "mcq_questions": [{
+            "id": q.id,
+            "question_text": q.question_text,
+            "marks": q.marks,
+            "options": [{"id": o.id, "option_text": o.option_text} for o in sorted(q.options, key=lambda o: o.id)],
+        } for q in mcqs],
+        "coding_questions": [{
+            "id": q.id,
+            "problem_statement": q.problem_statement,
+            "marks": q.marks,
+            "difficulty": q.difficulty,
+            "grading_mode": q.grading_mode or test.grading_mode,
+            "starter_code": {lang: getattr(q, f'starter_code_{lang}') for lang in STARTER_CODE_FIELDS},
+            "examples": visible.get(q.id, []),
+        } for q in coding],
+    }
+    body = json.dumps(paper, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return _paper(test.id, test.published_at.isoformat(), body, gzip.compress(body, compresslevel=9, mtime=0))
+
+
+def _question_keys(body):
+    """('mcq' | 'coding', question id) pairs on a serialized paper."""
+    paper = json.loads(body)
+    return frozenset(
+        [('mcq', q['id']) for q in paper['mcq_questions']]
+        + [('coding', q['id']) for q in paper['coding_questions']]
+    )
+
+
+def _paper(test_id, version, body, gzipped):
+    return Paper(
+        test_id=test_id,
+        version=version,
+        etag=hashlib.sha256(body).hexdigest()[:32],
+        body=body,
+        # Built with mtime=0, so the compressed bytes are identical across processes
+        gzipped=gzipped,
+        question_keys=_question_keys(body),
+    )
+
+
+class PaperCache:
+    """In-process store of published papers, with an optional on-disk copy."""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._papers = {}  # test_id -> Paper
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(directory=config['PAPER_CACHE_DIR'])
+
+    def _path(self, test_id, version, suffix):
+        # The version is in the file name so stale files are never served
+        stamp = version.replace(':', '').replace('.', '')
+        return os.path.join(self.directory, f"test-{test_id}-{stamp}{suffix}")
+
+    def _load(self, test_id, version):
+        try:
+            with open(self._path(test_id, version, '.json'), 'rb') as f:
+                body = f.read()
+            with open(self._path(test_id, version, '.json.gz'), 'rb') as f:
+                gzipped = f.read()
+        except OSError:
+            return None
+        return _paper(test_id, version, body, gzipped)
+
+    def _save(self, paper):
+        for suffix, data in (('.json', paper.body), ('.json.gz', paper.gzipped)):
+            path = self._path(paper.test_id, paper.version, suffix)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+    def get(self, test_id):
+        """The current paper for a published test, or None if it isn't published."""
+        # One indexed scalar read checks the version; the paper itself is cached
+        published_at = db.session.query(Test.published_at).filter(Test.id == test_id).scalar()
+        if published_at is None:
+            return None
+        version = published_at.isoformat()
+
+        paper = self._papers.get(test_id)
+        if paper is not None and paper.version == version:
+            return paper
+
+        with self._lock:
+            paper = self._papers.get(test_id)
+            if paper is not None and paper.version == version:
+                return paper
+            paper = self._load(test_id, version) if self.directory else None
+            if paper is None:
+                paper = build_paper(Test.query.get(test_id))
+                if self.directory:
+                    self._save(paper)
+            self._papers[test_id] = paper
+            return paper
+
+    def invalidate(self, test_id):
+        with self._lock:
+            self._papers.pop(test_id, None)
+        if self.directory:
+            prefix = f"test-{test_id}-"
+            for name in os.listdir(self.directory):
+                if name.startswith(prefix):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+
+def get_paper_cache():
+    return current_app.extensions['papers']
+
+
+def publish_test(test):
+    """Freezes the test's current questions as its candidate paper."""
+    test.published_at = datetime.utcnow()
+    db.session.commit()
+    cache = get_paper_cache()
+    cache.invalidate(test.id)
+    return cache.get(test.id)
+
+
+def mark_changed(test_id):
+    """
+    Records that a test's questions changed outside the ORM (e.g. a bulk
+    import), so a published paper is rebuilt on the next request.
+    """
+    test = Test.query.get(test_id)
+    if test is not None and test.published_at is not None:
+        test.published_at = datetime.utcnow()
+        db.session.commit()
+    get_paper_cache().invalidate(test_id)
+
+
+# --- Invalidation on question edits ---
+
+def _changes_paper(obj):
+    state = inspect(obj)
+    return any(
+        attr.history.has_changes()
+        for attr in state.attrs
+        if attr.key not in BOOKKEEPING_FIELDS
+    )
+
+
+def _test_id_of(session, obj):
+    if isinstance(obj, Test):
+        return obj.id
+    if isinstance(obj, (MCQQuestion, CodingQuestion)):
+        return obj.test_id if obj.test_id is not None else getattr(obj.test, 'id', None)
+    if isinstance(obj, MCQOption):
+        question = obj.question or (session.get(MCQQuestion, obj.question_id) if obj.question_id else None)
+    elif isinstance(obj, TestCase):
+        question = obj.coding_question or (session.get(CodingQuestion, obj.question_id) if obj.question_id else None)
+    else:
+        return None
+    return question.test_id if question is not None else None
+
+
+# Registered on the app's own sessions only, and anything that isn't part of
+# a paper (submissions, sessions, ...) is skipped before looking at its history
+
+@event.listens_for(db.session, 'before_flush')
+def _bump_paper_versions(session, flush_context, instances):
+    changed = set()
+    with session.no_autoflush:
+        dirty = [obj for obj in session.dirty if isinstance(obj, PAPER_MODELS) and _changes_paper(obj)]
+        new_or_deleted = [obj for obj in list(session.new) + list(session.deleted) if isinstance(obj, PAPER_MODELS)]
+        for obj in new_or_deleted + dirty:
+            test_id = _test_id_of(session, obj)
+            if test_id is not None:
+                changed.add(test_id)
+        for test_id in changed:
+            test = session.get(Test, test_id)
+            if test is not None and test.published_at is not None and test not in session.deleted:
+                test.published_at = datetime.utcnow()
+    if changed:
+        session.info.setdefault('changed_papers', set()).update(changed)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _drop_stale_papers(session):
+    changed = session.info.pop('changed_papers', None)
+    if not changed or not has_app_context():
+        return
+    cache = current_app.extensions.get('papers')
+    if cache is not None:
+        for test_id in changed:
+            cache.invalidate(test_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changed_papers(session):
+    session.info.pop('changed_papers', None)
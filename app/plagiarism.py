@@ -0,0 +1,291 @@
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, update
+from . import db
+from .models import CodingQuestion, Submission, PlagiarismReport
+
+log = logging.getLogger(__name__)
+
+# Near-duplicate detection for coding answers.
+#
+# Each answer is lexed into a language-aware token stream in which names,
+# numbers and strings are normalized (so renaming variables doesn't help),
+# then fingerprinted MOSS-style: hashes of every k-gram of tokens, winnowed
+# to the minimum of each sliding window. Fingerprints that also occur in the
+# question's starter code are dropped. MinHash signatures of the remaining
+# sets go into an LSH index (bands of rows), so only answers sharing a band
+# are ever compared, instead of all n^2 pairs; those candidate pairs are
+# confirmed by exact Jaccard similarity and grouped into clusters.
+
+KGRAM = 5  # tokens per fingerprinted k-gram
+WINDOW = 4  # winnowing window, in k-grams
+NUM_PERM = 64  # MinHash signature length
+BANDS = 16  # LSH bands of NUM_PERM // BANDS rows each
+MIN_FINGERPRINTS = 8  # answers shorter than this are too generic to compare
+_PRIME = (1 << 61) - 1
+
+PYTHON = 71  # every other language in executors.LANGUAGES is lexed as C-like
+
+KEYWORDS = {
+    PYTHON: {
+        'and', 'as', 'assert', 'break', 'class', 'continue', 'def', 'del', 'elif', 'else', 'except',
+        'finally', 'for', 'from', 'global', 'if', 'import', 'in', 'is', 'lambda', 'nonlocal', 'not',
+        'or', 'pass', 'raise', 'return', 'try', 'while', 'with', 'yield', 'None', 'True', 'False',
+        'print', 'input', 'range', 'len',
+    },
+    'c_like': {
+        'auto', 'break', 'case', 'catch', 'char', 'class', 'const', 'continue', 'default', 'do',
+        'double', 'else', 'enum', 'extends', 'false', 'final', 'float', 'for', 'function', 'if',
+        'implements', 'import', 'include', 'int', 'let', 'long', 'new', 'null', 'private', 'protected',
+        'public', 'return', 'short', 'signed', 'static', 'struct', 'switch', 'this', 'throw', 'true',
+        'try', 'typedef', 'unsigned', 'var', 'void', 'while', 'bool', 'boolean', 'string', 'String',
+        'vector', 'std', 'cout', 'cin', 'printf', 'scanf', 'System', 'of', 'in',
+    },
+}
+
+_COMMENTS = {
+    PYTHON: re.compile(r'#[^\n]*|"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\''),
+    'c_like': re.compile(r'//[^\n]*|/\*[\s\S]*?\*/'),
+}
+_TOKEN = re.compile(
+    r'(?P<string>"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`)'
+    r'|(?P<number>\d+(?:\.\d+)?)'
+    r'|(?P<name>[A-Za-z_]\w*)'
+    r'|(?P<op>[^\s\w])'
+)
+
+
+def tokenize(code, language_id):
+    """Normalized tokens: keywords and operators as-is, other names as 'V'."""
+    family = PYTHON if language_id == PYTHON else 'c_like'
+    code = _COMMENTS[family].sub(' ', code or '')
+    keywords = KEYWORDS[family]
+    tokens = []
+    for match in _TOKEN.finditer(code):
+        kind = match.lastgroup
+        text = match.group()
+        if kind == 'string':
+            tokens.append('S')
+        elif kind == 'number':
+            tokens.append('N')
+        elif kind == 'name':
+            tokens.append(text if text in keywords else 'V')
+        elif text not in ';,':
+            tokens.append(text)
+    return tokens
+
+
+def _hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def fingerprints(code, language_id):
+    """The winnowed k-gram hashes of an answer."""
+    tokens = tokenize(code, language_id)
+    hashes = [_hash(' '.join(tokens[i:i + KGRAM])) for i in range(len(tokens) - KGRAM + 1)]
+    if len(hashes) <= WINDOW:
+        return set(hashes)
+    selected = set()
+    for i in range(len(hashes) - WINDOW + 1):
+        selected.add(min(hashes[i:i + WINDOW]))
+    return selected
+
+
+def _permutations():
+    rng = random.Random(20240601)  # fixed, so signatures are comparable across processes
+    return [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+_PERMUTATIONS = _permutations()
+
+
+def minhash(prints):
+    return tuple(min((a * h + b) % _PRIME for h in prints) for a, b in _PERMUTATIONS)
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def find_clusters(answers, starter_codes, threshold):
+    """
+    answers: [(submission id, user id, language id, code)]
+    starter_codes: {language id: starter code}
+    Returns [{"similarity", "members": [[submission id, user id], ...]}] for
+    groups of answers whose pairwise similarity reaches `threshold`.
+    """
+    boilerplate = {}
+    prints = {}
+    for submission_id, user_id, language_id, code in answers:
+        if language_id not in boilerplate:
+            boilerplate[language_id] = fingerprints(starter_codes.get(language_id), language_id)
+        fp = fingerprints(code, language_id) - boilerplate[language_id]
+        if len(fp) >= MIN_FINGERPRINTS:
+            prints[(submission_id, user_id)] = fp
+
+    rows = NUM_PERM // BANDS
+    buckets = {}
+    for key, fp in prints.items():
+        signature = minhash(fp)
+        for band in range(BANDS):
+            buckets.setdefault((band, signature[band * rows:(band + 1) * rows]), []).append(key)
+
+    parent = {key: key for key in prints}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    best = {}
+    checked = set()
+    for members in buckets.values():
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                a, b = members[i], members[j]
+                # Answers from the same candidate are not evidence of anything
+                if a[1] == b[1] or (a, b) in checked:
+                    continue
+                checked.add((a, b))
+                similarity = _jaccard(prints[a], prints[b])
+                if similarity >= threshold:
+                    ra, rb = find(a), find(b)
+                    parent[ra] = rb
+                    best[rb] = max(similarity, best.pop(ra, 0), best.get(rb, 0))
+
+    clusters = {}
+    for key in prints:
+        clusters.setdefault(find(key), []).append(key)
+    return sorted(
+        ({"similarity": round(best[root], 3), "members": [list(m) for m in sorted(members)]}
+         for root, members in clusters.items() if len(members) > 1),
+        key=lambda c: -c["similarity"]
+    )
+
+
+def _check_question(job):
+    question_id, answers, starter_codes, threshold = job
+    return question_id, find_clusters(answers, starter_codes, threshold)
+
+
+def _latest_answers(question_ids):
+    """Each candidate's latest graded answer per question, in one query."""
+    latest = (select(func.max(Submission.id))
+              .where(Submission.question_id.in_(question_ids), Submission.kind == 'submit')
+              .group_by(Submission.user_id, Submission.question_id))
+    rows = db.session.execute(
+        select(Submission.question_id, Submission.id, Submission.user_id, Submission.language_id, Submission.source_code)
+        .where(Submission.id.in_(latest))
+    )
+    answers = {}
+    for question_id, submission_id, user_id, language_id, code in rows:
+        answers.setdefault(question_id, []).append((submission_id, user_id, language_id, code))
+    return answers
+
+
+def check_test(test_id):
+    """Runs the detector over every coding question of a test, one process per question."""
+    config = current_app.config
+    questions = CodingQuestion.query.filter_by(test_id=test_id).all()
+    answers = _latest_answers([q.id for q in questions]) if questions else {}
+    jobs = [(
+        q.id,
+        answers.get(q.id, []),
+        {71: q.starter_code_python, 62: q.starter_code_java, 54: q.starter_code_cpp,
+         50: q.starter_code_c, 63: q.starter_code_javascript},
+        config['PLAGIARISM_THRESHOLD'],
+    ) for q in questions if len(answers.get(q.id, [])) > 1]
+
+    workers = min(config['PLAGIARISM_WORKERS'] or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        # Imported here so that web workers don't load multiprocessing at boot
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # Fresh interpreters: this runs on a thread of a web worker, and a
+        # fork would copy that process's other threads' locks mid-use
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = dict(pool.map(_check_question, jobs))
+    else:
+        results = dict(_check_question(job) for job in jobs)
+    return {str(question_id): clusters for question_id, clusters in results.items() if clusters}
+
+
+def run_report(report_id):
+    report = PlagiarismReport.query.get(report_id)
+    report.status = 'running'
+    db.session.commit()
+    try:
+        report.result = check_test(report.test_id)
+        report.status = 'done'
+    except Exception:
+        log.exception("Plagiarism check %s failed", report_id)
+        db.session.rollback()
+        report.status = 'error'
+    report.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def expire_stale_reports(test_id):
+    """
+    Marks the test's checks that never finished because their process died
+    (a restart, a crash) as 'error', so they don't read as running forever.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['PLAGIARISM_STALE_AFTER'])
+    result = db.session.execute(
+        update(PlagiarismReport)
+        .where(PlagiarismReport.test_id == test_id, PlagiarismReport.status.in_(['queued', 'running']),
+               PlagiarismReport.created_at < cutoff)
+        .values(status='error', finished_at=datetime.utcnow())
+    )
+    if result.rowcount:
+        db.session.commit()
+
+
+def start_report(test_id):
+    """Queues a plagiarism check of a test on a background thread."""
+    report = PlagiarismReport(test_id=test_id)
+    db.session.add(report)
+    db.session.commit()
+    app = current_app._get_current_object()
+    report_id = report.id
+
+    def work():
+        with app.app_context():
+            try:
+                run_report(report_id)
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=work, name=f'plagiarism-{report.id}', daemon=True).start()
+    return report
+
+
+@click.command('check-plagiarism')
+@click.argument('test_id', type=int)
+@with_appcontext
+def check_plagiarism_command(test_id):
+    """Find near-duplicate coding answers on a test."""
+    report = PlagiarismReport(test_id=test_id)
+    db.session.add(report)
+    db.session.commit()
+    run_report(report.id)
+    report = PlagiarismReport.query.get(report.id)
+    if report.status != 'done':
+        raise click.ClickException("The check failed; see the log.")
+    for question_id, clusters in report.result.items():
+        click.echo(f"Question {question_id}:")
+        for cluster in clusters:
+            members = ', '.join(f"submission {s} (user {u})" for s, u in cluster["members"])
+            click.echo(f"  {cluster['similarity']:.0%}: {members}")
+    if not report.result:
+        click.echo("No similar answers found.")
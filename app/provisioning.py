@@ -0,0 +1,177 @@
+import csv
+import os
+import re
+import secrets
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from . import db
+from .models import User
+
+# Bulk candidate accounts from a CSV with columns username, email and
+# (optionally) password. Missing passwords are generated and reported back
+# once. The whole file is checked against existing users with one query,
+# passwords are hashed on a process pool, and rows are inserted in batches.
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class ProvisionReport:
+    def __init__(self):
+        self.created = []  # (username, email, generated password or None)
+        self.conflicts = []  # (row number, username, email, reason)
+
+    def conflict(self, number, username, email, reason):
+        self.conflicts.append((number, username, email, reason))
+
+
+def _hash(args):
+    password, method, salt_length = args
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def hash_passwords(passwords):
+    """Hashes passwords with the configured parameters across worker processes."""
+    config = current_app.config
+    jobs = [(p, config['PASSWORD_HASH_METHOD'], config['PASSWORD_SALT_LENGTH']) for p in passwords]
+    workers = config['PROVISION_HASH_WORKERS'] or os.cpu_count() or 1
+    if len(jobs) < 2 or workers == 1:
+        return [_hash(job) for job in jobs]
+    # Hashing is deliberately CPU-bound, so it runs on processes, not threads.
+    # Spawned, not forked: this may run inside a threaded web worker
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor  # not loaded by web workers until needed
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return list(pool.map(_hash, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+
+def _read_rows(fileobj, report):
+    """Valid, in-file-unique rows as (number, username, email, password)."""
+    rows = []
+    seen_usernames, seen_emails = set(), set()
+    for number, row in enumerate(csv.DictReader(fileobj), start=1):
+        username = (row.get('username') or '').strip()
+        email = (row.get('email') or '').strip()
+        password = (row.get('password') or '').strip() or None
+        if not 4 <= len(username) <= 64:
+            report.conflict(number, username, email, 'username must be 4 to 64 characters')
+        elif not EMAIL_RE.match(email) or len(email) > 120:
+            report.conflict(number, username, email, 'invalid email address')
+        elif username in seen_usernames:
+            report.conflict(number, username, email, 'username repeated in file')
+        elif email in seen_emails:
+            report.conflict(number, username, email, 'email repeated in file')
+        else:
+            seen_usernames.add(username)
+            seen_emails.add(email)
+            rows.append((number, username, email, password))
+    return rows
+
+
+def _existing(rows):
+    """(usernames, emails) among `rows` that are already taken, in one query."""
+    if not rows:
+        return set(), set()
+    usernames = {r[1] for r in rows}
+    emails = {r[2] for r in rows}
+    taken = (db.session.query(User.username, User.email)
+             .filter(or_(User.username.in_(usernames), User.email.in_(emails)))
+             .all())
+    return {u for u, _ in taken} & usernames, {e for _, e in taken} & emails
+
+
+def _drop_taken(rows, report):
+    taken_usernames, taken_emails = _existing(rows)
+    fresh = []
+    for row in rows:
+        number, username, email, _ = row
+        if username in taken_usernames:
+            report.conflict(number, username, email, 'username already registered')
+        elif email in taken_emails:
+            report.conflict(number, username, email, 'email already registered')
+        else:
+            fresh.append(row)
+    return fresh
+
+
+def _insert(batch):
+    db.session.execute(insert(User), [
+        {'username': username, 'email': email, 'password_hash': password_hash, 'role': 'student'}
+        for (_, username, email, _), password_hash in batch
+    ])
+    db.session.commit()
+
+
+def _insert_batch(batch, report):
+    """
+    Inserts (row, hash, password) items, dropping and reporting rows taken
+    since they were checked. Returns the items inserted.
+    """
+    while batch:
+        try:
+            _insert([(row, h) for row, h, _ in batch])
+            return batch
+        except IntegrityError:
+            # Someone registered one of these meanwhile; recheck and retry the rest
+            db.session.rollback()
+            fresh = set(r[0] for r in _drop_taken([row for row, _, _ in batch], report))
+            if len(fresh) == len(batch):
+                # No longer taken (or clashing in a way the check can't see); go row by row
+                return [item for item in batch if _insert_one(item, report)]
+            batch = [item for item in batch if item[0][0] in fresh]
+    return batch
+
+
+def _insert_one(item, report):
+    row, password_hash, _ = item
+    try:
+        _insert([(row, password_hash)])
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        number, username, email, _ = row
+        report.conflict(number, username, email, 'username or email already registered')
+        return False
+
+
+def provision_candidates(fileobj, batch_size=None):
+    """Creates student accounts from a CSV text file object. Returns a ProvisionReport."""
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+    report = ProvisionReport()
+    rows = _drop_taken(_read_rows(fileobj, report), report)
+
+    passwords = [password or secrets.token_urlsafe(9) for (_, _, _, password) in rows]
+    hashes = hash_passwords(passwords)
+
+    pending = list(zip(rows, hashes, passwords))
+    for i in range(0, len(pending), batch_size):
+        for (_, username, email, given), _, password in _insert_batch(pending[i:i + batch_size], report):
+            report.created.append((username, email, None if given else password))
+    return report
+
+
+@click.command('provision-candidates')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--credentials', type=click.Path(dir_okay=False, writable=True),
+              help='Write generated passwords to this CSV file instead of stdout.')
+@with_appcontext
+def provision_candidates_command(path, credentials):
+    """Create student accounts from a CSV of username, email[, password]."""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        report = provision_candidates(f)
+
+    click.echo(f"Created {len(report.created)} candidates, {len(report.conflicts)} conflicts.", err=True)
+    for number, username, email, reason in report.conflicts:
+        click.echo(f"  row {number} ({username}, {email}): {reason}", err=True)
+
+    generated = [(u, e, p) for u, e, p in report.created if p]
+    if not generated:
+        return
+    # Generated passwords are not stored anywhere else, so always hand them over
+    with click.open_file(credentials or '-', 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(['username', 'email', 'password'])
+        writer.writerows(generated)
@@ -0,0 +1,159 @@
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.orm import load_only, selectinload, joinedload
+from . import db
+from .models import Test, MCQQuestion, CodingQuestion, TestCase
+
+# Read queries for the admin pages. Each page is served by a fixed number of
+# statements no matter how many tests or questions there are: related rows
+# are eager-loaded with selectinload/joinedload and counts and totals are
+# computed in SQL instead of by walking relationships in the template.
+#
+# Lists are paginated by keyset (WHERE id < cursor ORDER BY id LIMIT n)
+# rather than OFFSET, so page N costs the same as page 1.
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def _keyset(query, column, after, per_page, key, descending=False):
+    """One page of `query` ordered by `column`, starting after cursor `after`."""
+    if after is not None:
+        query = query.filter(column < after if descending else column > after)
+    rows = query.order_by(column.desc() if descending else column).limit(per_page + 1).all()
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        return Page(rows, key(rows[-1]))
+    return Page(rows, None)
+
+
+def _per_page(per_page):
+    return per_page or current_app.config['ADMIN_PAGE_SIZE']
+
+
+def text_search(column, q):
+    """
+    Full-text match of `column` against a user query. On Postgres this uses
+    to_tsvector/websearch_to_tsquery, which the GIN indexes from the
+    question search migration serve; elsewhere it falls back to ILIKE.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_tsvector('english', column).op('@@')(func.websearch_to_tsquery('english', q))
+    return contains(column, q)
+
+
+def contains(column, text):
+    """Case-insensitive substring match; % and _ in `text` match themselves."""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return column.ilike(f"%{escaped}%", escape='\\')
+
+
+def _mcq_count():
+    return (select(func.count(MCQQuestion.id))
+            .where(MCQQuestion.test_id == Test.id)
+            .correlate(Test).scalar_subquery())
+
+
+def _coding_count():
+    return (select(func.count(CodingQuestion.id))
+            .where(CodingQuestion.test_id == Test.id)
+            .correlate(Test).scalar_subquery())
+
+
+def _total_marks():
+    mcq_marks = (select(func.coalesce(func.sum(MCQQuestion.marks), 0))
+                 .where(MCQQuestion.test_id == Test.id)
+                 .correlate(Test).scalar_subquery())
+    coding_marks = (select(func.coalesce(func.sum(CodingQuestion.marks), 0))
+                    .where(CodingQuestion.test_id == Test.id)
+                    .correlate(Test).scalar_subquery())
+    return mcq_marks + coding_marks
+
+
+def dashboard_tests(after=None, name=None, per_page=None):
+    """
+    A page of tests with their question counts and total marks, newest
+    first, in a single statement. Rows have .Test, .mcq_count,
+    .coding_count and .total_marks.
+    """
+    query = (db.session.query(
+                Test,
+                _mcq_count().label('mcq_count'),
+                _coding_count().label('coding_count'),
+                _total_marks().label('total_marks'))
+             .options(load_only(Test.id, Test.name, Test.duration_minutes)))
+    if name:
+        query = query.filter(contains(Test.name, name))
+    return _keyset(query, Test.id, after, _per_page(per_page), key=lambda row: row.Test.id, descending=True)
+
+
+def test_summary(test_id):
+    """A test plus its counts and total marks, or None."""
+    return (db.session.query(
+                Test,
+                _mcq_count().label('mcq_count'),
+                _coding_count().label('coding_count'),
+                _total_marks().label('total_marks'))
+            .filter(Test.id == test_id)
+            .first())
+
+
+def _mcq_query(search=None, marks=None):
+    query = MCQQuestion.query.options(
+        selectinload(MCQQuestion.options), joinedload(MCQQuestion.correct_option)
+    )
+    if search:
+        query = query.filter(text_search(MCQQuestion.question_text, search))
+    if marks is not None:
+        query = query.filter(MCQQuestion.marks == marks)
+    return query
+
+
+def mcq_questions_for(test_id, after=None, search=None, marks=None, per_page=None):
+    """A page of a test's MCQs with their options and correct option loaded up front."""
+    query = _mcq_query(search, marks).filter(MCQQuestion.test_id == test_id)
+    return _keyset(query, MCQQuestion.id, after, _per_page(per_page), key=lambda q: q.id)
+
+
+def _coding_query(search=None, difficulty=None, marks=None):
+    test_case_count = (select(func.count(TestCase.id))
+                       .where(TestCase.question_id == CodingQuestion.id)
+                       .correlate(CodingQuestion).scalar_subquery())
+    hidden_count = (select(func.count(TestCase.id))
+                    .where(TestCase.question_id == CodingQuestion.id, TestCase.is_hidden.is_(True))
+                    .correlate(CodingQuestion).scalar_subquery())
+    query = (db.session.query(
+                CodingQuestion,
+                test_case_count.label('test_case_count'),
+                hidden_count.label('hidden_count'))
+             .options(load_only(
+                CodingQuestion.id, CodingQuestion.problem_statement, CodingQuestion.marks,
+                CodingQuestion.difficulty, CodingQuestion.test_id, CodingQuestion.validation_status)))
+    if search:
+        query = query.filter(text_search(CodingQuestion.problem_statement, search))
+    if difficulty:
+        query = query.filter(CodingQuestion.difficulty == difficulty)
+    if marks is not None:
+        query = query.filter(CodingQuestion.marks == marks)
+    return query
+
+
+def coding_questions_for(test_id, after=None, search=None, difficulty=None, marks=None, per_page=None):
+    """
+    A page of a test's coding questions, each paired with its test case
+    counts. Test case bodies (input/expected_output) are never loaded here.
+    """
+    query = _coding_query(search, difficulty, marks).filter(CodingQuestion.test_id == test_id)
+    return _keyset(query, CodingQuestion.id, after, _per_page(per_page), key=lambda row: row.CodingQuestion.id)
+
+
+def search_mcq_questions(after=None, search=None, marks=None, per_page=None):
+    """A page of MCQs from the whole question bank, newest first."""
+    return _keyset(_mcq_query(search, marks), MCQQuestion.id, after, _per_page(per_page),
+                   key=lambda q: q.id, descending=True)
+
+
+def search_coding_questions(after=None, search=None, difficulty=None, marks=None, per_page=None):
+    """A page of coding questions from the whole question bank, newest first."""
+    return _keyset(_coding_query(search, difficulty, marks), CodingQuestion.id, after, _per_page(per_page),
+                   key=lambda row: row.CodingQuestion.id, descending=True)
@@ -143,12 +143,29 @@
 
 
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+import json
+from datetime import datetime
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, Response, stream_with_context, abort
 from flask_login import login_user, logout_user, current_user, login_required
 from functools import wraps
+from sqlalchemy.orm import load_only
 from . import db
-from .models import User, Test, MCQQuestion, CodingQuestion, TestCase, MCQOption
-from .forms import LoginForm, RegistrationForm, TestForm, MCQQuestionForm, CodingQuestionForm
+from .models import User, Test, MCQQuestion, CodingQuestion, TestCase, MCQOption, Submission, ExamSession, PlagiarismReport
+from .forms import LoginForm, RegistrationForm, TestForm, MCQQuestionForm, CodingQuestionForm, ImportQuestionsForm, PublishTestForm, ProvisionCandidatesForm, ValidateQuestionForm
+from .submissions import create_submission
+from .importer import import_questions, detect_format, open_text
+from .papers import publish_test, get_paper_cache
+from .provisioning import provision_candidates
+from .autosave import autosave_buffer, start_session, is_open, VersionConflict
+from .leaderboard import leaderboards
+from .plagiarism import start_report, expire_stale_reports
+from .validation import start_validation, publish_blockers
+from .grading import iter_grade, ordered_test_cases, record_run_times, summarize_verdicts
+from .judge_cache import get_cache
+from .queries import (
+    dashboard_tests, test_summary, mcq_questions_for, coding_questions_for,
+    search_mcq_questions, search_coding_questions
+)
 
 main = Blueprint('main', __name__)
 
@@ -178,6 +195,10 @@ def login():
         if user is None or not user.check_password(form.password.data):
             flash('Invalid email or password', 'danger')
             return redirect(url_for('main.login'))
+        if user.needs_rehash():
+            # Upgrade (or downgrade) the stored hash to the configured parameters
+            user.set_password(form.password.data)
+            db.session.commit()
         login_user(user)
         flash('Logged in successfully.', 'success')
         return redirect(url_for('main.admin_dashboard') if user.role == 'admin' else url_for('main.index'))
@@ -209,8 +230,46 @@ def logout():
 @login_required
 @admin_required
 def admin_dashboard():
-    tests = Test.query.order_by(Test.id.desc()).all()
-    return render_template('admin/dashboard.html', tests=tests)
+    name = request.args.get('name', '').strip()
+    page = dashboard_tests(after=request.args.get('after', type=int), name=name or None)
+    return render_template('admin/dashboard.html', tests=page.items, next_cursor=page.next_cursor, name=name)
+
+@main.route('/admin/questions')
+@login_required
+@admin_required
+def question_bank():
+    kind = request.args.get('kind', 'coding')
+    filters = {
+        'search': request.args.get('q', '').strip() or None,
+        'marks': request.args.get('marks', type=int),
+        'after': request.args.get('after', type=int),
+    }
+    if kind == 'mcq':
+        page = search_mcq_questions(**filters)
+    else:
+        kind = 'coding'
+        page = search_coding_questions(difficulty=request.args.get('difficulty') or None, **filters)
+    return render_template('admin/questions.html', kind=kind, page=page, args=request.args)
+
+@main.route('/admin/judge0/cache')
+@login_required
+@admin_required
+def judge0_cache_stats():
+    cache = get_cache()
+    return jsonify(cache.stats() if cache is not None else {"enabled": False})
+
+@main.route('/admin/candidates/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def provision_candidates_upload():
+    form = ProvisionCandidatesForm()
+    report = None
+    if form.validate_on_submit():
+        report = provision_candidates(open_text(form.file.data.stream))
+        flash(f'Created {len(report.created)} candidate accounts.', 'success')
+        if report.conflicts:
+            flash(f'{len(report.conflicts)} rows were not imported.', 'warning')
+    return render_template('admin/provision_candidates.html', form=form, report=report)
 
 @main.route('/admin/test/new', methods=['GET', 'POST'])
 @login_required
@@ -218,7 +277,11 @@ def admin_dashboard():
 def create_test():
     form = TestForm()
     if form.validate_on_submit():
-        test = Test(name=form.name.data, duration_minutes=form.duration_minutes.data)
+        test = Test(
+            name=form.name.data,
+            duration_minutes=form.duration_minutes.data,
+            grading_mode=form.grading_mode.data
+        )
         db.session.add(test)
         db.session.commit()
         flash('Test created successfully!', 'success')
@@ -229,8 +292,26 @@ def create_test():
 @login_required
 @admin_required
 def view_test(test_id):
-    test = Test.query.get_or_404(test_id)
-    return render_template('admin/view_test.html', test=test)
+    summary = test_summary(test_id)
+    if summary is None:
+        abort(404)
+    search = request.args.get('q', '').strip() or None
+    marks = request.args.get('marks', type=int)
+    return render_template(
+        'admin/view_test.html',
+        test=summary.Test,
+        summary=summary,
+        mcq_page=mcq_questions_for(
+            test_id, after=request.args.get('mcq_after', type=int), search=search, marks=marks
+        ),
+        coding_page=coding_questions_for(
+            test_id, after=request.args.get('coding_after', type=int), search=search, marks=marks,
+            difficulty=request.args.get('difficulty') or None
+        ),
+        publish_form=PublishTestForm(),
+        validate_form=ValidateQuestionForm(),
+        args=request.args
+    )
 
 
 # In app/routes.py
@@ -316,6 +397,15 @@ def add_coding_question(test_id):
             problem_statement=form.problem_statement.data,
             marks=form.marks.data,
             difficulty=form.difficulty.data,
+            grading_mode=form.grading_mode.data or None,
+            checker=form.checker.data,
+            float_tolerance=form.float_tolerance.data,
+            reference_solution=form.reference_solution.data or None,
+            reference_language_id=int(form.reference_language.data) if form.reference_language.data else None,
+            cpu_time_limit=form.cpu_time_limit.data,
+            wall_time_limit=form.wall_time_limit.data,
+            memory_limit=form.memory_limit.data,
+            auto_limits=form.auto_limits.data,
             starter_code_python=form.starter_code_python.data,
             starter_code_java=form.starter_code_java.data,
             starter_code_cpp=form.starter_code_cpp.data,
@@ -338,6 +428,8 @@ def add_coding_question(test_id):
         
         db.session.commit()
         flash('Coding question and test cases added!', 'success')
+        if start_validation(coding_question):
+            flash('Checking the test cases against the reference solution.', 'info')
         return redirect(url_for('main.view_test', test_id=test.id))
     elif request.method == 'POST':
         # Flash errors if validation fails on POST
@@ -345,4 +437,294 @@ def add_coding_question(test_id):
             for error in errors:
                 flash(f"Error in {getattr(form, field).label.text}: {error}", 'danger')
 
-    return render_template('admin/add_coding_question.html', form=form, test=test)
\ No newline at end of file
+    return render_template('admin/add_coding_question.html', form=form, test=test)
+
+@main.route('/admin/test/<int:test_id>/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_test_questions(test_id):
+    test = Test.query.get_or_404(test_id)
+    form = ImportQuestionsForm()
+    report = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        # Parsed straight off the upload stream, never read into memory whole
+        report = import_questions(test.id, open_text(upload.stream), detect_format(upload.filename))
+        if report.created:
+            flash(f'Imported {report.created} questions.', 'success')
+        if report.errors:
+            flash(f'{len(report.errors)} records were skipped.', 'warning')
+    return render_template('admin/import_questions.html', form=form, test=test, report=report)
+
+@main.route('/admin/test/<int:test_id>/analytics')
+@login_required
+@admin_required
+def test_analytics(test_id):
+    Test.query.get_or_404(test_id)
+    # Imported here so numpy is only needed by deployments that use it
+    from .analytics import analyze_test
+    return jsonify(analyze_test(test_id))
+
+@main.route('/admin/test/<int:test_id>/leaderboard')
+@login_required
+@admin_required
+def test_leaderboard(test_id):
+    Test.query.get_or_404(test_id)
+    board = leaderboards.get(test_id)
+    top = board.top(min(request.args.get('k', 20, type=int), 500))
+    names = dict(db.session.query(User.id, User.username).filter(User.id.in_([user_id for _, user_id, _, _ in top])))
+    return jsonify({
+        "test_id": test_id,
+        "candidates": len(board),
+        "top": [
+            {"rank": rank, "user_id": user_id, "username": names.get(user_id), "score": score}
+            for rank, user_id, score, _ in top
+        ],
+    })
+
+@main.route('/admin/test/<int:test_id>/plagiarism', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def test_plagiarism(test_id):
+    Test.query.get_or_404(test_id)
+    if request.method == 'POST':
+        return jsonify(start_report(test_id).to_dict()), 202
+    expire_stale_reports(test_id)
+    report = (PlagiarismReport.query.filter_by(test_id=test_id)
+              .order_by(PlagiarismReport.id.desc()).first())
+    if report is None:
+        return jsonify({"error": "No check has been run for this test"}), 404
+    return jsonify(report.to_dict())
+
+@main.route('/admin/question/<int:question_id>/validate', methods=['POST'])
+@login_required
+@admin_required
+def validate_coding_question(question_id):
+    question = CodingQuestion.query.get_or_404(question_id)
+    if ValidateQuestionForm().validate_on_submit():
+        if start_validation(question):
+            flash('Checking the test cases against the reference solution.', 'info')
+        else:
+            flash('This question has no reference solution.', 'warning')
+    return redirect(url_for('main.view_test', test_id=question.test_id))
+
+@main.route('/admin/question/<int:question_id>/validation')
+@login_required
+@admin_required
+def coding_question_validation(question_id):
+    question = CodingQuestion.query.get_or_404(question_id)
+    cases = question.test_cases.order_by(TestCase.id).options(load_only(
+        TestCase.id, TestCase.is_hidden, TestCase.measured_time, TestCase.measured_memory,
+        TestCase.validation_status, TestCase.validation_message, TestCase.cpu_time_limit, TestCase.memory_limit))
+    return jsonify({
+        "question_id": question.id,
+        "status": question.validation_status,
+        "validated_at": question.validated_at.isoformat() if question.validated_at else None,
+        "test_cases": [{
+            "id": tc.id,
+            "is_hidden": tc.is_hidden,
+            "status": tc.validation_status,
+            "message": tc.validation_message,
+            "time": tc.measured_time,
+            "memory": tc.measured_memory,
+            "cpu_time_limit": tc.cpu_time_limit,
+            "memory_limit": tc.memory_limit,
+        } for tc in cases],
+    })
+
+@main.route('/admin/test/<int:test_id>/publish', methods=['POST'])
+@login_required
+@admin_required
+def publish_test_paper(test_id):
+    test = Test.query.get_or_404(test_id)
+    if PublishTestForm().validate_on_submit():
+        blockers = publish_blockers(test.id)
+        if blockers:
+            flash(f'{len(blockers)} coding question(s) failed or are still running their reference check; '
+                  'fix the test cases before publishing.', 'danger')
+            return redirect(url_for('main.view_test', test_id=test.id))
+        paper = publish_test(test)
+        flash(f'Test published ({len(paper.body) // 1024} KB paper).', 'success')
+    return redirect(url_for('main.view_test', test_id=test.id))
+
+# --- Candidate Routes ---
+
+@main.route('/test/<int:test_id>/paper')
+@login_required
+def test_paper(test_id):
+    paper = get_paper_cache().get(test_id)
+    if paper is None:
+        abort(404)
+    if paper.etag in request.if_none_match:
+        response = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = Response(paper.gzipped, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(paper.body, mimetype='application/json')
+    response.set_etag(paper.etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Browsers may keep it but must revalidate, which is a cheap 304
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@main.route('/test/<int:test_id>/start', methods=['POST'])
+@login_required
+def start_exam(test_id):
+    test = Test.query.get_or_404(test_id)
+    if test.published_at is None:
+        abort(404)
+    session = start_session(current_user, test)
+    return jsonify(dict(session.to_dict(), paper_url=url_for('main.test_paper', test_id=test.id)))
+
+def _own_session(session_id):
+    session = ExamSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        abort(404)
+    return session
+
+@main.route('/exam/<int:session_id>/autosave', methods=['POST'])
+@login_required
+def autosave_answer(session_id):
+    session = _own_session(session_id)
+    if not is_open(session):
+        return jsonify({"error": "This exam session is closed", "status": session.status}), 403
+    data = request.get_json(silent=True) or {}
+    kind, question_id = data.get('kind'), data.get('question_id')
+    # Question ids come from the frozen paper, so no question query per save
+    paper = get_paper_cache().get(session.test_id)
+    if paper is None or (kind, question_id) not in paper.question_keys:
+        return jsonify({"error": "Unknown question"}), 400
+    try:
+        version = autosave_buffer.save(session.id, kind, question_id, data)
+    except VersionConflict as e:
+        # The client resends its full buffer
+        return jsonify({"error": "Diff base is out of date", "version": e.version}), 409
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({"error": str(e) or "Malformed answer"}), 400
+    return jsonify({"version": version})
+
+@main.route('/test/<int:test_id>/rank')
+@login_required
+def my_rank(test_id):
+    Test.query.get_or_404(test_id)
+    position = leaderboards.get(test_id).rank(current_user.id)
+    if position is None:
+        return jsonify({"rank": None})
+    rank, score, candidates = position
+    session = ExamSession.query.filter_by(user_id=current_user.id, test_id=test_id).first()
+    if session is not None and is_open(session):
+        # No scores while the candidate is still answering
+        return jsonify({"rank": rank, "candidates": candidates})
+    return jsonify({"rank": rank, "score": score, "candidates": candidates})
+
+@main.route('/exam/<int:session_id>/answers')
+@login_required
+def exam_answers(session_id):
+    session = _own_session(session_id)
+    return jsonify(dict(session.to_dict(), answers=autosave_buffer.answers(session.id)))
+
+@main.route('/exam/<int:session_id>/submit', methods=['POST'])
+@login_required
+def submit_exam(session_id):
+    session = _own_session(session_id)
+    autosave_buffer.finish(session, 'submitted')
+    return jsonify(session.to_dict())
+
+# --- Code Execution Routes ---
+
+def _open_session_required(question):
+    """A 403 response unless the user has an open exam session for the question's test."""
+    session = ExamSession.query.filter_by(user_id=current_user.id, test_id=question.test_id).first()
+    if session is None or not is_open(session):
+        return jsonify({"error": "No open exam session for this test"}), 403
+    return None
+
+def _code_request():
+    data = request.get_json(silent=True) or {}
+    return data.get('source_code'), data.get('language_id'), data
+
+@main.route('/question/<int:question_id>/run', methods=['POST'])
+@login_required
+def run_code(question_id):
+    question = CodingQuestion.query.get_or_404(question_id)
+    code, language_id, data = _code_request()
+    if not code or not language_id:
+        return jsonify({"error": "source_code and language_id are required"}), 400
+    submission = create_submission(current_user, question, language_id, code, kind='run', stdin=data.get('stdin'))
+    return jsonify(submission.to_dict()), 202, {'Location': url_for('main.submission_status', submission_id=submission.id)}
+
+@main.route('/question/<int:question_id>/submit', methods=['POST'])
+@login_required
+def submit_code(question_id):
+    question = CodingQuestion.query.get_or_404(question_id)
+    closed = _open_session_required(question)
+    if closed is not None:
+        return closed
+    code, language_id, _ = _code_request()
+    if not code or not language_id:
+        return jsonify({"error": "source_code and language_id are required"}), 400
+    submission = create_submission(current_user, question, language_id, code)
+    return jsonify(submission.to_dict()), 202, {'Location': url_for('main.submission_status', submission_id=submission.id)}
+
+@main.route('/question/<int:question_id>/submit/stream', methods=['POST'])
+@login_required
+def submit_code_stream(question_id):
+    """
+    Grades synchronously but streams each test case verdict as a
+    server-sent event as soon as it lands, then the final score.
+    """
+    question = CodingQuestion.query.get_or_404(question_id)
+    closed = _open_session_required(question)
+    if closed is not None:
+        return closed
+    code, language_id, _ = _code_request()
+    if not code or not language_id:
+        return jsonify({"error": "source_code and language_id are required"}), 400
+
+    submission = Submission(
+        user_id=current_user.id, question_id=question.id, kind='submit',
+        language_id=language_id, source_code=code, status='running'
+    )
+    db.session.add(submission)
+    db.session.commit()
+
+    def events():
+        test_cases = ordered_test_cases(question)
+        verdicts = [None] * len(test_cases)
+        grading = iter_grade(code, language_id, question, test_cases)
+        finished = False
+        try:
+            for index, verdict in grading:
+                verdicts[index] = verdict
+                yield f"event: verdict\ndata: {json.dumps(verdict)}\n\n"
+            record_run_times(test_cases, verdicts)
+            summary = summarize_verdicts(question, verdicts)
+            submission.result = summary
+            submission.score = summary["score"]
+            submission.status = 'done'
+            submission.finished_at = datetime.utcnow()
+            db.session.commit()
+            finished = True
+            leaderboards.record_submission(submission)
+            yield f"event: result\ndata: {json.dumps(submission.to_dict())}\n\n"
+        finally:
+            if not finished:
+                # The client went away (the generator was closed) or grading failed
+                grading.close()
+                db.session.rollback()
+                submission.result = {"error": True, "message": "Interrupted"}
+                submission.status = 'error'
+                submission.finished_at = datetime.utcnow()
+                db.session.commit()
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@main.route('/submissions/<int:submission_id>')
+@login_required
+def submission_status(submission_id):
+    submission = Submission.query.get_or_404(submission_id)
+    if submission.user_id != current_user.id and current_user.role != 'admin':
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(submission.to_dict())
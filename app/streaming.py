@@ -0,0 +1,306 @@
+import asyncio
+import functools
+import json
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itsdangerous import BadSignature
+from werkzeug.http import parse_cookie
+from . import db
+from .models import CodingQuestion, Submission, load_user
+from .judge0 import get_client, is_finished, record_latency, to_api_payload, STATUS_INTERNAL_ERROR
+from .executors import get_executor, LANGUAGES
+from .grading import resource_limits
+
+log = logging.getLogger(__name__)
+
+# An ASGI sidecar that runs code and streams the outcome as server-sent
+# events, for the "Run" button at exam peaks.
+#
+# The Flask views hold a worker thread for as long as a run takes. Here a
+# waiting run is just a coroutine: runs on the Judge0 API are polled by one
+# shared task that asks for every outstanding token in bulk, and runs on
+# the local executor are awaited as futures of its pool. Threads are only
+# borrowed briefly for database work and judge requests (the latter from a
+# bounded pool of their own, so a slow judge can't starve the former), so
+# one process can hold thousands of open runs.
+#
+# It shares the Flask app's config, database and session cookie, so a
+# logged-in candidate is authenticated exactly as on the main site. Serve
+# it with any ASGI server and route POST /question/<id>/run/stream to it:
+#
+#     uvicorn asgi:application --port 8001
+#
+# Events: "status" once the run is accepted, then "compile" (compiler
+# output), "stdout" and "stderr" (in chunks) and finally "result" with the
+# verdict. Neither backend exposes output while the program is running, so
+# stdout is sent once the run has finished.
+
+RUN_PATH = re.compile(r'^/question/(\d+)/run/stream$')
+MAX_BODY = 1024 * 1024  # bytes of request JSON
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+class TokenPoller:
+    """
+    Resolves Judge0 tokens to results with one batch request per interval
+    for all waiting runs, like the submission queue's poller.
+    """
+
+    def __init__(self, stream_app):
+        self.stream_app = stream_app
+        self._waiting = {}  # token -> (future, deadline)
+        self._task = None
+
+    def wait(self, token):
+        config = self.stream_app.config
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[token] = (future, time.monotonic() + config['JUDGE0_POLL_TIMEOUT'])
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    def forget(self, token):
+        self._waiting.pop(token, None)
+
+    async def _run(self):
+        config = self.stream_app.config
+        while self._waiting:
+            await asyncio.sleep(config['JUDGE0_POLL_INTERVAL'])
+            tokens = list(self._waiting)
+            batch_size = config['JUDGE0_BATCH_SIZE']
+            for start in range(0, len(tokens), batch_size):
+                try:
+                    polled = await self.stream_app.call_judge(self.stream_app.poll_judge0, tokens[start:start + batch_size])
+                except Exception:
+                    # Transient failure; the deadlines still bound the wait
+                    log.warning("Polling Judge0 for streamed runs failed", exc_info=True)
+                    continue
+                for result in polled:
+                    if result and is_finished(result):
+                        self._resolve(result.get("token"), result)
+
+            now = time.monotonic()
+            for token, (_, deadline) in list(self._waiting.items()):
+                if now > deadline:
+                    self._resolve(token, {"error": True, "message": "Timed out waiting for Judge0"})
+
+    def _resolve(self, token, result):
+        future, _ = self._waiting.pop(token, (None, None))
+        if future is not None and not future.done():
+            future.set_result(result)
+
+
+class RunStreamApp:
+    """The ASGI application; wraps a Flask app made by create_app."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.config = flask_app.config
+        self.poller = TokenPoller(self)
+        self._judge_pool = ThreadPoolExecutor(
+            max_workers=self.config['STREAM_JUDGE0_WORKERS'], thread_name_prefix='stream-judge0'
+        )
+
+    # --- Running Flask-side code off the event loop ---
+
+    def _in_app(self, fn, *args):
+        with self.flask_app.app_context():
+            try:
+                return fn(*args)
+            finally:
+                db.session.remove()
+
+    async def call(self, fn, *args):
+        """Runs fn(*args) in an app context on a worker thread."""
+        return await asyncio.to_thread(self._in_app, fn, *args)
+
+    async def call_judge(self, fn, *args):
+        """call() for Judge0 requests, on the judge's own pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._judge_pool, functools.partial(self._in_app, fn, *args))
+
+    # --- ASGI ---
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        match = RUN_PATH.match(scope['path'])
+        if match is None or scope['method'] != 'POST':
+            return await self._reply(send, 404, {"error": "Not found"})
+        headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        # JSON only: a cross-site form post can't send it without a CORS preflight
+        if not headers.get('content-type', '').startswith('application/json'):
+            return await self._reply(send, 415, {"error": "Send the run request as application/json"})
+
+        user_id = await self.call(self._authenticate, headers.get('cookie', ''))
+        if user_id is None:
+            return await self._reply(send, 401, {"error": "Log in first"})
+
+        body = await self._read_body(receive)
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or not data.get('source_code') or not data.get('language_id'):
+            return await self._reply(send, 400, {"error": "source_code and language_id are required"})
+        try:
+            data['language_id'] = int(data['language_id'])
+        except (TypeError, ValueError):
+            data['language_id'] = None
+        if data['language_id'] not in LANGUAGES:
+            return await self._reply(send, 400, {"error": "Unsupported language_id"})
+
+        created = await self.call(self._create, user_id, int(match.group(1)), data)
+        if created is None:
+            return await self._reply(send, 404, {"error": "Not found"})
+        submission_id, limits = created
+        await self._stream(receive, send, submission_id, data, limits)
+
+    async def _read_body(self, receive):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if len(body) > MAX_BODY or not message.get('more_body'):
+                return body[:MAX_BODY]
+
+    async def _reply(self, send, status, data):
+        payload = json.dumps(data).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode()),
+        ]})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    # --- Sync steps, on worker threads ---
+
+    def _authenticate(self, cookie_header):
+        """The user id in the Flask-Login session cookie, if it is valid and the user exists."""
+        cookie = parse_cookie(cookie_header).get(self.config['SESSION_COOKIE_NAME'])
+        serializer = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+        if not cookie or serializer is None:
+            return None
+        try:
+            session = serializer.loads(cookie, max_age=int(self.flask_app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return None
+        user_id = session.get('_user_id')
+        user = load_user(user_id) if user_id else None
+        return user.id if user is not None and user.is_active else None
+
+    def _create(self, user_id, question_id, data):
+        """(submission id, resource limits of the run), or None if there is no such question."""
+        question = CodingQuestion.query.get(question_id)
+        if question is None:
+            return None
+        submission = Submission(
+            user_id=user_id, question_id=question_id, kind='run', status='running',
+            language_id=data['language_id'], source_code=data['source_code'], stdin=data.get('stdin'),
+        )
+        db.session.add(submission)
+        db.session.commit()
+        return submission.id, resource_limits(question, None, data['language_id'])
+
+    def _submit_to_judge0(self, payload):
+        return get_client().submit(to_api_payload(payload), wait=False)["token"]
+
+    def poll_judge0(self, tokens):
+        return get_client().get_batch(tokens)
+
+    def _finish(self, submission_id, result):
+        submission = Submission.query.get(submission_id)
+        submission.result = result
+        submission.status = 'error' if result.get("error") else 'done'
+        submission.finished_at = datetime.utcnow()
+        db.session.commit()
+        return submission.to_dict()
+
+    # --- Streaming ---
+
+    async def _run(self, payload):
+        executor = await self.call(get_executor)
+        if executor is not None:
+            return await asyncio.wrap_future(executor.submit(payload))
+        token = await self.call_judge(self._submit_to_judge0, payload)
+        future = self.poller.wait(token)
+        try:
+            return await future
+        finally:
+            self.poller.forget(token)
+
+    async def _stream(self, receive, send, submission_id, data, limits):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        await send({'type': 'http.response.body', 'body': _event('status', {
+            "submission_id": submission_id, "status": "running",
+        }), 'more_body': True})
+
+        payload = {"language_id": data['language_id'], "source_code": data['source_code'], "stdin": data.get('stdin')}
+        payload.update(limits)  # the question's, as when graded
+        started = time.monotonic()
+        run = asyncio.ensure_future(self._run(payload))
+        disconnect = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        heartbeat = self.config['STREAM_HEARTBEAT_INTERVAL']
+        finished = False
+        try:
+            while not run.done():
+                done, _ = await asyncio.wait({run, disconnect}, timeout=heartbeat, return_when=asyncio.FIRST_COMPLETED)
+                if disconnect in done:
+                    # Nobody is listening; the run is abandoned
+                    run.cancel()
+                    return
+                if not done:
+                    # Keeps proxies from closing an idle connection
+                    await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+            try:
+                result = run.result()
+            except Exception as e:
+                log.exception("Streamed run %s failed", submission_id)
+                result = {"error": True, "message": str(e),
+                          "status": {"id": STATUS_INTERNAL_ERROR, "description": "Internal Error"}}
+            await self.call(record_latency, payload, result, time.monotonic() - started)
+            summary = await self.call(self._finish, submission_id, result)
+            finished = True
+
+            chunk = self.config['STREAM_CHUNK_SIZE']
+            if result.get("compile_output"):
+                await self._send_event(send, 'compile', {"output": result["compile_output"]})
+            for name in ('stdout', 'stderr'):
+                text = result.get(name) or ''
+                for i in range(0, len(text), chunk):
+                    await self._send_event(send, name, {"chunk": text[i:i + chunk]})
+            await self._send_event(send, 'result', dict(summary, result={
+                "status": result.get("status"), "time": result.get("time"),
+                "memory": result.get("memory"), "message": result.get("message"),
+            }))
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnect.cancel()
+            if not finished:
+                run.cancel()
+                # The client left (or the server is shutting down); don't leave the row 'running'
+                await self.call(self._finish, submission_id, {"error": True, "message": "Cancelled"})
+
+    async def _send_event(self, send, name, data):
+        await send({'type': 'http.response.body', 'body': _event(name, data), 'more_body': True})
+
+    async def _wait_for_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
@@ -0,0 +1,361 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+import requests
+from sqlalchemy import select, update
+from . import db
+from .models import Submission, TestCase
+from .grading import (
+    build_submissions, summarize, ordered_test_cases, grade_submission, checker_spec,
+    grading_mode, record_run_times, resource_limits, MODE_ALL_OR_NOTHING
+)
+from .judge0 import get_client, is_finished, to_api_payload, apply_checker, record_latency
+from .judge_cache import get_cache
+from .executors import get_executor
+from .leaderboard import leaderboards
+
+log = logging.getLogger(__name__)
+
+
+class SubmissionQueue:
+    """
+    In-process job queue for code runs and graded submissions.
+
+    Request handlers only persist a Submission row and enqueue its id, so a
+    Flask worker thread is never held while the judge is busy. A pool of
+    SUBMISSION_WORKERS threads hands each job to Judge0 with wait=false (or
+    runs it on the LocalExecutor when that backend is selected), and
+    a single poller thread fetches the verdicts of *all* in-flight
+    submissions with bulk /submissions/batch?tokens=... requests and writes
+    them back to the Submission row, where the status endpoint reads them.
+
+    Threads are started lazily on the first enqueue, or by start() in each
+    forked worker (see start_background in app/__init__.py), so importing
+    the app (or preloading it before forking) does not spawn anything.
+
+    Jobs survive a restart or deploy. The process holding a queued or
+    running submission keeps renewing its lease_until; every poller claims
+    rows whose lease ran out and takes them over, polling the Judge0 tokens
+    stored on the row instead of running them again where it can.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._jobs = queue.Queue()
+        self._inflight = {}  # submission id -> {"payloads", "test_case_ids", "tokens", "results", "deadline"}
+        self._owned = set()  # submission ids whose lease this process renews
+        self._lock = threading.Lock()
+        self._started = False
+        self._next_lease_check = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['submission_queue'] = self
+
+    def enqueue(self, submission_id):
+        self._start()
+        with self._lock:
+            self._owned.add(submission_id)
+        self._jobs.put(submission_id)
+
+    def start(self):
+        """Starts the threads now, so submissions left by a dead process are picked up."""
+        self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.app.config['SUBMISSION_WORKERS']):
+            threading.Thread(target=self._work, name=f'submission-worker-{i}', daemon=True).start()
+        threading.Thread(target=self._poll, name='submission-poller', daemon=True).start()
+
+    # --- Workers: hand jobs to Judge0 ---
+
+    def _work(self):
+        while True:
+            submission_id = self._jobs.get()
+            with self.app.app_context():
+                try:
+                    self._dispatch(submission_id)
+                except Exception:
+                    log.exception("Failed to dispatch submission %s", submission_id)
+                    db.session.rollback()
+                    self._finish(submission_id, {"error": True, "message": "Internal error"}, 'error')
+                finally:
+                    db.session.remove()
+
+    def _payloads(self, submission):
+        """Returns (test case ids, payloads) for a submission."""
+        if submission.kind == 'run':
+            # Same limits as grading, so "Run" can't be used to get around them
+            return [], [dict({
+                "language_id": submission.language_id,
+                "source_code": submission.source_code,
+                "stdin": submission.stdin,
+            }, **resource_limits(submission.question, None, submission.language_id))]
+        question = submission.question
+        test_cases = ordered_test_cases(question)
+        payloads = build_submissions(
+            submission.source_code, submission.language_id, test_cases, checker_spec(question), question
+        )
+        return [tc.id for tc in test_cases], payloads
+
+    def _dispatch(self, submission_id):
+        submission = Submission.query.get(submission_id)
+        if submission is None or submission.status not in ('queued', 'running'):
+            with self._lock:
+                self._owned.discard(submission_id)
+            return
+
+        if submission.kind == 'submit' and grading_mode(submission.question) == MODE_ALL_OR_NOTHING:
+            # Cases are dispatched a window at a time and stop at the first
+            # failure; this worker waits for it rather than batching everything
+            submission.status = 'running'
+            db.session.commit()
+            summary = grade_submission(submission.source_code, submission.language_id, submission.question)
+            self._finish(submission_id, summary, 'done', score=summary["score"])
+            return
+
+        test_case_ids, payloads = self._payloads(submission)
+        # Taken over from a dead process: tokens are stored by position, keep those
+        tokens = submission.tokens.split(",") if submission.status == 'running' and submission.tokens else []
+        if len(tokens) != len(payloads):
+            tokens = [None] * len(payloads)
+        tokens = [token or None for token in tokens]
+        cache = get_cache()
+        results = [cache.get(p) if cache is not None and token is None else None for p, token in zip(payloads, tokens)]
+
+        # Cached verdicts are filled in straight away; only misses go to the judge
+        to_send = [i for i, result in enumerate(results) if result is None and tokens[i] is None]
+
+        executor = get_executor()
+        started = time.monotonic()
+        if executor is not None:
+            # The local backend has no tokens to poll; this worker runs the job itself
+            for index, result in zip(to_send, executor.run_batch([payloads[i] for i in to_send])):
+                results[index] = result
+                record_latency(payloads[index], result, time.monotonic() - started)
+                if cache is not None:
+                    cache.put(payloads[index], result)
+            self._complete(submission_id, results, test_case_ids)
+            return
+
+        batch_size = self.app.config['JUDGE0_BATCH_SIZE']
+        try:
+            for start in range(0, len(to_send), batch_size):
+                chunk = to_send[start:start + batch_size]
+                created = get_client().create_batch([to_api_payload(payloads[i]) for i in chunk])
+                for index, item in zip(chunk, created):
+                    tokens[index] = item.get("token")
+                    if not tokens[index]:
+                        results[index] = {"error": True, "message": "Rejected by Judge0"}
+        except requests.exceptions.RequestException as e:
+            self._finish(submission_id, {"error": True, "message": str(e)}, 'error')
+            return
+
+        if all(r is not None for r in results):
+            self._complete(submission_id, results, test_case_ids)
+            return
+
+        submission.status = 'running'
+        # Empty slots for cases answered from the cache, so a takeover can line them up
+        submission.tokens = ",".join(t or '' for t in tokens)
+        db.session.commit()
+
+        deadline = time.monotonic() + self.app.config['JUDGE0_POLL_TIMEOUT']
+        with self._lock:
+            self._inflight[submission_id] = {
+                "payloads": payloads,
+                "test_case_ids": test_case_ids,
+                "tokens": tokens,
+                "results": results,
+                "started": started,
+                "deadline": deadline,
+            }
+
+    # --- Poller: one bulk request for every in-flight token ---
+
+    def _poll(self):
+        interval = self.app.config['JUDGE0_POLL_INTERVAL']
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                inflight = dict(self._inflight)
+            if inflight:
+                with self.app.app_context():
+                    try:
+                        self._poll_once(inflight)
+                    except Exception:
+                        log.exception("Submission poll failed")
+                        db.session.rollback()
+                    finally:
+                        db.session.remove()
+            if time.monotonic() >= self._next_lease_check:
+                self._next_lease_check = time.monotonic() + self.app.config['SUBMISSION_LEASE'] / 3
+                with self.app.app_context():
+                    try:
+                        self._renew_leases()
+                        self._recover()
+                    except Exception:
+                        log.exception("Submission lease check failed")
+                        db.session.rollback()
+                    finally:
+                        db.session.remove()
+
+    def _poll_once(self, inflight):
+        # token -> (submission id, index of the result within that submission)
+        pending = {}
+        for submission_id, job in inflight.items():
+            for index, token in enumerate(job["tokens"]):
+                if token and job["results"][index] is None:
+                    pending[token] = (submission_id, index)
+
+        cache = get_cache()
+        batch_size = self.app.config['JUDGE0_BATCH_SIZE']
+        tokens = list(pending)
+        for start in range(0, len(tokens), batch_size):
+            try:
+                polled = get_client().get_batch(tokens[start:start + batch_size])
+            except requests.exceptions.RequestException:
+                # Transient failure; the deadline below still bounds the wait
+                continue
+            for result in polled:
+                if result and result.get("token") in pending and is_finished(result):
+                    submission_id, index = pending[result["token"]]
+                    job = inflight[submission_id]
+                    result = apply_checker(job["payloads"][index], result)
+                    job["results"][index] = result
+                    record_latency(job["payloads"][index], result, time.monotonic() - job["started"])
+                    if cache is not None:
+                        cache.put(job["payloads"][index], result)
+
+        now = time.monotonic()
+        for submission_id, job in inflight.items():
+            if now > job["deadline"]:
+                for index, result in enumerate(job["results"]):
+                    if result is None:
+                        job["results"][index] = {"error": True, "message": "Timed out waiting for Judge0"}
+                        record_latency(job["payloads"][index], job["results"][index], now - job["started"])
+            if all(r is not None for r in job["results"]):
+                with self._lock:
+                    self._inflight.pop(submission_id, None)
+                try:
+                    self._complete(submission_id, job["results"], job["test_case_ids"])
+                except Exception:
+                    # Out of _inflight already, so it must still be finished or its lease lives on
+                    log.exception("Failed to complete submission %s", submission_id)
+                    db.session.rollback()
+                    self._finish(submission_id, {"error": True, "message": "Internal error"}, 'error')
+
+    # --- Leases: taking over what a dead process left behind ---
+
+    def lease_expiry(self):
+        return datetime.utcnow() + timedelta(seconds=self.app.config['SUBMISSION_LEASE'])
+
+    def _renew_leases(self):
+        with self._lock:
+            owned = list(self._owned)
+        if owned:
+            db.session.execute(
+                update(Submission).where(Submission.id.in_(owned)).values(lease_until=self.lease_expiry()),
+                execution_options={"synchronize_session": False},
+            )
+            db.session.commit()
+
+    def _recover(self):
+        now = datetime.utcnow()
+        # Streamed gradings hold no lease; this long after, their request is gone
+        stale_before = now - timedelta(seconds=self.app.config['SUBMISSION_STALE_AFTER'])
+        db.session.execute(
+            update(Submission)
+            .where(Submission.status.in_(('queued', 'running')), Submission.lease_until.is_(None),
+                   Submission.created_at < stale_before)
+            .values(status='error', finished_at=now, result={"error": True, "message": "Interrupted"}),
+            execution_options={"synchronize_session": False},
+        )
+        db.session.commit()
+
+        expired = db.session.execute(
+            select(Submission.id)
+            .where(Submission.status.in_(('queued', 'running')), Submission.lease_until < now)
+            .order_by(Submission.id)
+        ).scalars().all()
+        with self._lock:
+            expired = [i for i in expired if i not in self._owned]
+        for submission_id in expired:
+            # Every process's poller may spot the same row; only one claim succeeds
+            claimed = db.session.execute(
+                update(Submission)
+                .where(Submission.id == submission_id, Submission.lease_until < now)
+                .values(lease_until=self.lease_expiry()),
+                execution_options={"synchronize_session": False},
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                log.info("Taking over submission %s from a process that stopped", submission_id)
+                self.enqueue(submission_id)
+
+    def _complete(self, submission_id, results, test_case_ids):
+        submission = Submission.query.get(submission_id)
+        if submission is None:
+            with self._lock:
+                self._owned.discard(submission_id)
+            return
+        if submission.kind == 'run':
+            self._finish(submission_id, results[0], 'error' if results[0].get("error") else 'done')
+            return
+        # Same order the payloads were built in, whatever the current ordering is
+        by_id = {tc.id: tc for tc in TestCase.query.filter(TestCase.id.in_(test_case_ids))}
+        if len(by_id) < len(set(test_case_ids)):
+            # A case was deleted while the job was in flight, so the verdicts no longer add up to a score
+            self._finish(submission_id, {"error": True, "message": "The test cases changed while grading; submit again"}, 'error')
+            return
+        test_cases = [by_id[i] for i in test_case_ids]
+        summary = summarize(submission.question, test_cases, results)
+        record_run_times(test_cases, summary["verdicts"])
+        self._finish(submission_id, summary, 'done', score=summary["score"])
+
+    def _finish(self, submission_id, result, status, score=None):
+        submission = Submission.query.get(submission_id)
+        if submission is None:
+            with self._lock:
+                self._owned.discard(submission_id)
+            return
+        submission.result = result
+        submission.status = status
+        submission.score = score
+        submission.finished_at = datetime.utcnow()
+        submission.lease_until = None
+        db.session.commit()
+        with self._lock:
+            self._owned.discard(submission_id)
+        try:
+            leaderboards.record_submission(submission)
+        except Exception:
+            log.exception("Failed to update the leaderboard for submission %s", submission_id)
+
+
+submission_queue = SubmissionQueue()
+
+
+def create_submission(user, question, language_id, source_code, kind='submit', stdin=None):
+    """Persists a Submission and queues it for the judge."""
+    submission = Submission(
+        user_id=user.id,
+        question_id=question.id,
+        kind=kind,
+        language_id=language_id,
+        source_code=source_code,
+        stdin=stdin,
+        lease_until=submission_queue.lease_expiry(),
+    )
+    db.session.add(submission)
+    db.session.commit()
+    submission_queue.enqueue(submission.id)
+    return submission
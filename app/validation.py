@@ -0,0 +1,126 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, update
+from . import db
+from .models import CodingQuestion, TestCase
+from .grading import build_submissions, checker_spec, language_multipliers
+from .judge0 import submit_batch_to_judge0, STATUS_ACCEPTED, STATUS_WRONG_ANSWER
+
+log = logging.getLogger(__name__)
+
+# Reference solution checks for coding questions.
+#
+# When a question has a reference solution, it is run against every test
+# case in one batch before candidates ever see it. Cases the reference
+# doesn't pass are flagged (and block publishing), and the time and memory
+# it took become the case's baseline: the scheduling hint used to order
+# cases and, for questions with auto_limits, the basis of each case's
+# resource limits. The reference runs under the judge's default limits so
+# that earlier derived limits can't fail it.
+
+
+def _case_status(result):
+    status = (result.get("status") or {})
+    if result.get("error"):
+        return 'error', (result.get("message") or "Judge error")[:200]
+    if status.get("id") == STATUS_ACCEPTED:
+        return 'ok', None
+    if status.get("id") == STATUS_WRONG_ANSWER:
+        return 'mismatch', "Reference output differs from expected_output"
+    return 'error', status.get("description") or "Reference solution did not run"
+
+
+def derive_limits(question, test_case):
+    """
+    Sets a case's CPU and memory limits to a multiple of what the reference
+    solution used, converted to the C baseline by the reference language's
+    multipliers (they are scaled back up for each candidate's language).
+    """
+    config = current_app.config
+    time_factor, memory_factor = language_multipliers(question.reference_language_id)
+    if test_case.measured_time is not None:
+        cpu = test_case.measured_time / time_factor * config['AUTO_LIMIT_TIME_FACTOR']
+        test_case.cpu_time_limit = round(max(cpu, config['AUTO_LIMIT_MIN_CPU_TIME']), 3)
+    if test_case.measured_memory:
+        memory = test_case.measured_memory / memory_factor * config['AUTO_LIMIT_MEMORY_FACTOR']
+        test_case.memory_limit = int(max(memory, config['AUTO_LIMIT_MIN_MEMORY']))
+
+
+def validate_question(question):
+    """Runs the reference solution on every test case and records the outcome."""
+    test_cases = question.test_cases.order_by(TestCase.id).all()
+    submissions = build_submissions(
+        question.reference_solution, question.reference_language_id, test_cases, checker_spec(question)
+    )
+    results = submit_batch_to_judge0(submissions) if submissions else []
+
+    failed = 0
+    for tc, result in zip(test_cases, results):
+        tc.validation_status, tc.validation_message = _case_status(result)
+        if tc.validation_status == 'ok':
+            tc.measured_time = float(result["time"]) if result.get("time") else tc.measured_time
+            tc.measured_memory = result.get("memory")
+            if question.auto_limits:
+                derive_limits(question, tc)
+        else:
+            failed += 1
+
+    question.validation_status = 'failed' if failed else 'passed'
+    question.validated_at = datetime.utcnow()
+    db.session.commit()
+    return failed
+
+
+def start_validation(question):
+    """Marks a question as being validated and checks it on a background thread."""
+    if not question.reference_solution or not question.reference_language_id:
+        return False
+    question.validation_status = 'running'
+    question.validated_at = datetime.utcnow()
+    db.session.commit()
+    app = current_app._get_current_object()
+    question_id = question.id
+
+    def work():
+        with app.app_context():
+            try:
+                validate_question(CodingQuestion.query.get(question_id))
+            except Exception:
+                log.exception("Validation of coding question %s failed", question_id)
+                db.session.rollback()
+                question = CodingQuestion.query.get(question_id)
+                question.validation_status = 'error'
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=work, name=f'validate-{question_id}', daemon=True).start()
+    return True
+
+
+def expire_stale_validations(test_id):
+    """
+    Marks the test's checks left 'running' by a process that died (a
+    restart, a crash) as 'error', so they don't block publishing forever
+    and can be rerun. A live check is bounded by the judge's poll timeout.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['VALIDATION_STALE_AFTER'])
+    result = db.session.execute(
+        update(CodingQuestion)
+        .where(CodingQuestion.test_id == test_id, CodingQuestion.validation_status == 'running',
+               or_(CodingQuestion.validated_at < cutoff, CodingQuestion.validated_at.is_(None)))
+        .values(validation_status='error')
+    )
+    if result.rowcount:
+        db.session.commit()
+
+
+def publish_blockers(test_id):
+    """Coding questions of a test whose reference check failed or hasn't finished."""
+    expire_stale_validations(test_id)
+    return (CodingQuestion.query
+            .filter(CodingQuestion.test_id == test_id,
+                    CodingQuestion.validation_status.in_(['running', 'failed', 'error']))
+            .all())
@@ -0,0 +1,7 @@
+from app import create_app
+from app.streaming import RunStreamApp
+
+# Streamed code runs (app/streaming.py). Serve next to the WSGI app and
+# route POST /question/<id>/run/stream here:
+#     uvicorn asgi:application --port 8001
+application = RunStreamApp(create_app())
@@ -0,0 +1,116 @@
+"""
+Exam-start login stampede: many candidates log in at once, then keep making
+authenticated requests.
+
+Seeds --users students into a throwaway SQLite database, logs them all in
+through POST /login from --concurrency threads, and reports logins per
+second for each password hash method given. It then times authenticated
+page loads with the user_loader cache on and off.
+
+    python bench/bulk_login.py --users 500 --concurrency 16 \
+        --methods scrypt:32768:8:1 pbkdf2:sha256:600000 pbkdf2:sha256:100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+from config import Config  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User  # noqa: E402
+
+PASSWORD = 'correct horse battery staple'
+BASE_URL = 'https://localhost'  # Talisman redirects plain http
+
+
+def make_app(method, user_cache_ttl, db_path):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        WTF_CSRF_ENABLED = False
+        JUDGE0_CACHE_ENABLED = False
+        PASSWORD_HASH_METHOD = method
+        USER_CACHE_TTL = user_cache_ttl
+
+    return create_app(BenchConfig)
+
+
+def seed(app, users, method):
+    with app.app_context():
+        db.session.execute(User.__table__.delete())
+        # Every user gets the same hash; only verifying it is being measured
+        password_hash = generate_password_hash(PASSWORD, method=method)
+        db.session.execute(insert(User), [{
+            'username': f'student{i}',
+            'email': f'student{i}@example.com',
+            'password_hash': password_hash,
+            'role': 'student',
+        } for i in range(users)])
+        db.session.commit()
+
+
+def login(app, i):
+    client = app.test_client()
+    response = client.post('/login', base_url=BASE_URL, data={
+        'email': f'student{i}@example.com',
+        'password': PASSWORD,
+    })
+    if response.status_code != 302:
+        raise RuntimeError(f'login {i} failed with {response.status_code}')
+    return client
+
+
+def bench_logins(app, users, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        clients = list(pool.map(lambda i: login(app, i), range(users)))
+    return time.perf_counter() - start, clients
+
+
+def bench_requests(app, clients, rounds, concurrency):
+    def browse(client):
+        for _ in range(rounds):
+            client.get('/', base_url=BASE_URL)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(browse, clients))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=10, help='authenticated requests per user')
+    parser.add_argument('--methods', nargs='+', default=[Config.PASSWORD_HASH_METHOD, 'pbkdf2:sha256:100000'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+
+        print(f'{args.users} logins, {args.concurrency} threads')
+        for method in args.methods:
+            app = make_app(method, 30, db_path)
+            seed(app, args.users, method)
+            elapsed, _ = bench_logins(app, args.users, args.concurrency)
+            print(f'  {method:28} {elapsed:7.2f}s  {args.users / elapsed:8.1f} logins/s')
+
+        method = args.methods[-1]
+        print(f'{args.users * args.rounds} authenticated requests')
+        for ttl in (0, 30):
+            app = make_app(method, ttl, db_path)
+            seed(app, args.users, method)
+            _, clients = bench_logins(app, args.users, args.concurrency)
+            elapsed = bench_requests(app, clients, args.rounds, args.concurrency)
+            label = f'user cache ttl={ttl}s' if ttl else 'user cache off'
+            print(f'  {label:28} {elapsed:7.2f}s  {args.users * args.rounds / elapsed:8.1f} req/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+A small stand-in for the Judge0 HTTP API, for exercising the submission
+queue and grading paths without leaving the machine.
+
+It does not run any code. A submission "executes" for --latency seconds and
+then reports Accepted with the expected_output (or the stdin, for plain runs)
+as its stdout. Point the app at it with:
+
+    python bench/fake_judge0.py --port 2358 --latency 0.2
+    JUDGE0_API_URL=http://127.0.0.1:2358 flask run
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+ACCEPTED = {"id": 3, "description": "Accepted"}
+PROCESSING = {"id": 2, "description": "Processing"}
+
+
+class FakeJudge0:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.submissions = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def create(self, payload):
+        token = str(uuid.uuid4())
+        expected = payload.get("expected_output")
+        with self._lock:
+            self.submissions[token] = {
+                "ready_at": time.monotonic() + self.latency,
+                "stdout": expected if expected is not None else payload.get("stdin"),
+            }
+        return token
+
+    def get(self, token):
+        with self._lock:
+            sub = self.submissions.get(token)
+        if sub is None:
+            return None
+        if time.monotonic() < sub["ready_at"]:
+            return {"token": token, "status": PROCESSING, "stdout": None, "time": None, "memory": None}
+        return {
+            "token": token,
+            "status": ACCEPTED,
+            "stdout": sub["stdout"],
+            "stderr": None,
+            "compile_output": None,
+            "message": None,
+            "time": f"{self.latency:.3f}",
+            "memory": 1024,
+        }
+
+
+def make_handler(judge):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_POST(self):
+            judge.requests += 1
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/submissions/batch":
+                subs = self._body().get("submissions", [])
+                return self._send(201, [{"token": judge.create(s)} for s in subs])
+            if url.path == "/submissions":
+                token = judge.create(self._body())
+                if query.get("wait") == ["true"]:
+                    time.sleep(judge.latency)
+                    return self._send(201, judge.get(token))
+                return self._send(201, {"token": token})
+            self._send(404, {"error": "Not found"})
+
+        def do_GET(self):
+            judge.requests += 1
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/submissions/batch":
+                tokens = (query.get("tokens") or [""])[0].split(",")
+                return self._send(200, {"submissions": [judge.get(t) for t in tokens if t]})
+            if url.path.startswith("/submissions/"):
+                result = judge.get(url.path.rsplit("/", 1)[-1])
+                return self._send(200, result) if result else self._send(404, {"error": "Not found"})
+            self._send(404, {"error": "Not found"})
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=2358, latency=0.0):
+    """Starts the fake judge on a background thread and returns the server."""
+    judge = FakeJudge0(latency)
+    server = ThreadingHTTPServer((host, port), make_handler(judge))
+    server.judge = judge
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2358)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds each submission takes")
+    args = parser.parse_args()
+
+    judge = FakeJudge0(args.latency)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(judge))
+    print(f"Fake Judge0 listening on http://{args.host}:{args.port}")
+    server.serve_forever()
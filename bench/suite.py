@@ -0,0 +1,303 @@
+"""
+Scripted load scenarios against the whole app, compared with a stored baseline.
+
+Builds the app with create_app against a throwaway SQLite database (or
+--database, e.g. a local Postgres), seeds --users candidates, an admin,
+--tests tests for the dashboard and one published exam test, and points
+Judge0 at fake_judge0.py with --judge-latency. Each scenario is a batch
+of requests from --concurrency threads, every thread with its own logged-in
+client:
+
+    login       POST /login, one per candidate
+    paper       GET the published paper (gzip)
+    run         run code with custom stdin and poll until the verdict is in
+    submit      submit code for grading and poll until it is scored
+    dashboard   the admin dashboard over all seeded tests
+
+Reports p50/p95/p99 latency and requests per second per scenario.
+--save-baseline writes the numbers to --baseline; later runs print the
+change against it and exit non-zero if a scenario got more than
+--tolerance slower (p95) or lost that much throughput.
+
+    python bench/suite.py --users 200 --tests 10000 --judge-latency 0.05
+    python bench/suite.py --scenarios paper dashboard --save-baseline
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+from config import Config  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User, Test, MCQQuestion, MCQOption, CodingQuestion, TestCase  # noqa: E402
+from app.papers import publish_test  # noqa: E402
+from fake_judge0 import serve  # noqa: E402
+
+PASSWORD = 'correct horse battery staple'
+BASE_URL = 'https://localhost'  # Talisman redirects plain http
+SCENARIOS = ['login', 'paper', 'run', 'submit', 'dashboard']
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+PYTHON = 71
+SOURCE = 'print(input())'
+POLL_INTERVAL = 0.02  # seconds between submission status checks
+POLL_TIMEOUT = 60
+
+
+def make_app(database_uri, judge_url, paper_dir):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_uri
+        WTF_CSRF_ENABLED = False
+        JUDGE0_API_URL = judge_url
+        EXECUTOR_BACKEND = 'judge0'
+        # Every run must reach the (fake) judge to be worth timing
+        JUDGE0_CACHE_ENABLED = False
+        JUDGE0_POLL_INTERVAL = 0.05
+        PAPER_CACHE_DIR = paper_dir
+        if database_uri.startswith('sqlite'):
+            # Wait for the write lock instead of failing under concurrent submits
+            SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+
+    return create_app(BenchConfig)
+
+
+def seed(app, users, tests, mcqs, coding, cases):
+    """Returns (exam test id, coding question id)."""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # Every user gets the same hash; only verifying it is being measured
+        password_hash = generate_password_hash(PASSWORD, method=app.config['PASSWORD_HASH_METHOD'])
+        db.session.execute(insert(User), [{
+            'username': f'student{i}',
+            'email': f'student{i}@example.com',
+            'password_hash': password_hash,
+            'role': 'student',
+        } for i in range(users)] + [{
+            'username': 'admin',
+            'email': 'admin@example.com',
+            'password_hash': password_hash,
+            'role': 'admin',
+        }])
+        db.session.execute(insert(Test), [
+            {'name': f'Practice test {i}', 'duration_minutes': 60} for i in range(tests)
+        ])
+
+        exam = Test(name='Benchmark exam', duration_minutes=90)
+        db.session.add(exam)
+        db.session.flush()
+        for i in range(mcqs):
+            question = MCQQuestion(question_text=f'Question {i}?', marks=1, test_id=exam.id)
+            question.options = [MCQOption(option_text=f'Option {j}') for j in range(4)]
+            db.session.add(question)
+            db.session.flush()
+            question.correct_option_id = question.options[0].id
+        for i in range(coding):
+            question = CodingQuestion(problem_statement=f'Echo the input ({i}).', marks=10, test_id=exam.id)
+            db.session.add(question)
+            db.session.flush()
+            db.session.add_all([
+                TestCase(input=f'{i}-{j}', expected_output=f'{i}-{j}', is_hidden=j > 0, question_id=question.id)
+                for j in range(cases)
+            ])
+        db.session.commit()
+        question_id = exam.coding_questions.first().id
+        publish_test(exam)
+        return exam.id, question_id
+
+
+def login(app, email):
+    client = app.test_client()
+    response = client.post('/login', base_url=BASE_URL, data={'email': email, 'password': PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError(f'login as {email} failed with {response.status_code}')
+    return client
+
+
+def wait_for(client, response):
+    """Polls a 202'd submission until it has a verdict."""
+    if response.status_code != 202:
+        return response
+    location = response.headers['Location']
+    deadline = time.monotonic() + POLL_TIMEOUT
+    while time.monotonic() < deadline:
+        status = client.get(location, base_url=BASE_URL)
+        if status.get_json()['status'] in ('done', 'error'):
+            return status
+        time.sleep(POLL_INTERVAL)
+    raise RuntimeError(f'{location} did not finish in {POLL_TIMEOUT}s')
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(operation, clients, count, concurrency):
+    """
+    Runs operation(client, i) count times, each on a client nobody else is
+    using at that moment. Returns latency percentiles (ms), rps and errors.
+    """
+    idle = queue.Queue()
+    for client in clients:
+        idle.put(client)
+
+    def timed(i):
+        client = idle.get()
+        try:
+            start = time.perf_counter()
+            ok = operation(client, i)
+            return time.perf_counter() - start, ok
+        except Exception:
+            return None, False
+        finally:
+            idle.put(client)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(clients))) as pool:
+        outcomes = list(pool.map(timed, range(count)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds * 1000 for seconds, ok in outcomes if ok)
+    return {
+        'requests': count,
+        'errors': sum(1 for _, ok in outcomes if not ok),
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'rps': count / elapsed if elapsed else None,
+    }
+
+
+def scenarios(app, args, exam_id, question_id):
+    """name -> (operation, clients, count)"""
+    emails = [f'student{i}@example.com' for i in range(args.users)]
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        students = list(pool.map(lambda email: login(app, email), emails))
+    admin = [login(app, 'admin@example.com') for _ in range(min(args.concurrency, 4))]
+    # Only bound the concurrency; each login gets a brand new cookie jar
+    slots = [None] * args.concurrency
+
+    def do_login(_, i):
+        response = app.test_client().post('/login', base_url=BASE_URL,
+                                          data={'email': emails[i % len(emails)], 'password': PASSWORD})
+        return response.status_code == 302
+
+    def do_paper(client, i):
+        response = client.get(f'/test/{exam_id}/paper', base_url=BASE_URL, headers={'Accept-Encoding': 'gzip'})
+        return response.status_code == 200
+
+    def do_run(client, i):
+        response = client.post(f'/question/{question_id}/run', base_url=BASE_URL,
+                               json={'source_code': SOURCE, 'language_id': PYTHON, 'stdin': str(i)})
+        return wait_for(client, response).get_json().get('status') == 'done'
+
+    def do_submit(client, i):
+        response = client.post(f'/question/{question_id}/submit', base_url=BASE_URL,
+                               json={'source_code': f'{SOURCE}  # {i}', 'language_id': PYTHON})
+        return wait_for(client, response).get_json().get('status') == 'done'
+
+    def do_dashboard(client, i):
+        return client.get('/admin/dashboard', base_url=BASE_URL).status_code == 200
+
+    return {
+        'login': (do_login, slots, args.users),
+        'paper': (do_paper, students, args.requests),
+        'run': (do_run, students, args.requests),
+        'submit': (do_submit, students, args.requests),
+        'dashboard': (do_dashboard, admin, max(args.requests // 10, 10)),
+    }
+
+
+def _fmt(value, digits=1):
+    return f'{value:.{digits}f}' if value is not None else '-'
+
+
+def compare(results, baseline, tolerance):
+    """Prints each scenario against the baseline; returns the names that regressed."""
+    regressed = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        changes = []
+        worse = False
+        for key in ('p50', 'p95', 'p99', 'rps'):
+            if now[key] is None or not before.get(key):
+                continue
+            change = now[key] / before[key] - 1
+            changes.append(f'{key} {change:+.0%}')
+            if key == 'p95' and change > tolerance or key == 'rps' and change < -tolerance:
+                worse = True
+        if worse:
+            regressed.append(name)
+        print(f'  {name:10} {", ".join(changes)}{"  REGRESSION" if worse else ""}')
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--database', help='SQLAlchemy URI of a scratch database (its tables are dropped and '
+                                           'recreated); defaults to a temporary SQLite file')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--tests', type=int, default=10000, help='tests on the admin dashboard')
+    parser.add_argument('--mcqs', type=int, default=20, help='MCQs on the exam test')
+    parser.add_argument('--coding', type=int, default=3, help='coding questions on the exam test')
+    parser.add_argument('--cases', type=int, default=10, help='test cases per coding question')
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--judge-latency', type=float, default=0.05, help='seconds the fake judge takes per run')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95/rps change before failing')
+    args = parser.parse_args()
+
+    judge = serve(port=0, latency=args.judge_latency)
+    judge_url = f'http://127.0.0.1:{judge.server_address[1]}'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = args.database or f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        app = make_app(database, judge_url, os.path.join(tmp, 'papers'))
+        started = time.perf_counter()
+        exam_id, question_id = seed(app, args.users, args.tests, args.mcqs, args.coding, args.cases)
+        print(f'Seeded {args.users} users, {args.tests + 1} tests in {time.perf_counter() - started:.1f}s')
+
+        available = scenarios(app, args, exam_id, question_id)
+        results = {}
+        print(f'{"scenario":10} {"requests":>8} {"errors":>6} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"req/s":>8}')
+        for name in args.scenarios:
+            operation, clients, count = available[name]
+            results[name] = run_scenario(operation, clients, count, args.concurrency)
+            r = results[name]
+            print(f'{name:10} {r["requests"]:8} {r["errors"]:6} {_fmt(r["p50"]):>8} {_fmt(r["p95"]):>8} '
+                  f'{_fmt(r["p99"]):>8} {_fmt(r["rps"]):>8}')
+    print(f'Fake judge served {judge.judge.requests} requests')
+    judge.shutdown()
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f'Baseline written to {args.baseline}')
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f'Against {args.baseline}:')
+        regressed = compare(results, baseline, args.tolerance)
+        if regressed:
+            sys.exit(f'Regressed: {", ".join(regressed)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+# gunicorn -c gunicorn.conf.py run:app
+#
+# The app is imported and built once in the master (preload_app), so new
+# workers fork with every module already loaded and start serving at once
+# instead of each repeating the imports and create_app. Set
+# CREATE_SCHEMA_ON_STARTUP=0 and run `flask db upgrade` before deploying.
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = 60  # grading streams can hold a request for a while
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with the workers,
+    # and threads started there would not have survived the fork
+    from app import reset_after_fork, start_background
+    app = server.app.wsgi()
+    reset_after_fork(app)
+    start_background(app)
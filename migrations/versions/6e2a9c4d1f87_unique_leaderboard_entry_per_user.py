@@ -0,0 +1,31 @@
+"""Make leaderboard_entry unique per test and user
+
+Revision ID: 6e2a9c4d1f87
+Revises: 4d7a1c9e3f62
+Create Date: 2026-10-18 23:02:41.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2a9c4d1f87'
+down_revision = '4d7a1c9e3f62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Concurrent snapshots could leave several rows per candidate; keep the newest
+    op.execute(
+        'DELETE FROM leaderboard_entry WHERE id NOT IN '
+        '(SELECT MAX(id) FROM leaderboard_entry GROUP BY test_id, user_id)'
+    )
+    with op.batch_alter_table('leaderboard_entry', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_leaderboard_entry_test_user', ['test_id', 'user_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('leaderboard_entry', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_leaderboard_entry_test_user', type_='unique')
@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import event
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SECRET_KEY = 'test'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'  # replaced per test with a file in tmp_path
+    WTF_CSRF_ENABLED = False
+    EXECUTOR_BACKEND = 'judge0'
+    JUDGE0_CACHE_ENABLED = False
+    METRICS_ENABLED = False
+    USER_CACHE_TTL = 0
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # fast, for tests only
+    CREATE_SCHEMA_ON_STARTUP = True
+
+
+@pytest.fixture
+def app(tmp_path):
+    # Imported here so that collecting the checker tests doesn't build the app
+    from app import create_app, db
+
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+
+    app = create_app(Config)
+    # The background singletons outlive an app; give them fresh state, and
+    # mark their threads as started so none runs and tests drive them by hand
+    for name in ('autosave', 'leaderboards', 'submission_queue'):
+        extension = app.extensions[name]
+        extension.__init__(app)
+        extension._started = True
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.environ_base['HTTP_X_FORWARDED_PROTO'] = 'https'  # or Talisman redirects to https
+    return client
+
+
+@pytest.fixture
+def admin(app):
+    return add_user('admin', role='admin')
+
+
+def add_user(username, role='student'):
+    from app import db
+    from app.models import User
+    user = User(username=username, email=f'{username}@example.com', role=role)
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def log_in(client, user):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
+
+
+@pytest.fixture
+def admin_client(client, admin):
+    return log_in(client, admin)
+
+
+class StatementCounter:
+    """Counts the SQL statements the app's engine runs while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    def __len__(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_statements(app):
+    from app import db
+    return lambda: StatementCounter(db.engine)
@@ -0,0 +1,67 @@
+import pytest
+from app import db
+from app.queries import dashboard_tests
+from app import models  # not `from ... import Test`, which pytest would try to collect
+
+
+def add_test(name, questions):
+    """A test with `questions` MCQs (four options each) and as many coding questions."""
+    test = models.Test(name=name, duration_minutes=60)
+    db.session.add(test)
+    db.session.flush()
+    for i in range(questions):
+        mcq = models.MCQQuestion(test_id=test.id, question_text=f"Question {i}", marks=1)
+        db.session.add(mcq)
+        db.session.flush()
+        options = [models.MCQOption(question_id=mcq.id, option_text=f"Option {j}") for j in range(4)]
+        db.session.add_all(options)
+        db.session.flush()
+        mcq.correct_option_id = options[0].id
+
+        coding = models.CodingQuestion(test_id=test.id, problem_statement=f"Problem {i}", marks=10)
+        db.session.add(coding)
+        db.session.flush()
+        for j in range(3):
+            db.session.add(models.TestCase(question_id=coding.id, input=f"{j}", expected_output=f"{j}", is_hidden=j > 0))
+    db.session.commit()
+    return test
+
+
+def statements_for(client, count_statements, url):
+    # A first request warms up what is loaded once per process (the user cache, ...)
+    assert client.get(url).status_code == 200
+    db.session.remove()
+    with count_statements() as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(counter)
+
+
+def test_dashboard_statements_do_not_grow_with_tests(admin_client, count_statements):
+    add_test("Small", 1)
+    few = statements_for(admin_client, count_statements, '/admin/dashboard')
+    for i in range(20):
+        add_test(f"Test {i}", 3)
+    many = statements_for(admin_client, count_statements, '/admin/dashboard')
+    assert many == few
+    assert many <= 2
+
+
+@pytest.mark.parametrize("questions", [1, 15])
+def test_view_test_statements_do_not_grow_with_questions(admin_client, count_statements, questions):
+    test_id = add_test("Big", questions).id
+    count = statements_for(admin_client, count_statements, f'/admin/test/{test_id}')
+    assert count <= 5
+
+
+def test_view_test_statement_count_is_flat(admin_client, count_statements):
+    small, big = add_test("Small", 1).id, add_test("Big", 15).id
+    assert (statements_for(admin_client, count_statements, f'/admin/test/{small}')
+            == statements_for(admin_client, count_statements, f'/admin/test/{big}'))
+
+
+def test_dashboard_name_filter_matches_wildcards_literally(app):
+    for name in ("100% score", "1000 score", "a_b", "axb"):
+        add_test(name, 0)
+    assert [row.Test.name for row in dashboard_tests(name="0%").items] == ["100% score"]
+    assert [row.Test.name for row in dashboard_tests(name="a_b").items] == ["a_b"]
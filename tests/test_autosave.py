@@ -0,0 +1,136 @@
+import time
+import pytest
+from datetime import datetime
+from app import db
+from app import models  # not `from ... import Test`, which pytest would try to collect
+from app.autosave import AutosaveBuffer, VersionConflict, autosave_buffer, start_session
+from .conftest import add_user, log_in
+
+
+@pytest.fixture
+def exam(app):
+    """(session, mcq, coding question) for a candidate's open session on a published test."""
+    test = models.Test(name="Exam", duration_minutes=60, published_at=datetime.utcnow())
+    db.session.add(test)
+    db.session.flush()
+    mcq = models.MCQQuestion(test_id=test.id, question_text="Pick one", marks=1)
+    coding = models.CodingQuestion(test_id=test.id, problem_statement="Echo", marks=10)
+    db.session.add_all([mcq, coding])
+    db.session.commit()
+    session = start_session(add_user('candidate'), test)
+    return session, mcq, coding
+
+
+def other_worker(app):
+    """A second buffer, standing for the one in another worker process."""
+    buffer = AutosaveBuffer(app)
+    buffer._started = True
+    app.extensions['autosave'] = autosave_buffer
+    return buffer
+
+
+def stored(session_id):
+    return {(a.kind, a.question_id): (a.version, a.code, a.selected_option_id)
+            for a in models.Answer.query.filter_by(session_id=session_id)}
+
+
+def test_saves_are_coalesced_into_one_write(exam, count_statements):
+    session, mcq, coding = exam
+    for version in range(1, 21):
+        autosave_buffer.save(session.id, 'coding', coding.id, {'code': f'print({version})', 'version': version})
+    autosave_buffer.save(session.id, 'mcq', mcq.id, {'selected_option_id': 7, 'version': 1})
+    assert stored(session.id) == {}
+
+    with count_statements() as counter:
+        assert autosave_buffer.flush() == 2
+    assert len([s for s in counter.statements if s.startswith('INSERT')]) == 1
+    assert stored(session.id) == {('coding', coding.id): (20, 'print(20)', None), ('mcq', mcq.id): (1, None, 7)}
+    assert autosave_buffer.flush() == 0
+
+
+def test_diffs_apply_to_the_current_buffer(exam):
+    session, _, coding = exam
+    autosave_buffer.save(session.id, 'coding', coding.id, {'code': 'print(1)', 'version': 1})
+    autosave_buffer.save(session.id, 'coding', coding.id, {
+        'diff': [{'start': 6, 'end': 7, 'text': '42'}], 'base_version': 1, 'version': 2,
+    })
+    with pytest.raises(VersionConflict):
+        autosave_buffer.save(session.id, 'coding', coding.id, {
+            'diff': [{'start': 0, 'end': 0, 'text': '#'}], 'base_version': 1, 'version': 3,
+        })
+    autosave_buffer.flush()
+    assert stored(session.id)[('coding', coding.id)] == (2, 'print(42)', None)
+
+
+def test_a_late_retry_does_not_undo_a_newer_save(exam):
+    session, mcq, _ = exam
+    assert autosave_buffer.save(session.id, 'mcq', mcq.id, {'selected_option_id': 2, 'version': 2}) == 2
+    assert autosave_buffer.save(session.id, 'mcq', mcq.id, {'selected_option_id': 1, 'version': 1}) == 2
+    autosave_buffer.flush()
+    assert stored(session.id)[('mcq', mcq.id)] == (2, None, 2)
+
+
+def test_a_stale_worker_cannot_overwrite_a_newer_answer(app, exam):
+    session, mcq, _ = exam
+    stale = other_worker(app)
+    stale.save(session.id, 'mcq', mcq.id, {'selected_option_id': 1, 'version': 1})
+    autosave_buffer.save(session.id, 'mcq', mcq.id, {'selected_option_id': 1, 'version': 1})
+    autosave_buffer.save(session.id, 'mcq', mcq.id, {'selected_option_id': 2, 'version': 2})
+    autosave_buffer.flush()
+    stale.flush()
+    assert stored(session.id)[('mcq', mcq.id)] == (2, None, 2)
+
+
+def test_a_save_needs_a_version(client, exam):
+    session, mcq, _ = exam
+    log_in(client, db.session.get(models.User, session.user_id))
+    url = f'/exam/{session.id}/autosave'
+    response = client.post(url, json={'kind': 'mcq', 'question_id': mcq.id, 'selected_option_id': 1})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'version is required'}
+    response = client.post(url, json={'kind': 'mcq', 'question_id': mcq.id, 'selected_option_id': 1, 'version': 1})
+    assert response.get_json() == {'version': 1}
+
+
+def test_answers_of_sessions_closed_elsewhere_are_evicted(app, exam):
+    session, mcq, coding = exam
+    worker = other_worker(app)
+    worker.save(session.id, 'mcq', mcq.id, {'selected_option_id': 1, 'version': 1})
+    autosave_buffer.finish(session, 'submitted')
+    worker.save(session.id, 'coding', coding.id, {'code': 'late', 'version': 1})
+
+    # Nothing is dropped before it is written
+    assert worker._evict_closed() == 1
+    assert set(worker._current) == {(session.id, 'mcq', mcq.id), (session.id, 'coding', coding.id)}
+    worker.flush()
+    worker._evict_closed()
+    assert worker._current == {}
+    assert set(stored(session.id)) == {('mcq', mcq.id), ('coding', coding.id)}
+
+
+def test_submitting_closes_the_session_without_waiting(app, client, exam):
+    session, mcq, _ = exam
+    log_in(client, db.session.get(models.User, session.user_id))
+    worker = other_worker(app)
+    worker.save(session.id, 'mcq', mcq.id, {'selected_option_id': 1, 'version': 1})
+
+    started = time.monotonic()
+    response = client.post(f'/exam/{session.id}/submit')
+    assert time.monotonic() - started < app.config['AUTOSAVE_FLUSH_INTERVAL']
+    assert response.get_json()['status'] == 'submitted'
+    response = client.post(f'/exam/{session.id}/autosave', json={
+        'kind': 'mcq', 'question_id': mcq.id, 'selected_option_id': 2, 'version': 2,
+    })
+    assert response.status_code == 403
+
+    # What the other worker accepted before the close is still written
+    worker.flush()
+    assert stored(session.id)[('mcq', mcq.id)] == (1, None, 1)
+
+
+def test_a_session_is_closed_once(exam):
+    session, _, _ = exam
+    autosave_buffer.finish(session, 'submitted')
+    finished_at = session.finished_at
+    autosave_buffer.finish(session, 'timed_out')
+    assert (session.status, session.finished_at) == ('submitted', finished_at)
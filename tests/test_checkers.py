@@ -0,0 +1,124 @@
+import pytest
+from app.checkers import compare, iter_text_chunks, MODE_EXACT, MODE_LINES, MODE_TOKENS, MODE_FLOAT
+
+
+def chunked(text, size=3):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+# --- exact ---
+
+@pytest.mark.parametrize("expected, actual, ok", [
+    ("3\n", "3\n", True),
+    ("3", "3\n\n  \n", True),  # trailing whitespace at the very end is ignored
+    ("3\n", "3", True),
+    ("1 2\n", "1  2\n", False),
+    ("1\n2\n", "1 \n2\n", False),
+    ("", "", True),
+    ("", "x", False),
+    ("abc", "ab", False),
+])
+def test_exact(expected, actual, ok):
+    assert compare(expected, actual, MODE_EXACT) is ok
+
+
+def test_exact_across_chunk_boundaries():
+    text = "line one\nline two\n" * 50
+    assert compare(chunked(text), chunked(text + "  \n", 7), MODE_EXACT)
+    assert not compare(chunked(text), chunked(text.replace("two", "too"), 5), MODE_EXACT)
+
+
+# --- whitespace (lines and tokens) ---
+
+@pytest.mark.parametrize("expected, actual, ok", [
+    ("a b\nc\n", "a b   \nc\n\n\n", True),
+    ("a b\nc\n", "a  b\nc\n", False),  # spacing inside a line still counts
+    ("a\n\nb\n", "a\nb\n", False),  # blank lines between lines count
+    ("a\r\n", "a\n", True),
+])
+def test_lines(expected, actual, ok):
+    assert compare(expected, actual, MODE_LINES) is ok
+
+
+@pytest.mark.parametrize("expected, actual, ok", [
+    ("1 2 3", "1\n2\t3\n", True),
+    ("1 2 3", "1 2", False),
+    ("1 2", "1 2 3", False),
+    ("12", "1 2", False),
+])
+def test_tokens(expected, actual, ok):
+    assert compare(expected, actual, MODE_TOKENS) is ok
+
+
+def test_tokens_split_across_chunks():
+    assert compare("12345 678", ["12", "345 6", "78"], MODE_TOKENS)
+    assert not compare("12345 678", ["12", "34 5 6", "78"], MODE_TOKENS)
+
+
+# --- float tolerance ---
+
+@pytest.mark.parametrize("expected, actual, ok", [
+    ("0.333333", "0.3333333", True),
+    ("0.333333", "0.3334", False),
+    ("1000000", "1000000.5", True),  # relative for large values
+    ("1000000", "1000002", False),
+    ("1.5 word", "1.5 word", True),
+    ("word", "Word", False),  # non-numeric tokens are compared as text
+    ("1e3", "1000", True),
+])
+def test_float(expected, actual, ok):
+    assert compare(expected, actual, MODE_FLOAT) is ok
+
+
+def test_float_custom_tolerance():
+    assert compare("1.0", "1.05", MODE_FLOAT, tolerance=0.1)
+    assert not compare("1.0", "1.05", MODE_FLOAT, tolerance=0.01)
+
+
+@pytest.mark.parametrize("expected, actual, ok", [
+    ("inf", "inf", True),
+    ("inf", "Infinity", True),
+    ("-inf", "-Infinity", True),
+    ("inf", "-inf", False),
+    ("inf", "1e308", False),
+    ("1e308", "inf", False),
+    ("nan", "NaN", True),
+    ("nan", "0", False),
+    ("0", "nan", False),
+])
+def test_float_special_values(expected, actual, ok):
+    assert compare(expected, actual, MODE_FLOAT) is ok
+
+
+# --- unordered ---
+# Tokens in any order: a custom checker, as registered by a deployment
+
+@pytest.fixture
+def unordered():
+    from app.checkers import register_checker, _custom_checkers, CHECKER_MODES
+
+    @register_checker('test-unordered', 'Tokens in any order')
+    def check(expected, actual):
+        return sorted(''.join(expected).split()) == sorted(''.join(actual).split())
+
+    yield 'test-unordered'
+    del _custom_checkers['test-unordered']
+    CHECKER_MODES.remove(('test-unordered', 'Tokens in any order'))
+
+
+def test_unordered(unordered):
+    assert compare("1 2 3", "3 1\n2", unordered)
+    assert compare("inf 1", ["1 i", "nf"], unordered)
+    assert not compare("1 2 3", "1 2 2", unordered)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        compare("1", "1", "no-such-mode")
+
+
+def test_iter_text_chunks_keeps_multibyte_characters(tmp_path):
+    path = tmp_path / "out.txt"
+    path.write_bytes("é€".encode("utf-8") * 100)
+    with open(path, "rb") as f:
+        assert "".join(iter_text_chunks(f, size=3)) == "é€" * 100
@@ -0,0 +1,127 @@
+import hashlib
+import shutil
+import time
+import pytest
+from app.executors import LocalExecutor
+
+PYTHON, C = 71, 50
+
+pytestmark = pytest.mark.skipif(shutil.which('python3') is None, reason="needs python3 to run programs")
+
+
+@pytest.fixture(scope='module')
+def executor(tmp_path_factory):
+    executor = LocalExecutor(
+        max_workers=2, cpu_time_limit=1, wall_time_limit=3, workdir=str(tmp_path_factory.mktemp('executor')),
+        hidden_paths=[str(tmp_path_factory.mktemp('secrets'))]
+    )
+    yield executor
+    shutil.rmtree(executor.root, ignore_errors=True)
+
+
+@pytest.fixture
+def sandboxed(executor):
+    if not executor._sandbox_prefix:
+        pytest.skip("no unprivileged user namespaces on this host")
+    return executor
+
+
+def run(executor, source_code, stdin='', expected_output=None, language_id=PYTHON, **payload):
+    return executor.run(dict(payload, language_id=language_id, source_code=source_code,
+                             stdin=stdin, expected_output=expected_output))
+
+
+def status(result):
+    return result["status"]["description"]
+
+
+def test_output_is_checked(executor):
+    assert status(run(executor, 'print(int(input()) * 2)', '21', '42')) == 'Accepted'
+    assert status(run(executor, 'print(int(input()) * 2)', '21', '43')) == 'Wrong Answer'
+
+
+def test_a_program_that_never_stops_is_killed(executor):
+    result = run(executor, 'while True: pass')
+    assert status(result) == 'Time Limit Exceeded'
+
+
+def test_a_sleeping_program_hits_the_wall_clock_limit(executor):
+    started = time.monotonic()
+    assert status(run(executor, 'import time; time.sleep(60)')) == 'Time Limit Exceeded'
+    assert time.monotonic() - started < 10
+
+
+def test_exit_status_and_signals_are_reported(executor):
+    assert status(run(executor, 'import sys; sys.exit(3)')) == 'Runtime Error (NZEC)'
+    # Sent to itself, which a program running as PID 1 of its namespace would ignore
+    result = run(executor, 'import os; os.kill(os.getpid(), 11)')
+    assert status(result) == 'Runtime Error (SIGSEGV)'
+    assert result["message"] == 'Killed by signal 11'
+
+
+def test_memory_is_limited(executor):
+    result = run(executor, 'x = bytearray(10 ** 9)', memory_limit=128000)
+    assert status(result) == 'Runtime Error (NZEC)'
+    assert 'MemoryError' in result["stderr"]
+
+
+def test_orphaned_processes_do_not_hold_up_the_run(executor):
+    source = 'import subprocess; subprocess.Popen(["sleep", "30"]); print("done")'
+    started = time.monotonic()
+    result = run(executor, source, expected_output='done')
+    assert status(result) == 'Accepted'
+    assert time.monotonic() - started < 3
+
+
+def test_test_data_files_are_hash_checked(executor, tmp_path):
+    stdin_file, expected_file = tmp_path / 'in', tmp_path / 'out'
+    stdin_file.write_text('5\n')
+    expected_file.write_text('10\n')
+    payload = dict(
+        stdin_file=str(stdin_file), stdin_hash=hashlib.sha256(b'5\n').hexdigest(),
+        expected_output_file=str(expected_file), expected_output_hash=hashlib.sha256(b'10\n').hexdigest(),
+    )
+    assert status(run(executor, 'print(int(input()) * 2)', **payload)) == 'Accepted'
+
+    expected_file.write_text('11\n')
+    result = run(executor, 'print(11)', **payload)
+    assert status(result) == 'Internal Error'
+    assert not expected_file.exists()  # dropped, so the blob store fetches it again
+
+
+def test_the_executors_files_and_hidden_paths_are_covered(sandboxed):
+    source = (
+        'import os\n'
+        f'print(sorted(os.listdir({sandboxed.root!r} + "/files")))\n'
+        f'print(os.listdir({sandboxed.hidden_paths[-1]!r}))\n'
+        'print(os.path.basename(os.getcwd()))\n'
+    )
+    result = run(sandboxed, source)
+    assert status(result) == 'Accepted'
+    assert result["stdout"] == '[]\n[]\njail\n'
+
+
+def test_programs_get_their_own_pid_namespace_and_no_network(sandboxed):
+    source = (
+        'import os, socket\n'
+        'print(len([p for p in os.listdir("/proc") if p.isdigit()]) < 5)\n'
+        'try:\n'
+        '    socket.create_connection(("1.1.1.1", 53), timeout=1)\n'
+        '    print("online")\n'
+        'except OSError:\n'
+        '    print("offline")\n'
+    )
+    result = run(sandboxed, source)
+    assert result["stdout"] == 'True\noffline\n'
+
+
+@pytest.mark.skipif(shutil.which('gcc') is None, reason="needs gcc")
+def test_compiled_languages_build_once(executor, monkeypatch):
+    builds = []
+    compile_ = executor._compile
+    monkeypatch.setattr(executor, '_compile', lambda *args: builds.append(args) or compile_(*args))
+    source = '#include <stdio.h>\nint main(){int a; scanf("%d", &a); printf("%d\\n", a * 2);}'
+    payloads = [dict(language_id=C, source_code=source, stdin=str(i), expected_output=str(i * 2)) for i in range(4)]
+    assert [status(r) for r in executor.run_batch(payloads)] == ['Accepted'] * 4
+    assert len(builds) == 1
+    assert status(run(executor, 'int main(){ syntax error }', language_id=C)) == 'Compilation Error'
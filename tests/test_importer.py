@@ -0,0 +1,68 @@
+import io
+import json
+import pytest
+from app import db
+from app import models  # not `from ... import Test`, which pytest would try to collect
+from app.importer import import_questions
+
+
+@pytest.fixture
+def test_id(app):
+    test = models.Test(name="Import", duration_minutes=60)
+    db.session.add(test)
+    db.session.commit()
+    return test.id
+
+
+def coding(is_hidden):
+    return {
+        'type': 'coding', 'problem_statement': 'Echo',
+        'test_cases': [{'input': '1', 'expected_output': '1', 'is_hidden': is_hidden}],
+    }
+
+
+def test_malformed_yaml_is_reported_not_raised(test_id):
+    report = import_questions(test_id, io.StringIO("- type: mcq\n  options: [a, b\n"), 'yaml')
+    assert report.created == 0
+    [(number, message)] = report.errors
+    assert number == 1
+    assert message.startswith("could not parse: ") and '\n' not in message
+
+
+def test_yaml_questions_before_an_error_are_kept(test_id):
+    text = (
+        "type: mcq\nquestion_text: Two?\noptions: [one, two]\ncorrect_option: 1\n"
+        "---\n"
+        "type: mcq\noptions: [a, b\n"
+    )
+    report = import_questions(test_id, io.StringIO(text), 'yaml')
+    assert report.mcq_created == 1
+    assert [number for number, _ in report.errors] == [2]
+
+
+@pytest.mark.parametrize("value, hidden", [
+    (True, True), (False, False), (1, True), (0, False),
+    ('true', True), ('False', False), ('yes', True), ('no', False), ('1', True), ('0', False),
+    (None, True), ('', True),
+])
+def test_is_hidden_is_parsed(test_id, value, hidden):
+    report = import_questions(test_id, io.StringIO(json.dumps([coding(value)])), 'json')
+    assert report.errors == []
+    assert models.TestCase.query.one().is_hidden is hidden
+
+
+@pytest.mark.parametrize("value", ['maybe', 2, 'hidden', [True]])
+def test_unknown_is_hidden_values_are_rejected(test_id, value):
+    report = import_questions(test_id, io.StringIO(json.dumps([coding(value)])), 'json')
+    assert report.created == 0
+    assert report.errors == [(1, "test case 1 is_hidden must be true or false")]
+
+
+def test_is_hidden_from_yaml_text(test_id):
+    text = (
+        "type: coding\nproblem_statement: Echo\ntest_cases:\n"
+        "  - {input: '1', expected_output: '1', is_hidden: 'false'}\n"
+    )
+    report = import_questions(test_id, io.StringIO(text), 'yaml')
+    assert report.errors == []
+    assert models.TestCase.query.one().is_hidden is False
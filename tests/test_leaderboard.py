@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta
+from app import db
+from app import models  # not `from ... import Test`, which pytest would try to collect
+from app.autosave import autosave_buffer, start_session
+from app.leaderboard import Leaderboard, LeaderboardRegistry, build_leaderboard, leaderboards
+from .conftest import add_user, log_in
+
+T0 = datetime(2026, 1, 1, 9, 0)
+
+
+def at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+def add_exam():
+    """A published test with one 2-mark MCQ (first option correct) and one coding question."""
+    test = models.Test(name="Exam", duration_minutes=60, published_at=datetime.utcnow())
+    db.session.add(test)
+    db.session.flush()
+    mcq = models.MCQQuestion(test_id=test.id, question_text="Pick one", marks=2)
+    db.session.add(mcq)
+    db.session.flush()
+    options = [models.MCQOption(question_id=mcq.id, option_text=f"Option {j}") for j in range(2)]
+    db.session.add_all(options)
+    db.session.flush()
+    mcq.correct_option_id = options[0].id
+    coding = models.CodingQuestion(test_id=test.id, problem_statement="Echo", marks=10)
+    db.session.add(coding)
+    db.session.commit()
+    return test, mcq, coding
+
+
+def add_submission(user, question, score, created_at):
+    submission = models.Submission(
+        user_id=user.id, question_id=question.id, kind='submit', language_id=71, source_code='print()',
+        status='done', score=score, created_at=created_at, finished_at=created_at + timedelta(seconds=5)
+    )
+    db.session.add(submission)
+    db.session.commit()
+    return submission
+
+
+# --- Ordering ---
+
+def test_higher_total_ranks_first():
+    board = Leaderboard(1, {})
+    board.record(1, 'coding', 10, 5, at(1))
+    board.record(2, 'coding', 10, 8, at(2))
+    board.record(3, 'coding', 10, 3, at(0))
+    assert [(rank, user_id, total) for rank, user_id, total, _ in board.top(3)] == [(1, 2, 8), (2, 1, 5), (3, 3, 3)]
+    assert board.rank(1) == (2, 5, 3)
+    assert board.rank(4) is None
+
+
+def test_ties_go_to_whoever_got_there_first():
+    board = Leaderboard(1, {})
+    board.record(1, 'coding', 10, 5, at(2))
+    board.record(2, 'coding', 10, 5, at(1))
+    assert [user_id for _, user_id, _, _ in board.top(2)] == [2, 1]
+
+
+def test_same_total_keeps_the_time_it_was_first_reached():
+    board = Leaderboard(1, {20: (200, 5)})
+    board.record(1, 'coding', 10, 5, at(1))
+    board.record(2, 'coding', 10, 5, at(2))
+    # User 1 swaps five coding points for five MCQ points: still 5, still first
+    board.record(1, 'coding', 11, 0, at(3))
+    board.record_mcq(1, 20, 200, at(3))
+    assert [user_id for _, user_id, _, _ in board.top(2)] == [1, 2]
+
+
+def test_coding_keeps_the_best_score_and_mcq_answers_replace():
+    board = Leaderboard(1, {20: (200, 2)})
+    board.record(1, 'coding', 10, 7, at(1))
+    board.record(1, 'coding', 10, 4, at(2))
+    assert board.rank(1)[1] == 7
+    board.record_mcq(1, 20, 200, at(3))
+    assert board.rank(1)[1] == 9
+    board.record_mcq(1, 20, 201, at(4))
+    assert board.rank(1)[1] == 7
+
+
+def test_rebuild_breaks_ties_like_the_live_board(app):
+    test, _, coding = add_exam()
+    first, second = add_user('first'), add_user('second')
+    for user in (first, second):
+        db.session.add(models.ExamSession(user_id=user.id, test_id=test.id, started_at=at(0), ends_at=at(60)))
+    db.session.commit()
+    add_submission(second, coding, 10, at(5))
+    add_submission(first, coding, 10, at(3))
+    assert [user_id for _, user_id, _, _ in build_leaderboard(test.id).top(2)] == [first.id, second.id]
+
+
+# --- What counts ---
+
+def test_submissions_outside_the_session_do_not_count(app):
+    test, _, coding = add_exam()
+    user = add_user('candidate')
+    db.session.add(models.ExamSession(
+        user_id=user.id, test_id=test.id, status='submitted', started_at=at(0), ends_at=at(60), finished_at=at(30)
+    ))
+    db.session.commit()
+    add_submission(user, coding, 10, at(-5))
+    add_submission(user, coding, 10, at(40))
+    assert build_leaderboard(test.id).rank(user.id) is None
+
+    add_submission(user, coding, 4, at(10))
+    assert build_leaderboard(test.id).rank(user.id)[1] == 4
+
+
+def test_submissions_without_a_session_do_not_count(app):
+    test, _, coding = add_exam()
+    user = add_user('candidate')
+    leaderboards.record_submission(add_submission(user, coding, 10, at(1)))
+    assert leaderboards.get(test.id).rank(user.id) is None
+    assert build_leaderboard(test.id).rank(user.id) is None
+
+
+def test_mcq_answers_count_only_once_the_session_is_closed(app, client):
+    test, mcq, _ = add_exam()
+    user = add_user('candidate')
+    log_in(client, user)
+    session = start_session(user, test)
+    response = client.post(f'/exam/{session.id}/autosave', json={
+        'kind': 'mcq', 'question_id': mcq.id, 'selected_option_id': mcq.correct_option_id, 'version': 1,
+    })
+    assert response.status_code == 200
+    autosave_buffer.flush()
+    assert leaderboards.get(test.id).rank(user.id) is None
+    assert build_leaderboard(test.id).rank(user.id) is None
+
+    autosave_buffer.finish(session, 'submitted')
+    assert leaderboards.get(test.id).rank(user.id)[1] == 2
+    assert build_leaderboard(test.id).rank(user.id)[1] == 2
+
+
+def test_rank_has_no_score_while_the_session_is_open(app, client):
+    test, _, coding = add_exam()
+    user = add_user('candidate')
+    log_in(client, user)
+    session = start_session(user, test)
+    leaderboards.record_submission(add_submission(user, coding, 6, datetime.utcnow()))
+
+    assert client.get(f'/test/{test.id}/rank').get_json() == {'rank': 1, 'candidates': 1}
+    autosave_buffer.finish(session, 'submitted')
+    assert client.get(f'/test/{test.id}/rank').get_json() == {'rank': 1, 'score': 6, 'candidates': 1}
+
+
+def test_code_submissions_need_an_open_session(app, client):
+    test, _, coding = add_exam()
+    user = add_user('candidate')
+    log_in(client, user)
+    body = {'source_code': 'print(1)', 'language_id': 71}
+    assert client.post(f'/question/{coding.id}/submit', json=body).status_code == 403
+    assert client.post(f'/question/{coding.id}/submit/stream', json=body).status_code == 403
+
+    session = start_session(user, test)
+    autosave_buffer.finish(session, 'submitted')
+    assert client.post(f'/question/{coding.id}/submit', json=body).status_code == 403
+
+
+# --- Snapshots ---
+
+def add_ranked_exam():
+    test, _, coding = add_exam()
+    users = [add_user(f'candidate{i}') for i in range(3)]
+    for i, user in enumerate(users):
+        db.session.add(models.ExamSession(user_id=user.id, test_id=test.id, started_at=at(0), ends_at=at(60)))
+        db.session.commit()
+        add_submission(user, coding, i + 1, at(i + 1))
+    return test, users
+
+
+def snapshot_rows(test_id):
+    return sorted(
+        (entry.user_id, entry.rank, entry.score)
+        for entry in models.LeaderboardEntry.query.filter_by(test_id=test_id)
+    )
+
+
+def test_snapshots_from_several_processes_keep_one_row_per_candidate(app):
+    test, users = add_ranked_exam()
+    # Each registry stands for another worker process
+    for registry in (leaderboards, LeaderboardRegistry(), LeaderboardRegistry()):
+        registry.app = app
+        registry._started = True
+        registry.snapshot(registry.get(test.id))
+        registry.snapshot(registry.get(test.id))
+    assert snapshot_rows(test.id) == [(users[0].id, 3, 1), (users[1].id, 2, 2), (users[2].id, 1, 3)]
+
+
+def test_snapshot_drops_candidates_no_longer_ranked(app):
+    test, users = add_ranked_exam()
+    leaderboards.snapshot(leaderboards.get(test.id))
+    models.Submission.query.filter_by(user_id=users[0].id).delete()
+    db.session.commit()
+    leaderboards.snapshot(leaderboards._build(test.id))
+    assert [user_id for user_id, _, _ in snapshot_rows(test.id)] == [users[1].id, users[2].id]
+
+
+def test_rebuild_marks_the_board_changed_only_when_it_differs(app):
+    test, users = add_ranked_exam()
+    leaderboards.snapshot(leaderboards.get(test.id))
+    assert not leaderboards._build(test.id).changed
+
+    add_submission(users[0], models.CodingQuestion.query.filter_by(test_id=test.id).one(), 9, at(10))
+    assert leaderboards._build(test.id).changed
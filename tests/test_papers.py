@@ -0,0 +1,70 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app import db
+from app import models  # not `from ... import Test`, which pytest would try to collect
+from app.papers import get_paper_cache
+
+PUBLISHED = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def test(app):
+    test = models.Test(name="Exam", duration_minutes=60)
+    db.session.add(test)
+    db.session.flush()
+    db.session.add(models.CodingQuestion(test_id=test.id, problem_statement="Echo", marks=10))
+    db.session.commit()
+    test.published_at = PUBLISHED
+    db.session.commit()
+    assert test.published_at == PUBLISHED
+    get_paper_cache().get(test.id)  # cached before the edits below
+    return test
+
+
+def paper(test_id):
+    return json.loads(get_paper_cache().get(test_id).body)
+
+
+@pytest.mark.parametrize("field, value, shown", [
+    ('name', "Renamed", lambda p: p["name"]),
+    ('duration_minutes', 90, lambda p: p["duration_minutes"]),
+    ('grading_mode', 'all_or_nothing', lambda p: p["coding_questions"][0]["grading_mode"]),
+])
+def test_test_edits_refresh_the_paper(test, field, value, shown):
+    setattr(test, field, value)
+    db.session.commit()
+    assert test.published_at > PUBLISHED
+    assert shown(paper(test.id)) == value
+
+
+def test_question_edits_refresh_the_paper(test):
+    question = models.CodingQuestion.query.one()
+    question.problem_statement = "Echo twice"
+    db.session.commit()
+    assert paper(test.id)["coding_questions"][0]["problem_statement"] == "Echo twice"
+
+
+def test_unpublishing_is_not_undone(test):
+    test.published_at = None
+    db.session.commit()
+    assert test.published_at is None
+
+
+def test_bookkeeping_writes_leave_the_paper_alone(test):
+    question = models.CodingQuestion.query.one()
+    question.validation_status = 'passed'
+    db.session.add(models.ExamSession(
+        user_id=1, test_id=test.id, started_at=PUBLISHED, ends_at=PUBLISHED + timedelta(hours=1)
+    ))
+    db.session.commit()
+    assert test.published_at == PUBLISHED
+
+
+def test_only_the_apps_sessions_are_watched(test):
+    with Session(db.engine) as other:
+        other.get(models.Test, test.id).name = "Renamed elsewhere"
+        other.commit()
+    db.session.expire_all()
+    assert test.published_at == PUBLISHED
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+from app import db
+from app import models  # not `from ... import Test`, which pytest would try to collect
+from app.plagiarism import (
+    PYTHON, KGRAM, WINDOW, tokenize, fingerprints, find_clusters, check_test, expire_stale_reports, _hash
+)
+from .conftest import add_user
+
+SOLUTION = '''
+def longest_run(values):
+    best = current = 1
+    for i in range(1, len(values)):
+        if values[i] == values[i - 1] + 1:
+            current += 1
+            best = max(best, current)
+        else:
+            current = 1
+    return best
+
+count = int(input())
+numbers = [int(x) for x in input().split()]
+print(longest_run(sorted(set(numbers))) if count else 0)
+'''
+
+# The same program with other names, other comments and other literals' spelling
+RENAMED = '''
+# my own work
+def streak(xs):
+    top = run = 1
+    for k in range(1, len(xs)):
+        if xs[k] == xs[k - 1] + 1:
+            run += 1
+            top = max(top, run)
+        else:
+            run = 1
+    return top
+
+n = int(input())
+items = [int(t) for t in input().split()]
+print(streak(sorted(set(items))) if n else 0)
+'''
+
+UNRELATED = '''
+import sys
+data = sys.stdin.read().split()
+total = 0
+for word in data[1:]:
+    if word.isdigit():
+        total += int(word) * 2
+    elif word.startswith("-"):
+        total -= 7
+while total > 100:
+    total //= 3
+print("total:", total, "words:", len(data))
+'''
+
+JAVA = 62
+
+
+def test_tokens_ignore_names_literals_and_comments():
+    assert tokenize('total = count + 1  # add one', PYTHON) == ['V', '=', 'V', '+', 'N']
+    assert tokenize('x = "hi"; y = 2.5', PYTHON) == ['V', '=', 'S', 'V', '=', 'N']
+    assert tokenize('int n = 3; // count\n/* block */ return n;', JAVA) == ['int', 'V', '=', 'N', 'return', 'V']
+
+
+def test_renaming_does_not_change_fingerprints():
+    assert fingerprints(SOLUTION, PYTHON) == fingerprints(RENAMED, PYTHON)
+    assert fingerprints(SOLUTION, PYTHON) != fingerprints(UNRELATED, PYTHON)
+
+
+def test_winnowing_keeps_the_minimum_of_every_window():
+    tokens = tokenize(SOLUTION, PYTHON)
+    hashes = [_hash(' '.join(tokens[i:i + KGRAM])) for i in range(len(tokens) - KGRAM + 1)]
+    prints = fingerprints(SOLUTION, PYTHON)
+    assert len(prints) < len(set(hashes))
+    for i in range(len(hashes) - WINDOW + 1):
+        assert min(hashes[i:i + WINDOW]) in prints
+
+
+def test_copies_are_clustered_and_unrelated_answers_are_not():
+    answers = [
+        (1, 10, PYTHON, SOLUTION),
+        (2, 20, PYTHON, RENAMED),
+        (3, 30, PYTHON, UNRELATED),
+        (4, 40, PYTHON, RENAMED + '\nprint()\n'),
+    ]
+    [cluster] = find_clusters(answers, {}, threshold=0.6)
+    assert cluster["members"] == [[1, 10], [2, 20], [4, 40]]
+    assert 0.6 <= cluster["similarity"] <= 1
+
+
+def test_one_candidates_own_answers_are_not_a_match():
+    assert find_clusters([(1, 10, PYTHON, SOLUTION), (2, 10, PYTHON, RENAMED)], {}, threshold=0.6) == []
+
+
+def test_starter_code_is_not_evidence():
+    # Both answers are the starter code plus a line of their own
+    answers = [(1, 10, PYTHON, SOLUTION + '\nprint(1)\n'), (2, 20, PYTHON, SOLUTION + '\nx = [0] * 9\n')]
+    assert find_clusters(answers, {}, threshold=0.6)
+    assert find_clusters(answers, {PYTHON: SOLUTION}, threshold=0.6) == []
+
+
+def test_short_answers_are_skipped():
+    answers = [(1, 10, PYTHON, 'print(int(input()) * 2)'), (2, 20, PYTHON, 'print(int(input()) * 2)')]
+    assert find_clusters(answers, {}, threshold=0.6) == []
+
+
+def add_answers(test_id, codes):
+    questions, users = [], []
+    for _ in range(2):
+        question = models.CodingQuestion(test_id=test_id, problem_statement="Runs", marks=10)
+        db.session.add(question)
+        db.session.flush()
+        questions.append(question)
+    for i, code in enumerate(codes):
+        user = add_user(f'candidate{i}')
+        users.append(user.id)
+        for question in questions:
+            # An older answer first; only each candidate's latest counts
+            for source in (UNRELATED if i == 0 else 'pass', code):
+                db.session.add(models.Submission(
+                    user_id=user.id, question_id=question.id, kind='submit', language_id=PYTHON, source_code=source
+                ))
+    db.session.commit()
+    return questions, users
+
+
+def test_check_test_reports_each_question_on_a_process_pool(app):
+    app.config['PLAGIARISM_WORKERS'] = 2
+    test = models.Test(name="Exam", duration_minutes=60)
+    db.session.add(test)
+    db.session.commit()
+    questions, users = add_answers(test.id, [SOLUTION, RENAMED, UNRELATED])
+    result = check_test(test.id)
+    assert set(result) == {str(q.id) for q in questions}
+    for clusters in result.values():
+        [cluster] = clusters
+        assert [user_id for _, user_id in cluster["members"]] == users[:2]
+
+
+def test_lost_reports_are_expired(app):
+    test = models.Test(name="Exam", duration_minutes=60)
+    db.session.add(test)
+    db.session.flush()
+    lost = models.PlagiarismReport(test_id=test.id, status='running', created_at=datetime.utcnow() - timedelta(hours=1))
+    live = models.PlagiarismReport(test_id=test.id, status='running')
+    db.session.add_all([lost, live])
+    db.session.commit()
+    expire_stale_reports(test.id)
+    db.session.expire_all()
+    assert (lost.status, live.status) == ('error', 'running')
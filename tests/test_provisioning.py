@@ -0,0 +1,68 @@
+import io
+from werkzeug.security import check_password_hash
+from app import models  # not `from ... import Test`, which pytest would try to collect
+from app import provisioning
+from app.provisioning import provision_candidates, hash_passwords
+from .conftest import add_user
+
+
+def provision(text, batch_size=None):
+    return provision_candidates(io.StringIO(text), batch_size)
+
+
+def test_creates_candidates_and_reports_generated_passwords(app):
+    report = provision("username,email,password\nalice,alice@example.com,secret123\nbobby,bob@example.com,\n")
+    assert report.conflicts == []
+    [(alice, _, given), (bobby, _, generated)] = report.created
+    assert (alice, given, bobby) == ('alice', None, 'bobby')
+    users = {u.username: u for u in models.User.query}
+    assert users['alice'].check_password('secret123')
+    assert users['bobby'].check_password(generated)
+    assert {u.role for u in users.values()} == {'student'}
+
+
+def test_bad_and_repeated_rows_are_reported(app):
+    add_user('taken')
+    report = provision(
+        "username,email\n"
+        "abc,short@example.com\n"
+        "carol,not-an-email\n"
+        "carol,carol@example.com\n"
+        "carol,carol2@example.com\n"
+        "dave1,carol@example.com\n"
+        "taken,new@example.com\n"
+        "erin1,taken@example.com\n"
+    )
+    assert [(number, reason) for number, _, _, reason in report.conflicts] == [
+        (1, 'username must be 4 to 64 characters'),
+        (2, 'invalid email address'),
+        (4, 'username repeated in file'),
+        (5, 'email repeated in file'),
+        (6, 'username already registered'),
+        (7, 'email already registered'),
+    ]
+    assert [username for username, _, _ in report.created] == ['carol']
+
+
+def test_accounts_registered_during_the_run_are_skipped(app, monkeypatch):
+    hash_all = provisioning.hash_passwords
+
+    def hash_while_someone_registers(passwords):
+        # Between the up-front check and the insert
+        add_user('grace')
+        return hash_all(passwords)
+
+    monkeypatch.setattr(provisioning, 'hash_passwords', hash_while_someone_registers)
+    report = provision("username,email\nfrank,frank@example.com\ngrace,g@example.com\nheidi,heidi@example.com\n",
+                       batch_size=10)
+    assert [username for username, _, _ in report.created] == ['frank', 'heidi']
+    assert [(number, reason) for number, _, _, reason in report.conflicts] == [(2, 'username already registered')]
+    assert models.User.query.count() == 3
+
+
+def test_passwords_are_hashed_on_a_process_pool(app):
+    app.config['PROVISION_HASH_WORKERS'] = 2
+    passwords = [f'password{i}' for i in range(4)]
+    hashes = hash_passwords(passwords)
+    assert all(check_password_hash(h, p) for h, p in zip(hashes, passwords))
+    assert len(set(hashes)) == 4
@@ -0,0 +1,151 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app import models  # not `from ... import Test`, which pytest would try to collect
+from app.submissions import submission_queue
+from .conftest import add_user
+
+ACCEPTED = {"id": 3, "description": "Accepted"}
+WRONG_ANSWER = {"id": 4, "description": "Wrong Answer"}
+
+
+class FakeJudge0:
+    """Hands out tokens and answers batch polls with whatever the test put in `results`."""
+
+    def __init__(self):
+        self.created = []
+        self.results = {}  # token -> result
+
+    def create_batch(self, payloads):
+        tokens = [f"token-{len(self.created) + i}" for i in range(len(payloads))]
+        self.created += payloads
+        return [{"token": token} for token in tokens]
+
+    def get_batch(self, tokens):
+        return [self.results.get(token, {"token": token, "status": {"id": 1}}) for token in tokens]
+
+    def finish(self, token, stdout, status=ACCEPTED):
+        self.results[token] = {"token": token, "status": status, "stdout": stdout, "time": "0.01", "memory": 1024}
+
+
+@pytest.fixture
+def judge(app):
+    fake = FakeJudge0()
+    app.extensions['judge0'] = fake
+    return fake
+
+
+@pytest.fixture
+def submission_id(app):
+    """A queued submission for a question with three test cases, expecting '0', '1' and '2'."""
+    test = models.Test(name="Exam", duration_minutes=60)
+    db.session.add(test)
+    db.session.flush()
+    question = models.CodingQuestion(test_id=test.id, problem_statement="Echo", marks=9)
+    db.session.add(question)
+    db.session.flush()
+    for i in range(3):
+        db.session.add(models.TestCase(question_id=question.id, input=str(i), expected_output=str(i), is_hidden=False))
+    submission = models.Submission(
+        user_id=add_user('candidate').id, question_id=question.id, kind='submit',
+        language_id=71, source_code='print(input())'
+    )
+    db.session.add(submission)
+    db.session.commit()
+    return submission.id
+
+
+def dispatch(submission_id):
+    submission_queue.enqueue(submission_id)
+    submission_queue._dispatch(submission_queue._jobs.get_nowait())
+
+
+def poll():
+    with submission_queue._lock:
+        inflight = dict(submission_queue._inflight)
+    submission_queue._poll_once(inflight)
+    db.session.expire_all()
+
+
+def tokens_of(submission_id):
+    return db.session.get(models.Submission, submission_id).tokens.split(",")
+
+
+def test_dispatch_sends_every_case_in_one_batch(judge, submission_id):
+    dispatch(submission_id)
+    assert [p["stdin"] for p in judge.created] == ['0', '1', '2']
+    submission = db.session.get(models.Submission, submission_id)
+    assert submission.status == 'running'
+    assert submission.tokens == 'token-0,token-1,token-2'
+    assert submission_id in submission_queue._inflight
+    assert submission_id in submission_queue._owned
+
+
+def test_poll_finishes_a_submission_once_every_verdict_is_in(judge, submission_id):
+    dispatch(submission_id)
+    judge.finish('token-0', '0')
+    judge.finish('token-1', '1')
+    poll()
+    assert db.session.get(models.Submission, submission_id).status == 'running'
+
+    judge.finish('token-2', 'wrong', WRONG_ANSWER)
+    poll()
+    submission = db.session.get(models.Submission, submission_id)
+    assert submission.status == 'done'
+    assert [v["passed"] for v in submission.result["verdicts"]] == [True, True, False]
+    assert submission.score == 6
+    assert submission.lease_until is None
+    assert submission_queue._inflight == {}
+    assert submission_queue._owned == set()
+
+
+def test_cases_the_judge_never_answers_time_out(judge, submission_id):
+    dispatch(submission_id)
+    judge.finish('token-0', '0')
+    submission_queue._inflight[submission_id]["deadline"] = 0
+    poll()
+    submission = db.session.get(models.Submission, submission_id)
+    assert submission.status == 'done'
+    assert [v["passed"] for v in submission.result["verdicts"]] == [True, False, False]
+    assert submission_queue._owned == set()
+
+
+def test_a_test_case_deleted_in_flight_fails_the_submission(judge, submission_id):
+    dispatch(submission_id)
+    db.session.delete(models.TestCase.query.first())
+    db.session.commit()
+    for token in tokens_of(submission_id):
+        judge.finish(token, '0')
+    poll()
+    submission = db.session.get(models.Submission, submission_id)
+    assert submission.status == 'error'
+    assert submission.result["error"] is True
+    assert submission_queue._inflight == {}
+    assert submission_queue._owned == set()
+
+
+def test_an_expired_lease_is_taken_over_and_its_tokens_reused(judge, submission_id):
+    submission = db.session.get(models.Submission, submission_id)
+    submission.status = 'running'
+    submission.tokens = 'left-0,left-1,left-2'
+    submission.lease_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    submission_queue._recover()
+    submission_queue._dispatch(submission_queue._jobs.get_nowait())
+    assert judge.created == []  # nothing sent to the judge again
+    assert submission_queue._inflight[submission_id]["tokens"] == ['left-0', 'left-1', 'left-2']
+    assert db.session.get(models.Submission, submission_id).lease_until > datetime.utcnow()
+
+    for i in range(3):
+        judge.finish(f'left-{i}', str(i))
+    poll()
+    assert db.session.get(models.Submission, submission_id).score == 9
+
+
+def test_a_live_lease_is_not_taken_over(judge, submission_id):
+    submission = db.session.get(models.Submission, submission_id)
+    submission.lease_until = datetime.utcnow() + timedelta(seconds=60)
+    db.session.commit()
+    submission_queue._recover()
+    assert submission_queue._jobs.empty()
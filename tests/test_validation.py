@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from app import db
+from app import models  # not `from ... import Test`, which pytest would try to collect
+from app.validation import publish_blockers
+
+
+def add_stale_check():
+    test = models.Test(name="Exam", duration_minutes=60)
+    db.session.add(test)
+    db.session.flush()
+    question = models.CodingQuestion(
+        test_id=test.id, problem_statement="Echo", validation_status='running',
+        validated_at=datetime.utcnow() - timedelta(hours=1)
+    )
+    db.session.add(question)
+    db.session.commit()
+    return test.id, question.id
+
+
+def status_of(question_id):
+    db.session.expire_all()
+    return db.session.get(models.CodingQuestion, question_id).validation_status
+
+
+def test_admin_pages_do_not_write(admin_client, count_statements):
+    test_id, question_id = add_stale_check()
+    with count_statements() as counter:
+        assert admin_client.get(f'/admin/test/{test_id}').status_code == 200
+        assert admin_client.get(f'/admin/question/{question_id}/validation').status_code == 200
+    assert not [s for s in counter.statements if s.startswith(('UPDATE', 'INSERT', 'DELETE'))]
+    assert status_of(question_id) == 'running'
+
+
+def test_publishing_expires_a_lost_check(app):
+    test_id, question_id = add_stale_check()
+    assert [q.id for q in publish_blockers(test_id)] == [question_id]
+    assert status_of(question_id) == 'error'